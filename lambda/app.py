@@ -1,25 +1,47 @@
-from ask_sdk_core.skill_builder import CustomSkillBuilder
 from ask_sdk_core.api_client import DefaultApiClient
 
+from handlers.fast_path import handle_fast_path
+from handlers.warmup import handle_warmup, is_warmup
 from handlers.request_handler import (
     LaunchRequestHandler,
     SessionEndedRequestHandler,
     GetPrayerTimesIntentHandler,
+    GetNextPrayerIntentHandler,
+    GetPrayerScheduleIntentHandler,
+    NextScheduleDaysHandler,
+    SkipScheduleDaysHandler,
     GetPrayerTimesExceptionHandler,
     HelpIntentHandler,
     CancelAndStopIntentHandler,
     FallbackIntentHandler,
     EnableNotificationsIntentHandler,
     ConnectionsResponseHandler,
+    SetCalculationMethodIntentHandler,
+    SetAsrSchoolIntentHandler,
+    SetPrayerOffsetIntentHandler,
+    SetReminderLeadIntentHandler,
+    SetAdhanIntentHandler,
     CatchAllExceptionHandler,
 )
+from repositories.user_state_repository import UserStateResponseInterceptor
+from services.envelope_codec import FastSkillBuilder
+from services.invocation_profiler import profiled
 
-sb = CustomSkillBuilder(api_client=DefaultApiClient())
+sb = FastSkillBuilder(api_client=DefaultApiClient())
 
 sb.add_request_handler(LaunchRequestHandler())
 sb.add_request_handler(GetPrayerTimesIntentHandler())
+sb.add_request_handler(GetNextPrayerIntentHandler())
+sb.add_request_handler(GetPrayerScheduleIntentHandler())
+sb.add_request_handler(NextScheduleDaysHandler())
+sb.add_request_handler(SkipScheduleDaysHandler())
 sb.add_request_handler(EnableNotificationsIntentHandler())
 sb.add_request_handler(ConnectionsResponseHandler())
+sb.add_request_handler(SetCalculationMethodIntentHandler())
+sb.add_request_handler(SetAsrSchoolIntentHandler())
+sb.add_request_handler(SetPrayerOffsetIntentHandler())
+sb.add_request_handler(SetReminderLeadIntentHandler())
+sb.add_request_handler(SetAdhanIntentHandler())
 sb.add_request_handler(HelpIntentHandler())
 sb.add_request_handler(CancelAndStopIntentHandler())
 sb.add_request_handler(SessionEndedRequestHandler())
@@ -28,5 +50,18 @@ sb.add_request_handler(FallbackIntentHandler())
 sb.add_exception_handler(GetPrayerTimesExceptionHandler())
 sb.add_exception_handler(CatchAllExceptionHandler())
 
+sb.add_global_response_interceptor(UserStateResponseInterceptor())
 
-handler = sb.lambda_handler()
+skill_handler = sb.lambda_handler()
+
+
+@profiled
+def handler(event, context):
+    if is_warmup(event):
+        return handle_warmup(event, context)
+    # Playback events and session ends are answered before the skill
+    # pipeline decodes anything.
+    response = handle_fast_path(event)
+    if response is not None:
+        return response
+    return skill_handler(event, context)
@@ -0,0 +1,88 @@
+"""Pre-dispatch answers for fire-and-forget requests.
+
+AudioPlayer playback events and SessionEndedRequest expect nothing but an
+empty response, so app.handler answers them from the raw event, before the
+envelope is decoded and the handlers are scanned, and only records them as
+CloudWatch metrics (embedded metric format) per device class. The playback
+failure rate of a device class is PlaybackFailed / PlaybackStarted.
+"""
+
+import os
+from typing import Optional
+
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.metrics import MetricUnit, single_metric
+
+logger = Logger(service="fast_path")
+
+METRICS_NAMESPACE = "AlexaAdhan"
+
+# Request type -> metric name
+FAST_PATH_REQUESTS = {
+    "AudioPlayer.PlaybackStarted": "PlaybackStarted",
+    "AudioPlayer.PlaybackFinished": "PlaybackFinished",
+    "AudioPlayer.PlaybackStopped": "PlaybackStopped",
+    "AudioPlayer.PlaybackNearlyFinished": "PlaybackNearlyFinished",
+    "AudioPlayer.PlaybackFailed": "PlaybackFailed",
+    "SessionEndedRequest": "SessionEnded",
+}
+
+EMPTY_RESPONSE = {"version": "1.0", "response": {}}
+
+
+def handle_fast_path(event: dict) -> Optional[dict]:
+    """Return the response of a fire-and-forget request, None for the rest."""
+    request = event.get("request") or {}
+    metric_name = FAST_PATH_REQUESTS.get(request.get("type"))
+    if metric_name is None:
+        return None
+
+    try:
+        dimensions = {"DeviceClass": device_class(event)}
+        if metric_name == "SessionEnded":
+            dimensions["Reason"] = request.get("reason") or "UNKNOWN"
+        _record(metric_name, dimensions)
+
+        error = request.get("error")
+        if error:
+            logger.warning(
+                f"{metric_name} with an error",
+                extra={
+                    "error_type": error.get("type"),
+                    "error_message": error.get("message"),
+                    "device_class": dimensions["DeviceClass"],
+                    "token": request.get("token"),
+                },
+            )
+    except Exception as e:
+        # Telemetry must not fail the request
+        logger.warning(
+            "Failed to record fast path metric",
+            extra={"error_type": type(e).__name__, "error_message": str(e)},
+        )
+
+    return EMPTY_RESPONSE
+
+
+def device_class(event: dict) -> str:
+    """Coarse device class from the interfaces the device supports."""
+    system = (event.get("context") or {}).get("System") or {}
+    interfaces = (system.get("device") or {}).get("supportedInterfaces") or {}
+    if "Geolocation" in interfaces:
+        return "mobile"
+    if "Alexa.Presentation.APL" in interfaces or "Display" in interfaces:
+        return "screen"
+    if "AudioPlayer" in interfaces:
+        return "speaker"
+    return "other"
+
+
+def _record(metric_name: str, dimensions: dict) -> None:
+    with single_metric(
+        name=metric_name,
+        unit=MetricUnit.Count,
+        value=1,
+        namespace=os.getenv("POWERTOOLS_METRICS_NAMESPACE", METRICS_NAMESPACE),
+    ) as metric:
+        for name, value in dimensions.items():
+            metric.add_dimension(name=name, value=value)
@@ -7,7 +7,11 @@ from ask_sdk_model.services import ServiceException
 from aws_lambda_powertools import Logger
 
 from services.prayer_notification_service import PrayerNotificationService
+from services.prayer_schedule_service import PrayerScheduleService, has_pending_days
 from services.prayer_times_service import PrayerService
+from services.preferences_service import PreferencesService
+from services.reminder_provisioning_service import ReminderProvisioningService
+from services.reminder_queue import get_reminder_queue
 from speech_text import get_speech_text
 
 logger = Logger(service="request_handler")
@@ -24,6 +28,42 @@ class GetPrayerTimesIntentHandler(AbstractRequestHandler):
         return PrayerService.get_prayer_times_with_location(handler_input)
 
 
+class GetNextPrayerIntentHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return is_intent_name("GetNextPrayerIntent")(handler_input)
+
+    def handle(self, handler_input):
+        return PrayerService.get_next_prayer_with_location(handler_input)
+
+
+class GetPrayerScheduleIntentHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return is_intent_name("GetPrayerScheduleIntent")(handler_input)
+
+    def handle(self, handler_input):
+        return PrayerScheduleService.get_schedule_with_location(handler_input)
+
+
+class NextScheduleDaysHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return is_intent_name("AMAZON.YesIntent")(handler_input) and has_pending_days(
+            handler_input
+        )
+
+    def handle(self, handler_input):
+        return PrayerScheduleService.read_pending_days(handler_input)
+
+
+class SkipScheduleDaysHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return is_intent_name("AMAZON.NoIntent")(handler_input) and has_pending_days(
+            handler_input
+        )
+
+    def handle(self, handler_input):
+        return PrayerScheduleService.drop_pending_days(handler_input)
+
+
 class GetPrayerTimesExceptionHandler(AbstractExceptionHandler):
     def can_handle(self, handler_input, exception):
         return isinstance(exception, ServiceException)
@@ -57,7 +97,18 @@ class EnableNotificationsIntentHandler(AbstractRequestHandler):
                 handler_input.response_builder, texts
             )
 
+        if not PrayerNotificationService.check_reminder_permission(alexa_permissions):
+            # Other permissions are granted: resolve the location, timezone
+            # and timings now, so the accepted permission request only has
+            # to create the reminders.
+            PrayerNotificationService.stash_pending_setup(handler_input)
+            return PrayerNotificationService.request_reminder_permission(
+                handler_input.response_builder, texts
+            )
+
         logger.info("Reminder permissions found in scopes, proceeding with setup")
+        if get_reminder_queue() is not None:
+            return ReminderProvisioningService.queue_prayer_notifications(handler_input)
         return PrayerNotificationService.setup_prayer_notifications(handler_input)
 
 
@@ -69,6 +120,52 @@ class ConnectionsResponseHandler(AbstractRequestHandler):
         return PrayerNotificationService.handle_connections_response(handler_input)
 
 
+# [Preferences intent handlers]
+
+
+class SetCalculationMethodIntentHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return is_intent_name("SetCalculationMethodIntent")(handler_input)
+
+    def handle(self, handler_input):
+        return PreferencesService.set_calculation_method(handler_input)
+
+
+class SetAsrSchoolIntentHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return is_intent_name("SetAsrSchoolIntent")(handler_input)
+
+    def handle(self, handler_input):
+        return PreferencesService.set_asr_school(handler_input)
+
+
+class SetPrayerOffsetIntentHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return is_intent_name("SetPrayerOffsetIntent")(handler_input)
+
+    def handle(self, handler_input):
+        return PreferencesService.set_prayer_offset(handler_input)
+
+
+class SetReminderLeadIntentHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return is_intent_name("SetReminderLeadIntent")(handler_input)
+
+    def handle(self, handler_input):
+        return PreferencesService.set_reminder_lead(handler_input)
+
+
+class SetAdhanIntentHandler(AbstractRequestHandler):
+    def can_handle(self, handler_input):
+        return is_intent_name("SetAdhanIntent")(handler_input)
+
+    def handle(self, handler_input):
+        # Play the chosen Adhan right away, the way it will sound.
+        return PreferencesService.set_adhan(
+            handler_input, preview=PrayerService.get_adhan_directive
+        )
+
+
 # [General intent handlers]
 
 
@@ -146,7 +243,12 @@ class CancelAndStopIntentHandler(AbstractRequestHandler):
 
 class FallbackIntentHandler(AbstractRequestHandler):
     def can_handle(self, handler_input):
-        return is_intent_name("AMAZON.FallbackIntent")(handler_input)
+        # Yes and No only mean something after a question of the skill.
+        return (
+            is_intent_name("AMAZON.FallbackIntent")(handler_input)
+            or is_intent_name("AMAZON.YesIntent")(handler_input)
+            or is_intent_name("AMAZON.NoIntent")(handler_input)
+        )
 
     def handle(self, handler_input):
         locale = handler_input.request_envelope.request.locale
@@ -0,0 +1,186 @@
+"""Scheduled warm-up ahead of the request spikes before each prayer.
+
+Requests spike in the minutes before each prayer of each timezone and
+would land on containers whose caches are empty. The EventBridge schedule
+of template.yaml invokes app.handler, which hands the event over here
+before the skill pipeline. A warm-up invocation:
+
+- initializes the imports, the HTTP session and the timetable,
+- flushes its request counts and reads everyone's back (request_stats),
+- for the WARMUP_TOP_N most requested locations whose next prayer is
+  within PRIME_WINDOW_MINUTES, caches the timings, the schedule and the
+  rendered answer (PrayerService.prime_location).
+
+Caches are per container. With WARMUP_CONCURRENCY above 1, the scheduled
+invocation also invokes the function that many times minus one at once,
+each copy landing on another container and priming its own caches.
+"""
+
+import datetime
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import pytz
+from aws_lambda_powertools import Logger
+
+from services import async_http, request_stats
+from services.prayer_calculation import compute_prayer_day
+from services.prayer_times_service import PrayerService
+from services.timetable_store import get_timetable
+
+logger = Logger(service="warmup")
+
+SCHEDULE_SOURCE = "aws.events"
+FAN_OUT_SOURCE = "alexa-adhan.warmup"
+PRIME_WINDOW_MINUTES = 30
+DEFAULT_TOP_N = 20
+# Priming stops when less than this is left of the invocation's time.
+RESERVED_MILLIS = 5000
+
+
+def is_warmup(event: dict) -> bool:
+    return event.get("source") in (SCHEDULE_SOURCE, FAN_OUT_SOURCE) and (
+        "request" not in event
+    )
+
+
+def handle_warmup(event: dict, context) -> dict:
+    started = time.monotonic()
+    # Copies are invoked by the scheduled invocation only, never by copies.
+    copies = 0
+    if event.get("source") == SCHEDULE_SOURCE and context is not None:
+        copies = _concurrency() - 1
+    pool = ThreadPoolExecutor(max_workers=copies) if copies > 0 else None
+    fan_out = (
+        [pool.submit(_invoke_copy, context) for _ in range(copies)] if pool else []
+    )
+
+    get_timetable()
+    async_http.run(_open_session())
+    request_stats.flush(force=True)
+
+    primed = skipped = failed = 0
+    try:
+        locations = imminent_locations(_top_n())
+    except Exception as e:
+        logger.warning(
+            "Failed to read request stats",
+            extra={"error_type": type(e).__name__, "error_message": str(e)},
+        )
+        locations = []
+
+    for location in locations:
+        if context is not None and (
+            context.get_remaining_time_in_millis() < RESERVED_MILLIS
+        ):
+            break
+        try:
+            if PrayerService.prime_location(
+                location.latitude,
+                location.longitude,
+                location.method,
+                location.school,
+                dict(location.offsets),
+                location.locale,
+                location.timezone,
+            ):
+                primed += 1
+            else:
+                skipped += 1
+        except Exception as e:
+            failed += 1
+            logger.warning(
+                "Failed to prime location",
+                extra={
+                    "location": location.to_attribute(),
+                    "error_type": type(e).__name__,
+                    "error_message": str(e),
+                },
+            )
+
+    copies_warmed = 0
+    for future in fan_out:
+        try:
+            future.result()
+            copies_warmed += 1
+        except Exception as e:
+            logger.warning(
+                "Warm-up copy failed",
+                extra={"error_type": type(e).__name__, "error_message": str(e)},
+            )
+    if pool:
+        pool.shutdown()
+
+    summary = {
+        "imminent": len(locations),
+        "primed": primed,
+        "already_cached": skipped,
+        "failed": failed,
+        "copies": copies_warmed,
+        "duration_ms": round((time.monotonic() - started) * 1000),
+    }
+    logger.info("Warm-up done", extra=summary)
+    return summary
+
+
+def imminent_locations(
+    limit: int, now: Optional[float] = None
+) -> List[request_stats.Location]:
+    """Most requested locations whose next prayer is within the window.
+
+    Prayer times are computed locally, close enough to pick the locations.
+    """
+    now = time.time() if now is None else now
+    selected = []
+    for location, _ in request_stats.top_locations():
+        timezone = pytz.timezone(location.timezone)
+        local_date = datetime.datetime.fromtimestamp(now, timezone).date()
+        day = compute_prayer_day(
+            location.latitude,
+            location.longitude,
+            local_date,
+            timezone,
+            method=location.method,
+            school=location.school,
+        ).shifted(dict(location.offsets))
+        next_prayer = day.next_prayer(now)
+        if next_prayer and next_prayer[1].timestamp() - now <= (
+            PRIME_WINDOW_MINUTES * 60
+        ):
+            selected.append(location)
+            if len(selected) == limit:
+                break
+    return selected
+
+
+async def _open_session() -> None:
+    async_http.get_session()
+
+
+def _invoke_copy(context) -> None:
+    import boto3
+
+    response = boto3.client("lambda").invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType="RequestResponse",
+        Payload=json.dumps({"source": FAN_OUT_SOURCE}).encode("utf-8"),
+    )
+    if response.get("FunctionError"):
+        raise RuntimeError(response["Payload"].read().decode("utf-8"))
+
+
+def _concurrency() -> int:
+    try:
+        return max(1, int(os.getenv("WARMUP_CONCURRENCY", "1")))
+    except ValueError:
+        return 1
+
+
+def _top_n() -> int:
+    try:
+        return max(0, int(os.getenv("WARMUP_TOP_N", DEFAULT_TOP_N)))
+    except ValueError:
+        return DEFAULT_TOP_N
@@ -0,0 +1,151 @@
+"""Compact typed prayer timings of one day at one location."""
+
+import bisect
+import datetime
+from array import array
+from typing import Dict, Iterator, Optional, Tuple
+
+PRAYERS = ("Fajr", "Dhuhr", "Asr", "Maghrib", "Isha")
+NO_VALUE = 0xFFFF
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_minutes(value: str) -> int:
+    """Parse Aladhan's "HH:MM" (optionally followed by " (TZ)") to minutes."""
+    return int(value[0:2]) * 60 + int(value[3:5])
+
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class PrayerDay:
+    """Minutes since local midnight of each prayer, parsed once at the boundary.
+
+    Localized datetimes and their epochs are computed on first use and kept,
+    so the reminder loop and next prayer lookups do no parsing or
+    localization of their own.
+    """
+
+    __slots__ = ("date", "timezone", "minutes", "_moments", "_epochs")
+
+    def __init__(self, date: datetime.date, timezone, minutes: array):
+        self.date = date
+        self.timezone = timezone
+        self.minutes = minutes
+        self._moments = None
+        self._epochs = None
+
+    @classmethod
+    def from_timings(
+        cls, timings: Dict[str, str], date: datetime.date, timezone
+    ) -> "PrayerDay":
+        """Build from an Aladhan style prayer name to "HH:MM" mapping."""
+        return cls(
+            date,
+            timezone,
+            array(
+                "H",
+                (
+                    parse_minutes(timings[prayer]) if prayer in timings else NO_VALUE
+                    for prayer in PRAYERS
+                ),
+            ),
+        )
+
+    @classmethod
+    def from_minutes(cls, minutes, date: datetime.date, timezone) -> "PrayerDay":
+        """Build from minutes ordered as PRAYERS, NO_VALUE for missing ones."""
+        return cls(date, timezone, array("H", minutes))
+
+    @property
+    def timezone_name(self) -> Optional[str]:
+        return self.timezone.zone if self.timezone is not None else None
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        """Yield (prayer, minutes) of the prayers present."""
+        for prayer, minutes in zip(PRAYERS, self.minutes):
+            if minutes != NO_VALUE:
+                yield prayer, minutes
+
+    def __contains__(self, prayer: str) -> bool:
+        return self.minute_of(prayer) is not None
+
+    def __repr__(self) -> str:
+        return f"PrayerDay({self.date}, {self.timezone_name}, {self.format()})"
+
+    def minute_of(self, prayer: str) -> Optional[int]:
+        minutes = self.minutes[PRAYERS.index(prayer)]
+        return None if minutes == NO_VALUE else minutes
+
+    def time_of(self, prayer: str) -> Optional[str]:
+        minutes = self.minute_of(prayer)
+        return None if minutes is None else format_minutes(minutes)
+
+    def moment_on(self, prayer: str, date: datetime.date) -> datetime.datetime:
+        """Localize the prayer's wall clock time on another date."""
+        minutes = self.minute_of(prayer)
+        local = datetime.datetime.combine(
+            date, datetime.time(minutes // 60, minutes % 60)
+        )
+        return self.timezone.normalize(self.timezone.localize(local))
+
+    def moments(self) -> Tuple[Tuple[str, datetime.datetime], ...]:
+        """(prayer, aware datetime) of the day, localized once.
+
+        Each time is localized on its own date, so DST is applied exactly.
+        """
+        if self._moments is None:
+            self._moments = tuple(
+                (prayer, self.moment_on(prayer, self.date)) for prayer, _ in self
+            )
+        return self._moments
+
+    def epochs(self) -> Tuple[float, ...]:
+        if self._epochs is None:
+            self._epochs = tuple(moment.timestamp() for _, moment in self.moments())
+        return self._epochs
+
+    def next_prayer(self, now: float) -> Optional[Tuple[str, datetime.datetime]]:
+        """Return the first prayer of the day strictly after the epoch now."""
+        position = bisect.bisect_right(self.epochs(), now)
+        moments = self.moments()
+        if position >= len(moments):
+            return None
+        return moments[position]
+
+    def shifted(
+        self,
+        offsets: Dict[str, int],
+        date: Optional[datetime.date] = None,
+        timezone=None,
+    ) -> "PrayerDay":
+        """Return a copy with per prayer minute offsets applied, self if
+        nothing changes.
+
+        Args:
+            offsets: Prayer name to minutes to add, missing prayers are kept
+            date: Date of the copy, the same day when omitted
+            timezone: Timezone of the copy, the same one when omitted
+        """
+        if not any(offsets.values()) and date is None and timezone is None:
+            return self
+        minutes = array("H", self.minutes)
+        for index, prayer in enumerate(PRAYERS):
+            if minutes[index] != NO_VALUE and offsets.get(prayer):
+                minutes[index] = (minutes[index] + offsets[prayer]) % MINUTES_PER_DAY
+        return PrayerDay(
+            date or self.date,
+            timezone if timezone is not None else self.timezone,
+            minutes,
+        )
+
+    def format(self) -> str:
+        """Speech list, e.g. "Fajr: 05:12, Dhuhr: 13:30"."""
+        return ", ".join(
+            f"{prayer}: {format_minutes(minutes)}" for prayer, minutes in self
+        )
+
+    def to_timings(self) -> Dict[str, str]:
+        """Aladhan style mapping, for logs and serialized state."""
+        return {prayer: format_minutes(minutes) for prayer, minutes in self}
@@ -0,0 +1,193 @@
+"""Shared DynamoDB client and a local stand-in for it.
+
+The client is created on first use and kept for the life of the container.
+DYNAMODB_ENDPOINT_URL points it at DynamoDB Local, or at the in-process
+InMemoryDynamoDBClient when set to "memory", for running the skill without
+AWS.
+"""
+
+import copy
+import os
+import re
+import threading
+from decimal import Decimal
+from typing import Any, Dict
+
+MEMORY_ENDPOINT = "memory"
+CONDITIONAL_CHECK_FAILED = "ConditionalCheckFailedException"
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                endpoint_url = os.getenv("DYNAMODB_ENDPOINT_URL")
+                if endpoint_url == MEMORY_ENDPOINT:
+                    _client = InMemoryDynamoDBClient()
+                else:
+                    import boto3
+
+                    _client = boto3.client("dynamodb", endpoint_url=endpoint_url)
+    return _client
+
+
+def is_conditional_check_failure(exception: Exception) -> bool:
+    response = getattr(exception, "response", None) or {}
+    return response.get("Error", {}).get("Code") == CONDITIONAL_CHECK_FAILED
+
+
+def serialize(value: Any) -> Dict[str, Any]:
+    """Python value to DynamoDB attribute value."""
+    if value is None:
+        return {"NULL": True}
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    if isinstance(value, (int, float, Decimal)):
+        return {"N": str(value)}
+    if isinstance(value, str):
+        return {"S": value}
+    if isinstance(value, dict):
+        return {"M": {str(k): serialize(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {"L": [serialize(v) for v in value]}
+    raise TypeError(f"Unsupported DynamoDB value {type(value).__name__}")
+
+
+def deserialize(attribute: Dict[str, Any]) -> Any:
+    """DynamoDB attribute value to Python value, integral numbers as int."""
+    ((kind, value),) = attribute.items()
+    if kind == "N":
+        number = Decimal(value)
+        return int(number) if number == number.to_integral_value() else float(number)
+    if kind == "M":
+        return {k: deserialize(v) for k, v in value.items()}
+    if kind == "L":
+        return [deserialize(v) for v in value]
+    if kind == "NULL":
+        return None
+    return value
+
+
+class ConditionalCheckFailedError(Exception):
+    """Stand-in for the botocore error, with the same response shape."""
+
+    def __init__(self):
+        super().__init__("The conditional request failed")
+        self.response = {"Error": {"Code": CONDITIONAL_CHECK_FAILED}}
+
+
+class InMemoryDynamoDBClient:
+    """Process local stand-in for the subset of the DynamoDB API the skill uses.
+
+    Tables are created on first write and keyed by their single hash key.
+    Update and condition expressions are limited to what the repositories
+    generate: SET/REMOVE of top level attributes, ADD to top level numbers,
+    attribute_not_exists and equality, joined with OR.
+    """
+
+    def __init__(self, key_attribute: str = "userId"):
+        self.key_attribute = key_attribute
+        self.tables: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def _table(self, name: str) -> Dict[str, dict]:
+        return self.tables.setdefault(name, {})
+
+    def _key(self, key: dict) -> str:
+        return key[self.key_attribute]["S"]
+
+    def get_item(self, TableName, Key, **kwargs):
+        with self._lock:
+            item = self._table(TableName).get(self._key(Key))
+            return {"Item": copy.deepcopy(item)} if item is not None else {}
+
+    def put_item(self, TableName, Item, **kwargs):
+        with self._lock:
+            self._table(TableName)[self._key(Item)] = copy.deepcopy(Item)
+        return {}
+
+    def delete_item(self, TableName, Key, **kwargs):
+        with self._lock:
+            self._table(TableName).pop(self._key(Key), None)
+        return {}
+
+    def update_item(
+        self,
+        TableName,
+        Key,
+        UpdateExpression,
+        ExpressionAttributeNames=None,
+        ExpressionAttributeValues=None,
+        ConditionExpression=None,
+        **kwargs,
+    ):
+        names = ExpressionAttributeNames or {}
+        values = ExpressionAttributeValues or {}
+        with self._lock:
+            table = self._table(TableName)
+            item = copy.deepcopy(table.get(self._key(Key))) or dict(Key)
+            if ConditionExpression and not self._check(
+                ConditionExpression, item, names, values
+            ):
+                raise ConditionalCheckFailedError()
+
+            for action, body in re.findall(
+                r"(SET|REMOVE|ADD)\s+(.*?)(?=\s+(?:SET|REMOVE|ADD)\s|$)",
+                UpdateExpression,
+            ):
+                for clause in body.split(","):
+                    if action == "SET":
+                        name, value = (part.strip() for part in clause.split("="))
+                        item[names.get(name, name)] = copy.deepcopy(values[value])
+                    elif action == "ADD":
+                        name, value = clause.split()
+                        name = names.get(name, name)
+                        total = deserialize(item.get(name, {"N": "0"}))
+                        item[name] = serialize(total + deserialize(values[value]))
+                    else:
+                        name = clause.strip()
+                        item.pop(names.get(name, name), None)
+            table[self._key(Key)] = item
+        return {}
+
+    @staticmethod
+    def _check(expression, item, names, values) -> bool:
+        for condition in expression.split(" OR "):
+            condition = condition.strip()
+            match = re.fullmatch(r"attribute_not_exists\((\S+)\)", condition)
+            if match:
+                if names.get(match.group(1), match.group(1)) not in item:
+                    return True
+                continue
+            name, value = (part.strip() for part in condition.split("="))
+            if item.get(names.get(name, name)) == values[value]:
+                return True
+        return False
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        responses = {}
+        with self._lock:
+            for table_name, request in RequestItems.items():
+                table = self._table(table_name)
+                responses[table_name] = [
+                    copy.deepcopy(table[self._key(key)])
+                    for key in request["Keys"]
+                    if self._key(key) in table
+                ]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        with self._lock:
+            for table_name, requests in RequestItems.items():
+                table = self._table(table_name)
+                for request in requests:
+                    if "PutRequest" in request:
+                        item = request["PutRequest"]["Item"]
+                        table[self._key(item)] = copy.deepcopy(item)
+                    else:
+                        table.pop(self._key(request["DeleteRequest"]["Key"]), None)
+        return {"UnprocessedItems": {}}
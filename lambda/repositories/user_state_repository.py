@@ -0,0 +1,324 @@
+"""Write-behind per-user state stored in PreferencesTable.
+
+Services read and change a user's state through get_user_state during the
+invocation. The item is fetched with a single get_item the first time any
+service asks for it, so requests that need no state cost no read, and
+every change is flushed at the end of the invocation by
+UserStateResponseInterceptor with one conditional update_item.
+
+Out of session workers use batch_get and batch_write instead.
+"""
+
+import os
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from ask_sdk_core.dispatch_components import AbstractResponseInterceptor
+from aws_lambda_powertools import Logger
+
+from repositories.dynamodb import (
+    deserialize,
+    get_client,
+    is_conditional_check_failure,
+    serialize,
+)
+
+logger = Logger(service="user_state_repository")
+
+KEY_ATTRIBUTE = "userId"
+VERSION_ATTRIBUTE = "version"
+REQUEST_ATTRIBUTE = "user_state"
+
+
+class UserState:
+    """A user's item with the fields changed since it was read."""
+
+    __slots__ = ("user_id", "version", "load_failed", "_fields", "_dirty", "_removed")
+
+    def __init__(
+        self,
+        user_id: str,
+        fields: Optional[Dict[str, Any]] = None,
+        version: int = 0,
+        load_failed: bool = False,
+    ):
+        self.user_id = user_id
+        self.version = version
+        self.load_failed = load_failed
+        self._fields = fields or {}
+        self._dirty = set()
+        self._removed = set()
+
+    @classmethod
+    def from_item(cls, user_id: str, item: Optional[dict]) -> "UserState":
+        if not item:
+            return cls(user_id)
+        fields = {
+            name: deserialize(value)
+            for name, value in item.items()
+            if name not in (KEY_ATTRIBUTE, VERSION_ATTRIBUTE)
+        }
+        version = (
+            deserialize(item[VERSION_ATTRIBUTE]) if VERSION_ATTRIBUTE in item else 0
+        )
+        return cls(user_id, fields, version)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self._fields.get(name, default)
+
+    def set(self, name: str, value: Any) -> None:
+        if name in self._fields and self._fields[name] == value:
+            return
+        self._fields[name] = value
+        self._dirty.add(name)
+        self._removed.discard(name)
+
+    def delete(self, name: str) -> None:
+        if name not in self._fields:
+            return
+        del self._fields[name]
+        self._removed.add(name)
+        self._dirty.discard(name)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty or self._removed)
+
+    def changes(self):
+        """Return the changed fields and the removed field names."""
+        return {name: self._fields[name] for name in self._dirty}, set(self._removed)
+
+    def rebase(self, fresh: "UserState") -> None:
+        """Replay this state's changes on top of a newer read of the item."""
+        changed, removed = self.changes()
+        self._fields = dict(fresh._fields)
+        self.version = fresh.version
+        self.mark_clean()
+        for name, value in changed.items():
+            self._fields[name] = value
+            self._dirty.add(name)
+        for name in removed:
+            if self._fields.pop(name, None) is not None:
+                self._removed.add(name)
+
+    def mark_clean(self) -> None:
+        self._dirty.clear()
+        self._removed.clear()
+
+    def to_item(self) -> dict:
+        item = {name: serialize(value) for name, value in self._fields.items()}
+        item[KEY_ATTRIBUTE] = {"S": self.user_id}
+        item[VERSION_ATTRIBUTE] = {"N": str(self.version + 1)}
+        return item
+
+
+class UserStateRepository:
+    MAX_BATCH_GET = 100
+    MAX_BATCH_WRITE = 25
+    MAX_BATCH_ATTEMPTS = 5
+    BATCH_RETRY_DELAY = 0.05
+
+    def __init__(self, table_name: str, client=None):
+        self.table_name = table_name
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client if self._client is not None else get_client()
+
+    def load(self, user_id: str) -> UserState:
+        item = self.client.get_item(
+            TableName=self.table_name,
+            Key={KEY_ATTRIBUTE: {"S": user_id}},
+        ).get("Item")
+        return UserState.from_item(user_id, item)
+
+    def flush(self, state: UserState) -> bool:
+        """Write the state's changes with one conditional update_item.
+
+        The update only applies if nobody wrote the item since it was read.
+        On a conflict the item is read again, the changes are applied on
+        top of it and the write is retried once, so concurrent invocations
+        changing different fields do not lose each other's changes.
+
+        Returns:
+            bool: Whether the changes were written
+        """
+        if not state.dirty:
+            return True
+
+        for attempt in range(2):
+            try:
+                self.client.update_item(**self._update_request(state))
+            except Exception as e:
+                if not is_conditional_check_failure(e) or attempt:
+                    logger.error(
+                        "Failed to flush user state",
+                        extra={
+                            "error_type": type(e).__name__,
+                            "error_message": str(e),
+                        },
+                    )
+                    return False
+                logger.info("User state changed concurrently, merging")
+                state.rebase(self.load(state.user_id))
+                if not state.dirty:
+                    return True
+                continue
+            state.version += 1
+            state.mark_clean()
+            return True
+        return False
+
+    def _update_request(self, state: UserState) -> dict:
+        changed, removed = state.changes()
+        names = {"#v": VERSION_ATTRIBUTE}
+        values = {":next": {"N": str(state.version + 1)}}
+
+        assignments = ["#v = :next"]
+        for index, (name, value) in enumerate(changed.items()):
+            names[f"#f{index}"] = name
+            values[f":f{index}"] = serialize(value)
+            assignments.append(f"#f{index} = :f{index}")
+        expression = "SET " + ", ".join(assignments)
+
+        removals = []
+        for index, name in enumerate(removed):
+            names[f"#r{index}"] = name
+            removals.append(f"#r{index}")
+        if removals:
+            expression += " REMOVE " + ", ".join(removals)
+
+        if state.version:
+            condition = "#v = :version"
+            values[":version"] = {"N": str(state.version)}
+        else:
+            condition = "attribute_not_exists(#v)"
+
+        return {
+            "TableName": self.table_name,
+            "Key": {KEY_ATTRIBUTE: {"S": state.user_id}},
+            "UpdateExpression": expression,
+            "ConditionExpression": condition,
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": values,
+        }
+
+    def batch_get(self, user_ids: Iterable[str]) -> Dict[str, UserState]:
+        """Read many users in batch_get_item calls of MAX_BATCH_GET keys.
+
+        Users without an item get an empty state.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        states = {user_id: UserState(user_id) for user_id in user_ids}
+
+        for start in range(0, len(user_ids), self.MAX_BATCH_GET):
+            request = {
+                self.table_name: {
+                    "Keys": [
+                        {KEY_ATTRIBUTE: {"S": user_id}}
+                        for user_id in user_ids[start : start + self.MAX_BATCH_GET]
+                    ]
+                }
+            }
+            for attempt in range(self.MAX_BATCH_ATTEMPTS):
+                response = self.client.batch_get_item(RequestItems=request)
+                for item in response.get("Responses", {}).get(self.table_name, []):
+                    user_id = item[KEY_ATTRIBUTE]["S"]
+                    states[user_id] = UserState.from_item(user_id, item)
+                request = response.get("UnprocessedKeys") or {}
+                if not request:
+                    break
+                time.sleep(self.BATCH_RETRY_DELAY * 2**attempt)
+            else:
+                raise RuntimeError("DynamoDB kept keys unprocessed")
+        return states
+
+    def batch_write(self, states: Iterable[UserState]) -> None:
+        """Write many users' full items in batch_write_item calls.
+
+        Batch writes cannot be conditional, they are meant for workers that
+        own the items they write, e.g. rebuilding reminder tokens.
+        """
+        states = [state for state in states if state.dirty]
+        for start in range(0, len(states), self.MAX_BATCH_WRITE):
+            chunk = states[start : start + self.MAX_BATCH_WRITE]
+            request = {
+                self.table_name: [
+                    {"PutRequest": {"Item": state.to_item()}} for state in chunk
+                ]
+            }
+            for attempt in range(self.MAX_BATCH_ATTEMPTS):
+                response = self.client.batch_write_item(RequestItems=request)
+                request = response.get("UnprocessedItems") or {}
+                if not request:
+                    break
+                time.sleep(self.BATCH_RETRY_DELAY * 2**attempt)
+            else:
+                raise RuntimeError("DynamoDB kept items unprocessed")
+            for state in chunk:
+                state.version += 1
+                state.mark_clean()
+
+
+_repository: Optional[UserStateRepository] = None
+
+
+def get_repository() -> Optional[UserStateRepository]:
+    """Repository of PREFERENCES_TABLE, None when the table is not configured."""
+    global _repository
+    table_name = os.getenv("PREFERENCES_TABLE")
+    if not table_name:
+        return None
+    if _repository is None or _repository.table_name != table_name:
+        _repository = UserStateRepository(table_name)
+    return _repository
+
+
+def get_user_state(handler_input) -> UserState:
+    """Return the invocation's user state, read on first use.
+
+    Never raises: without a table, or if the read fails, an empty state is
+    returned. A failed read sets load_failed and its changes are not
+    flushed, so the stored item is never overwritten by a blind write.
+    """
+    request_attributes = handler_input.attributes_manager.request_attributes
+    state = request_attributes.get(REQUEST_ATTRIBUTE)
+    if state is not None:
+        return state
+
+    user_id = handler_input.request_envelope.context.system.user.user_id
+    repository = get_repository()
+    if repository is None:
+        state = UserState(user_id)
+    else:
+        try:
+            state = repository.load(user_id)
+        except Exception as e:
+            logger.warning(
+                "Failed to load user state",
+                extra={"error_type": type(e).__name__, "error_message": str(e)},
+            )
+            state = UserState(user_id, load_failed=True)
+
+    request_attributes[REQUEST_ATTRIBUTE] = state
+    return state
+
+
+class UserStateResponseInterceptor(AbstractResponseInterceptor):
+    """Flush the invocation's user state changes before responding."""
+
+    def process(self, handler_input, response):
+        state = handler_input.attributes_manager.request_attributes.get(
+            REQUEST_ATTRIBUTE
+        )
+        if state is None or not state.dirty:
+            return
+        repository = get_repository()
+        if repository is None or state.load_failed:
+            logger.warning(
+                "User state changes dropped",
+                extra={"reason": "no table" if repository is None else "load failed"},
+            )
+            return
+        repository.flush(state)
@@ -0,0 +1,135 @@
+"""Non-blocking counterpart of the ask-sdk DefaultApiClient.
+
+The generated ask-sdk service clients call ApiClient.invoke synchronously,
+so the few Alexa service APIs the skill uses are exposed here as coroutines
+that build the same ApiClientRequest, go through AsyncApiClient and map
+responses the way BaseServiceClient does (ServiceException on non-2xx).
+"""
+
+import json
+from urllib.parse import quote
+
+import aiohttp
+from ask_sdk_core.serialize import DefaultSerializer
+from ask_sdk_model.services import (
+    ApiClientRequest,
+    ApiClientResponse,
+    ServiceException,
+)
+
+from services.async_http import get_session
+
+REQUEST_TIMEOUT = 5
+
+
+class AsyncApiClient:
+    """ApiClient contract with a coroutine invoke, backed by the pooled session."""
+
+    async def invoke(self, request: ApiClientRequest) -> ApiClientResponse:
+        headers = dict(request.headers or [])
+        data = request.body
+        if data and "json" in headers.get("Content-type", ""):
+            data = json.dumps(data)
+
+        try:
+            async with get_session().request(
+                request.method,
+                request.url,
+                headers=headers,
+                data=data,
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            ) as response:
+                body = await response.text()
+                return ApiClientResponse(
+                    headers=list(response.headers.items()),
+                    body=body,
+                    status_code=response.status,
+                )
+        except Exception as e:
+            raise ServiceException(
+                message="Call to service failed: {}".format(str(e)),
+                status_code=500,
+                headers=None,
+                body=None,
+            )
+
+
+class AsyncAlexaServiceClient:
+    """Async calls to the Alexa service APIs used by the skill."""
+
+    TIMEZONE_PATH = "/v2/devices/{deviceId}/settings/System.timeZone"
+    FULL_ADDRESS_PATH = "/v1/devices/{deviceId}/settings/address"
+    REMINDERS_PATH = "/v1/alerts/reminders"
+    REMINDER_PATH = "/v1/alerts/reminders/{alertToken}"
+
+    _serializer = DefaultSerializer()
+    _api_client = AsyncApiClient()
+
+    def __init__(self, api_endpoint: str, api_access_token: str):
+        self.api_endpoint = api_endpoint.rstrip("/")
+        self.api_access_token = api_access_token
+
+    @classmethod
+    def from_envelope(cls, req_envelope) -> "AsyncAlexaServiceClient":
+        system = req_envelope.context.system
+        return cls(system.api_endpoint, system.api_access_token)
+
+    async def get_system_time_zone(self, device_id: str) -> str:
+        return await self._invoke(
+            "GET", self.TIMEZONE_PATH.format(deviceId=quote(device_id, safe="")), "str"
+        )
+
+    async def get_full_address(self, device_id: str):
+        return await self._invoke(
+            "GET",
+            self.FULL_ADDRESS_PATH.format(deviceId=quote(device_id, safe="")),
+            "ask_sdk_model.services.device_address.address.Address",
+        )
+
+    async def create_reminder(self, reminder_request):
+        return await self._invoke(
+            "POST",
+            self.REMINDERS_PATH,
+            "ask_sdk_model.services.reminder_management.reminder_response.ReminderResponse",
+            body=reminder_request,
+        )
+
+    async def delete_reminder(self, alert_token: str) -> None:
+        await self._invoke(
+            "DELETE",
+            self.REMINDER_PATH.format(alertToken=quote(alert_token, safe="")),
+            None,
+        )
+
+    async def _invoke(self, method: str, path: str, response_type: str, body=None):
+        request = ApiClientRequest(
+            headers=[
+                ("Content-type", "application/json"),
+                ("Authorization", "Bearer " + self.api_access_token),
+            ],
+            body=self._serializer.serialize(body) if body else None,
+            url=self.api_endpoint + path,
+            method=method,
+        )
+        response = await self._api_client.invoke(request)
+
+        if response.status_code is None:
+            raise ServiceException(
+                message="Invalid Response, no status code",
+                status_code=500,
+                headers=None,
+                body=None,
+            )
+        if 200 <= response.status_code < 300:
+            if response.status_code == 204 or not response.body:
+                return None
+            return self._serializer.deserialize(
+                payload=response.body, obj_type=response_type
+            )
+
+        raise ServiceException(
+            message="Unknown error",
+            status_code=response.status_code,
+            headers=response.headers,
+            body=response.body,
+        )
@@ -0,0 +1,89 @@
+"""Event loop and pooled aiohttp session shared across warm invocations.
+
+Handlers stay synchronous: each invocation drives its concurrent I/O with a
+single run() on the container's loop, and the session (connection pool, DNS
+cache, keep-alive connections) survives from one invocation to the next.
+"""
+
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+USER_AGENT = "AlexaAdhanSkill/1.0"
+POOL_SIZE = 32
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop
+
+
+def run(coroutine):
+    """Run a coroutine to completion on the container's event loop."""
+    return get_loop().run_until_complete(coroutine)
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the pooled session, must be called from a coroutine on the loop."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=POOL_SIZE,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ),
+            headers={"User-Agent": USER_AGENT},
+        )
+    return _session
+
+
+def close() -> None:
+    """Close the session and the loop, for scripts about to exit.
+
+    Lambda containers never call it, the session lives as long as they do.
+    """
+    global _loop, _session
+    if _session is not None and not _session.closed:
+        run(_session.close())
+    _session = None
+    if _loop is not None and not _loop.is_closed():
+        _loop.close()
+    _loop = None
+
+
+async def get_json(
+    url: str,
+    params: Optional[dict] = None,
+    timeout: float = 5,
+    raise_for_status: bool = True,
+):
+    """GET a JSON document.
+
+    Returns:
+        Tuple of the status code and the decoded body, None if the
+        response is not JSON
+
+    Raises:
+        aiohttp.ClientResponseError: On 4xx/5xx when raise_for_status is set
+        asyncio.TimeoutError: When the request exceeds the timeout
+    """
+    async with get_session().get(
+        url,
+        params=params,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        raise_for_status=raise_for_status,
+    ) as response:
+        try:
+            body = await response.json(content_type=None)
+        except ValueError:
+            body = None
+        return response.status, body
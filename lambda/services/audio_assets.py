@@ -0,0 +1,83 @@
+"""Adhan audio variants, from the manifest of scripts/build_audio_assets.py.
+
+The manifest is read once per container, at import. The variant played is
+the one with the shortest time to first audio the device and the user's
+Adhan preference allow: mobile devices, often on cellular links, get the
+low bitrate encode, speakers the normalized one, and users who chose
+"takbir" the opening takbir only. Without a manifest the source recording
+in media/, the manifest's "original" variant, is played.
+"""
+
+import json
+import os
+from typing import Optional, Tuple
+
+from aws_lambda_powertools import Logger
+
+from services.geolocation_service import device_supports_geolocation
+from services.preferences_service import FULL_ADHAN, TAKBIR_ONLY
+
+logger = Logger(service="audio_assets")
+
+MANIFEST_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "assets",
+    "adhan_manifest.json",
+)
+# The source recording uploaded from media/, see `make upload-media`
+LEGACY_FILE = "a1.mp3"
+LEGACY_VARIANT = "legacy"
+
+# Adhan preference -> device class -> variants in order of preference, the
+# first one present in the manifest is played.
+VARIANT_ORDER = {
+    FULL_ADHAN: {
+        "mobile": ("low", "normalized", "trimmed", "original"),
+        "speaker": ("normalized", "trimmed", "low", "original"),
+    },
+    TAKBIR_ONLY: {
+        "mobile": ("takbir", "low", "normalized", "trimmed", "original"),
+        "speaker": ("takbir", "normalized", "trimmed", "low", "original"),
+    },
+}
+
+
+def load_manifest(path: Optional[str] = None) -> dict:
+    """Variants of the manifest at path, empty if it is missing or invalid."""
+    path = path or os.getenv("ADHAN_MANIFEST_PATH", MANIFEST_PATH)
+    try:
+        with open(path) as f:
+            return json.load(f)["variants"]
+    except FileNotFoundError:
+        logger.info("No Adhan manifest, playing the legacy file")
+    except (ValueError, KeyError, TypeError) as e:
+        logger.error(
+            "Invalid Adhan manifest, playing the legacy file",
+            extra={"error_type": type(e).__name__, "error_message": str(e)},
+        )
+    return {}
+
+
+_variants = load_manifest()
+
+
+def choose_variant(
+    adhan: str = FULL_ADHAN, device_class: str = "speaker"
+) -> Tuple[str, str]:
+    """Return the (variant, file) to play."""
+    order = VARIANT_ORDER.get(adhan, VARIANT_ORDER[FULL_ADHAN])
+    for variant in order.get(device_class, order["speaker"]):
+        entry = _variants.get(variant)
+        if entry:
+            return variant, entry["file"]
+    return LEGACY_VARIANT, LEGACY_FILE
+
+
+def device_class(req_envelope) -> str:
+    """mobile for devices sending their coordinates, speaker otherwise."""
+    return "mobile" if device_supports_geolocation(req_envelope) else "speaker"
+
+
+def reload(path: Optional[str] = None) -> None:
+    global _variants
+    _variants = load_manifest(path)
@@ -0,0 +1,288 @@
+"""Per-upstream circuit breakers shared across warm invocations.
+
+State lives in process and, when CIRCUIT_BREAKER_TABLE is set, is mirrored to
+DynamoDB so that every container stops calling a failing upstream together.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from aws_lambda_powertools import Logger
+
+from repositories.dynamodb import get_client
+
+logger = Logger(service="circuit_breaker")
+
+ALADHAN = "aladhan"
+ALADHAN_MIRROR = "aladhan_mirror"
+NOMINATIM = "nominatim"
+ALEXA_API = "alexa_api"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, name: str):
+        super().__init__(f"Circuit breaker '{name}' is open")
+        self.name = name
+
+
+class DynamoDBBreakerStore:
+    """Mirror of breaker trips in DynamoDB, read at most every SYNC_INTERVAL."""
+
+    SYNC_INTERVAL = 10
+    KEY_PREFIX = "circuit#"
+
+    def __init__(self, table_name: str):
+        self.table_name = table_name
+
+    @property
+    def client(self):
+        return get_client()
+
+    def load(self, name: str) -> Optional[float]:
+        """Return the epoch until which the breaker is open elsewhere."""
+        try:
+            item = self.client.get_item(
+                TableName=self.table_name,
+                Key={"userId": {"S": self.KEY_PREFIX + name}},
+                ConsistentRead=False,
+            ).get("Item")
+        except Exception as e:
+            logger.warning(
+                "Failed to load shared breaker state",
+                extra={"breaker": name, "error": str(e)},
+            )
+            return None
+        if not item or "openUntil" not in item:
+            return None
+        return float(item["openUntil"]["N"])
+
+    def save(self, name: str, open_until: float) -> None:
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    "userId": {"S": self.KEY_PREFIX + name},
+                    "openUntil": {"N": str(open_until)},
+                },
+            )
+        except Exception as e:
+            logger.warning(
+                "Failed to save shared breaker state",
+                extra={"breaker": name, "error": str(e)},
+            )
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        cooldown_seconds: float = 30,
+        half_open_probes: int = 1,
+        store: Optional[DynamoDBBreakerStore] = None,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.half_open_probes = half_open_probes
+        self.store = store
+
+        self._calls = deque()
+        self._state = CLOSED
+        self._open_until = 0.0
+        self._probes_in_flight = 0
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._update_state(time.time())
+            return self._state
+
+    def allow_request(self) -> bool:
+        if self.name in _forced_open():
+            return False
+
+        now = time.time()
+        self._sync(now)
+        with self._lock:
+            self._update_state(now)
+            if self._state == CLOSED:
+                return True
+            if (
+                self._state == HALF_OPEN
+                and self._probes_in_flight < self.half_open_probes
+            ):
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                logger.info("Circuit breaker closed", extra={"breaker": self.name})
+                self._state = CLOSED
+                self._probes_in_flight = 0
+                self._calls.clear()
+            self._record(time.time(), True)
+
+    def record_failure(self) -> None:
+        now = time.time()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trip(now)
+            else:
+                self._record(now, False)
+                failures = sum(1 for _, ok in self._calls if not ok)
+                if (
+                    self._state == CLOSED
+                    and len(self._calls) >= self.min_calls
+                    and failures / len(self._calls) >= self.failure_rate
+                ):
+                    self._trip(now)
+            open_until = self._open_until if self._state == OPEN else None
+
+        if open_until is not None and self.store is not None:
+            self.store.save(self.name, open_until)
+
+    def call(
+        self,
+        func: Callable,
+        *args,
+        is_failure: Callable[[Exception], bool] = lambda e: True,
+        **kwargs,
+    ):
+        """Call func through the breaker.
+
+        Args:
+            func: The upstream call
+            is_failure: Tells whether an exception counts against the
+                upstream, e.g. a 403 is the user's problem, not an outage
+
+        Raises:
+            CircuitOpenError: If the breaker does not allow the call
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(self.name)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(
+        self,
+        func: Callable,
+        *args,
+        is_failure: Callable[[Exception], bool] = lambda e: True,
+        **kwargs,
+    ):
+        """Coroutine counterpart of call, func returns an awaitable."""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name)
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            # A hedged call lost the race, it says nothing about the upstream.
+            self._release_probe()
+            raise
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def _release_probe(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    def _record(self, now: float, ok: bool) -> None:
+        self._calls.append((now, ok))
+        while self._calls and self._calls[0][0] < now - self.window_seconds:
+            self._calls.popleft()
+
+    def _trip(self, now: float) -> None:
+        logger.warning(
+            "Circuit breaker opened",
+            extra={"breaker": self.name, "cooldown_seconds": self.cooldown_seconds},
+        )
+        self._state = OPEN
+        self._open_until = now + self.cooldown_seconds
+        self._probes_in_flight = 0
+        self._calls.clear()
+
+    def _update_state(self, now: float) -> None:
+        if self._state == OPEN and now >= self._open_until:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+
+    def _sync(self, now: float) -> None:
+        if self.store is None or now - self._last_sync < self.store.SYNC_INTERVAL:
+            return
+        self._last_sync = now
+        open_until = self.store.load(self.name)
+        if open_until is None or open_until <= now:
+            return
+        with self._lock:
+            if self._state == CLOSED:
+                logger.info(
+                    "Circuit breaker opened by another container",
+                    extra={"breaker": self.name},
+                )
+                self._state = OPEN
+                self._open_until = open_until
+                self._calls.clear()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the process wide breaker of an upstream."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            table_name = os.getenv("CIRCUIT_BREAKER_TABLE")
+            breaker = CircuitBreaker(
+                name,
+                store=DynamoDBBreakerStore(table_name) if table_name else None,
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def is_server_error(exception: Exception) -> bool:
+    """Failure predicate for ask-sdk service calls: only 5xx and transport errors."""
+    status_code = getattr(exception, "status_code", None)
+    return status_code is None or status_code >= 500
+
+
+def _forced_open() -> set:
+    """Upstreams disabled by the operator through CIRCUIT_BREAKER_FORCE_OPEN."""
+    value = os.getenv("CIRCUIT_BREAKER_FORCE_OPEN", "")
+    return {name.strip() for name in value.split(",") if name.strip()}
@@ -0,0 +1,200 @@
+"""Lazy request envelope decoding and compiled response encoding.
+
+The handler returned by the ask-sdk SkillBuilder dumps the Lambda event
+back to JSON, parses it again and has DefaultSerializer build every model
+of the envelope, most of context.System (supported interfaces, viewport,
+unit, person...) included, then serializes the response by rebuilding the
+attribute map of each model it meets.
+
+EnvelopeCodec decodes the event dict lazily instead: each model attribute
+is decoded the first time it is read, so only what handlers actually touch
+(locale, intent, permissions, device id, geolocation...) is ever built.
+Decoded objects are instances of subclasses of the ask_sdk_model classes,
+so the isinstance checks of ask_sdk_core.utils keep working. Responses are
+encoded with a field table compiled once per model class.
+
+FastSkillBuilder plugs the codec into CustomSkillBuilder, ENVELOPE_CODEC
+set to "default" falls back to the ask-sdk handler.
+"""
+
+import datetime
+import decimal
+import os
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, Tuple
+
+from ask_sdk_core.exceptions import SerializationException
+from ask_sdk_core.skill import CustomSkill
+from ask_sdk_core.skill_builder import CustomSkillBuilder
+from ask_sdk_model import RequestEnvelope
+
+PRIMITIVES = (str, int, float, bool, bytes)
+
+
+class _LazyModel:
+    """Decodes the attributes of a generated model from its raw payload on
+    first access. Mixed in ahead of the model class by _lazy_class."""
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not decoded yet.
+        fields = type(self)._lazy_fields
+        raw = self.__dict__.get("_raw")
+        if raw is None or name not in fields:
+            raise AttributeError(name)
+        key, type_name = fields[name]
+        value = raw.get(key)
+        value = _decoder(type_name)(value) if value is not None else None
+        self.__dict__[name] = value
+        return value
+
+
+@lru_cache(maxsize=None)
+def _lazy_class(model_class: type) -> type:
+    attribute_map = getattr(model_class, "attribute_map", {})
+    fields = {
+        name: (attribute_map.get(name, name), type_name)
+        for name, type_name in model_class.deserialized_types.items()
+    }
+    return type(
+        model_class.__name__,
+        (_LazyModel, model_class),
+        {"__module__": model_class.__module__, "_lazy_fields": fields},
+    )
+
+
+def _load_class(class_name: str) -> type:
+    module_name, _, name = class_name.rpartition(".")
+    try:
+        return getattr(__import__(module_name, fromlist=[name]), name)
+    except Exception as e:
+        raise SerializationException(
+            f"Unable to resolve class {class_name} from installed modules: {e}"
+        )
+
+
+def _decode_datetime(value: str) -> datetime.datetime:
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        from dateutil.parser import parse
+
+        return parse(value)
+
+
+@lru_cache(maxsize=None)
+def _decoder(type_name: str) -> Callable[[Any], Any]:
+    """Compile the decoder of a deserialized_types type name."""
+    if type_name.startswith("list["):
+        item = type_name[5:-1].strip()
+        # Only the unused list[a, b] tuple form has commas, decode as is.
+        if "," in item:
+            return lambda value: value
+        decode_item = _decoder(item)
+        return lambda value: [decode_item(v) for v in value]
+    if type_name.startswith("dict("):
+        decode_value = _decoder(type_name[5:-1].split(",", 1)[1].strip())
+        return lambda value: {k: decode_value(v) for k, v in value.items()}
+    if type_name in ("str", "int", "float", "bool"):
+        cast = {"str": str, "int": int, "float": float, "bool": bool}[type_name]
+        return lambda value: value if type(value) is cast else cast(value)
+    if type_name == "object":
+        return lambda value: value
+    if type_name == "datetime":
+        return _decode_datetime
+    if type_name == "date":
+        return lambda value: _decode_datetime(value).date()
+
+    model_class = _load_class(type_name)
+    if issubclass(model_class, Enum):
+        return model_class
+    if not hasattr(model_class, "deserialized_types"):
+        return lambda value: value
+    if hasattr(model_class, "get_real_child_model"):
+        return lambda value: _materialize(_child_class(model_class, value), value)
+    return lambda value: _materialize(model_class, value)
+
+
+def _child_class(model_class: type, value: dict) -> type:
+    class_name = model_class.get_real_child_model(value)
+    if not class_name:
+        raise SerializationException(
+            f"Couldn't resolve object by discriminator type for {model_class} class"
+        )
+    return _load_class(class_name)
+
+
+def _materialize(model_class: type, value: Any) -> Any:
+    if not isinstance(value, dict):
+        return model_class()
+    instance = object.__new__(_lazy_class(model_class))
+    instance.__dict__["_raw"] = value
+    return instance
+
+
+@lru_cache(maxsize=None)
+def _fields(model_class: type) -> Tuple[Tuple[str, str], ...]:
+    """(attribute, JSON key) pairs of a model class, the encoding template."""
+    attribute_map = getattr(model_class, "attribute_map", {})
+    return tuple(
+        (name, attribute_map.get(name, name)) for name in model_class.deserialized_types
+    )
+
+
+def encode(obj: Any) -> Any:
+    """Same output as DefaultSerializer.serialize, with compiled field tables."""
+    if obj is None or isinstance(obj, PRIMITIVES):
+        return obj
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(encode(item) for item in obj)
+    if isinstance(obj, dict):
+        return {key: encode(value) for key, value in obj.items()}
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+
+    encoded: Dict[str, Any] = {}
+    for name, key in _fields(type(obj)):
+        value = getattr(obj, name)
+        if value is not None:
+            encoded[key] = encode(value)
+    return encoded
+
+
+class EnvelopeCodec:
+    @staticmethod
+    def decode_request(event: dict) -> RequestEnvelope:
+        return _materialize(RequestEnvelope, event)
+
+    @staticmethod
+    def encode_response(response_envelope) -> dict:
+        return encode(response_envelope)
+
+
+class FastSkillBuilder(CustomSkillBuilder):
+    """CustomSkillBuilder whose Lambda handler goes through EnvelopeCodec.
+
+    The skill is also created once per container rather than once per
+    invocation, it holds no request state.
+    """
+
+    def lambda_handler(self):
+        if os.getenv("ENVELOPE_CODEC", "fast") == "default":
+            return super().lambda_handler()
+
+        skill = None
+
+        def wrapper(event, context):
+            nonlocal skill
+            if skill is None:
+                skill = CustomSkill(skill_configuration=self.skill_configuration)
+            request_envelope = EnvelopeCodec.decode_request(event)
+            response_envelope = skill.invoke(
+                request_envelope=request_envelope, context=context
+            )
+            return EnvelopeCodec.encode_response(response_envelope)
+
+        return wrapper
@@ -0,0 +1,70 @@
+"""Geohash cells, used to group nearby users under one location key.
+
+A geohash of precision p splits longitude into 2**ceil(5p/2) and latitude
+into 2**floor(5p/2) equal bands, so a cell is also addressable as integer
+(row, column) coordinates, which is what the timetable file indexes on.
+"""
+
+from typing import Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def grid_bits(precision: int) -> Tuple[int, int]:
+    """Return the number of latitude and longitude bits of a precision."""
+    bits = precision * 5
+    return bits // 2, bits - bits // 2
+
+
+def cell_of(latitude: float, longitude: float, precision: int) -> Tuple[int, int]:
+    """Return the (row, column) of the cell containing a point."""
+    lat_bits, lon_bits = grid_bits(precision)
+    row = int((latitude + 90.0) / 180.0 * (1 << lat_bits))
+    column = int((longitude + 180.0) / 360.0 * (1 << lon_bits))
+    return min(row, (1 << lat_bits) - 1), min(column, (1 << lon_bits) - 1)
+
+
+def cell_center(row: int, column: int, precision: int) -> Tuple[float, float]:
+    lat_bits, lon_bits = grid_bits(precision)
+    lat_size = 180.0 / (1 << lat_bits)
+    lon_size = 360.0 / (1 << lon_bits)
+    return -90.0 + (row + 0.5) * lat_size, -180.0 + (column + 0.5) * lon_size
+
+
+def encode(latitude: float, longitude: float, precision: int) -> str:
+    """Return the geohash string of a point."""
+    row, column = cell_of(latitude, longitude, precision)
+    lat_bits, lon_bits = grid_bits(precision)
+
+    # Interleave bits starting with longitude, then split in 5 bit chars.
+    value = 0
+    for bit in range(precision * 5):
+        if bit % 2 == 0:
+            lon_bits -= 1
+            value = (value << 1) | ((column >> lon_bits) & 1)
+        else:
+            lat_bits -= 1
+            value = (value << 1) | ((row >> lat_bits) & 1)
+
+    chars = []
+    for _ in range(precision):
+        chars.append(_BASE32[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def decode(geohash: str) -> Tuple[float, float]:
+    """Return the center of a geohash cell."""
+    precision = len(geohash)
+    value = 0
+    for char in geohash:
+        value = (value << 5) | _BASE32.index(char)
+
+    row = column = 0
+    for bit in range(precision * 5):
+        current = (value >> (precision * 5 - 1 - bit)) & 1
+        if bit % 2 == 0:
+            column = (column << 1) | current
+        else:
+            row = (row << 1) | current
+    return cell_center(row, column, precision)
@@ -1,30 +1,159 @@
-from typing import Optional
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
 
+import aiohttp
 import requests
 from ask_sdk_model.services import ServiceException
 from aws_lambda_powertools import Logger
 
+from services import async_http
+from services.circuit_breaker import (
+    ALEXA_API,
+    NOMINATIM,
+    CircuitOpenError,
+    get_breaker,
+    is_server_error,
+)
 from speech_text import get_speech_text
 
 logger = Logger(service="geolocation_service")
 
+NOMINATIM_TIMEOUT = 3
+# Geocoded coordinates of stationary devices, so a session's follow-up
+# requests skip the Device Settings API and Nominatim round trips. Kept
+# short: an address change or a revoked permission shows within the TTL.
+DEVICE_LOCATION_TTL = 300
+MAX_DEVICE_LOCATIONS = 4096
+_device_locations: "OrderedDict[str, tuple]" = OrderedDict()
+_device_locations_lock = threading.Lock()
+
+
+def _cached_location(device_id: str) -> Optional[Tuple[float, float]]:
+    with _device_locations_lock:
+        cached = _device_locations.get(device_id)
+        if cached is None:
+            return None
+        coordinates, expires_at = cached
+        if time.time() >= expires_at:
+            del _device_locations[device_id]
+            return None
+        _device_locations.move_to_end(device_id)
+        return coordinates
+
+
+def _remember_location(device_id: str, coordinates: Tuple[float, float]) -> None:
+    with _device_locations_lock:
+        _device_locations[device_id] = (coordinates, time.time() + DEVICE_LOCATION_TTL)
+        _device_locations.move_to_end(device_id)
+        while len(_device_locations) > MAX_DEVICE_LOCATIONS:
+            _device_locations.popitem(last=False)
+
 
 def get_city_name(lat: float, lon: float) -> Optional[str]:
     try:
         url = f"https://nominatim.openstreetmap.org/reverse?lat={lat}&lon={lon}&format=json"
         headers = {"User-Agent": "AlexaAdhanSkill/1.0"}
-        response = requests.get(url, headers=headers)
+        response = _nominatim_get(url, headers)
         if response.status_code == 200:
             data = response.json()
             return data.get("address", {}).get("city") or data.get("address", {}).get(
                 "town"
             )
         return None
+    except CircuitOpenError:
+        return None
+    except Exception as e:
+        logger.error("Error getting city name", extra={"error_message": str(e)})
+        return None
+
+
+async def get_city_name_async(lat: float, lon: float) -> Optional[str]:
+    """Coroutine variant of get_city_name on the pooled session."""
+    try:
+        url = "https://nominatim.openstreetmap.org/reverse"
+        status, data = await get_breaker(NOMINATIM).call_async(
+            _nominatim_get_async,
+            url,
+            {"lat": lat, "lon": lon, "format": "json"},
+        )
+        if status == 200 and data:
+            return data.get("address", {}).get("city") or data.get("address", {}).get(
+                "town"
+            )
+        return None
+    except CircuitOpenError:
+        return None
     except Exception as e:
         logger.error("Error getting city name", extra={"error_message": str(e)})
         return None
 
 
+async def _nominatim_get_async(url: str, params: dict):
+    status, data = await async_http.get_json(
+        url, params=params, timeout=NOMINATIM_TIMEOUT, raise_for_status=False
+    )
+    if status >= 500 or status == 429:
+        raise aiohttp.ClientResponseError(None, (), status=status)
+    return status, data
+
+
+def _nominatim_get(url: str, headers: dict):
+    """GET Nominatim through its breaker, 5xx and 429 count as failures."""
+
+    def get():
+        response = requests.get(url, headers=headers, timeout=NOMINATIM_TIMEOUT)
+        if response.status_code >= 500 or response.status_code == 429:
+            response.raise_for_status()
+        return response
+
+    return get_breaker(NOMINATIM).call(get)
+
+
+def get_device_timezone(req_envelope, service_client_factory) -> Optional[str]:
+    """Get the timezone configured on the device, None if unavailable."""
+    device_id = req_envelope.context.system.device.device_id
+    try:
+        return service_client_factory.get_ups_service().get_system_time_zone(device_id)
+    except Exception as e:
+        logger.error(
+            "Failed to get user timezone",
+            extra={
+                "error_type": type(e).__name__,
+                "error": str(e),
+                "device_id": device_id,
+            },
+        )
+        return None
+
+
+async def get_device_timezone_async(alexa_client, device_id: str) -> Optional[str]:
+    """Coroutine variant of get_device_timezone.
+
+    Args:
+        alexa_client: AsyncAlexaServiceClient of the request
+        device_id: The device to get the timezone of
+    """
+    try:
+        return await get_breaker(ALEXA_API).call_async(
+            alexa_client.get_system_time_zone,
+            device_id,
+            is_failure=is_server_error,
+        )
+    except Exception as e:
+        logger.error(
+            "Failed to get user timezone",
+            extra={
+                "error_type": type(e).__name__,
+                "error": str(e),
+                "device_id": device_id,
+            },
+        )
+        return None
+
+
 def get_coordinates_from_address(address_parts: dict) -> Optional[tuple[float, float]]:
     try:
         address_components = []
@@ -49,7 +178,7 @@ def get_coordinates_from_address(address_parts: dict) -> Optional[tuple[float, f
         url = f"https://nominatim.openstreetmap.org/search?q={query}&format=json&countrycodes=fr&limit=1"
         headers = {"User-Agent": "AlexaAdhanSkill/1.0"}
 
-        response = requests.get(url, headers=headers)
+        response = _nominatim_get(url, headers)
         if response.status_code == 200:
             results = response.json()
             if results:
@@ -65,6 +194,9 @@ def get_coordinates_from_address(address_parts: dict) -> Optional[tuple[float, f
                 },
             )
         return None
+    except CircuitOpenError:
+        logger.warning("Geocoding skipped, Nominatim circuit breaker is open")
+        return None
     except Exception as e:
         logger.error(
             "Error converting address to coordinates",
@@ -77,6 +209,49 @@ def get_coordinates_from_address(address_parts: dict) -> Optional[tuple[float, f
         return None
 
 
+def device_supports_geolocation(req_envelope) -> bool:
+    """Whether the device sends its coordinates (mobile) in the request."""
+    supported_interfaces = req_envelope.context.system.device.supported_interfaces
+    return (
+        hasattr(supported_interfaces, "geolocation")
+        and supported_interfaces.geolocation is not None
+    )
+
+
+async def get_device_coordinates_async(
+    alexa_client, device_id: str
+) -> Optional[tuple[float, float]]:
+    """Geocode the address set on a stationary device, out of session.
+
+    Shares the per-device cache of get_device_location.
+
+    Raises:
+        ServiceException: If the Device Settings API refuses the address
+    """
+    cached = _cached_location(device_id)
+    if cached is not None:
+        return cached
+
+    addr = await get_breaker(ALEXA_API).call_async(
+        alexa_client.get_full_address,
+        device_id,
+        is_failure=is_server_error,
+    )
+    address_parts = {
+        "addressLine1": addr.address_line1,
+        "city": addr.city,
+        "stateOrRegion": addr.state_or_region,
+        "postalCode": addr.postal_code,
+        "countryCode": addr.country_code,
+    }
+    coordinates = await asyncio.get_running_loop().run_in_executor(
+        None, get_coordinates_from_address, address_parts
+    )
+    if coordinates:
+        _remember_location(device_id, coordinates)
+    return coordinates
+
+
 def get_device_location(
     req_envelope, response_builder, service_client_factory=None
 ) -> tuple:
@@ -84,11 +259,7 @@ def get_device_location(
     texts = get_speech_text(locale)
 
     # Check if device supports geolocation
-    supports_geolocation = (
-        hasattr(req_envelope.context.system.device.supported_interfaces, "geolocation")
-        and req_envelope.context.system.device.supported_interfaces.geolocation
-        is not None
-    )
+    supports_geolocation = device_supports_geolocation(req_envelope)
 
     logger.info(
         "Checking device capabilities",
@@ -199,12 +370,21 @@ def get_device_location(
                 ).response,
             )
 
+        device_id = req_envelope.context.system.device.device_id
+        cached = _cached_location(device_id)
+        if cached is not None:
+            return True, cached
+
         try:
-            device_id = req_envelope.context.system.device.device_id
             device_addr_client = service_client_factory.get_device_address_service()
+            alexa_breaker = get_breaker(ALEXA_API)
 
             try:
-                addr = device_addr_client.get_full_address(device_id)
+                addr = alexa_breaker.call(
+                    device_addr_client.get_full_address,
+                    device_id,
+                    is_failure=is_server_error,
+                )
 
                 logger.info(
                     "Retrieved address from Device Settings API",
@@ -220,8 +400,10 @@ def get_device_location(
                 }
 
             except ServiceException:
-                addr_response = device_addr_client.get_country_and_postal_code(
-                    device_id
+                addr_response = alexa_breaker.call(
+                    device_addr_client.get_country_and_postal_code,
+                    device_id,
+                    is_failure=is_server_error,
                 )
                 address_parts = {
                     "postalCode": addr_response.postal_code,
@@ -241,6 +423,7 @@ def get_device_location(
                     "Successfully converted address to coordinates",
                     extra={"latitude": latitude, "longitude": longitude},
                 )
+                _remember_location(device_id, coordinates)
                 return True, coordinates
 
             logger.error("Failed to convert address to coordinates")
@@ -0,0 +1,195 @@
+"""Hedged upstream requests shared across warm invocations.
+
+A hedged call starts the primary source alone. If it has not answered
+within the hedge delay, or failed before, the secondary source is started
+too: the first of the two to return wins and the other is cancelled.
+
+The hedge delay is the HEDGE_PERCENTILE of the primary's latency over its
+last LATENCY_WINDOW calls, DEFAULT_DELAY until MIN_SAMPLES are known, so
+only the slowest calls are hedged however fast the upstream usually is. A
+primary beaten by the secondary is not cancelled: it finishes in the
+background and its real latency is recorded, so the delay rises when the
+upstream slows down instead of staying below every hedged call.
+
+Each container logs its hedge rate and which source won every
+STATS_LOG_INTERVAL, to tune the percentile against the extra load.
+"""
+
+import asyncio
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from aws_lambda_powertools import Logger
+
+logger = Logger(service="hedging")
+
+PRIMARY = "primary"
+SECONDARY = "secondary"
+
+HEDGE_PERCENTILE = 0.9
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+DEFAULT_DELAY = 1.0
+MIN_DELAY = 0.05
+MAX_DELAY = 1.5
+STATS_LOG_INTERVAL = 60
+
+
+class Hedge:
+    def __init__(self, name: str):
+        self.name = name
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._counts = Counter()
+        self._last_log = time.monotonic()
+        self._lock = threading.Lock()
+        # Primaries finishing in the background, referenced until done.
+        self._background = set()
+
+    def delay(self) -> float:
+        """Seconds the primary is given before the secondary is started."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < MIN_SAMPLES:
+            return DEFAULT_DELAY
+        percentile = latencies[int(HEDGE_PERCENTILE * (len(latencies) - 1))]
+        return min(max(percentile, MIN_DELAY), MAX_DELAY)
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[Any]],
+        secondary: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Tuple[Any, str]:
+        """Await primary(), hedged with secondary() if given.
+
+        Returns:
+            The first result and the source, PRIMARY or SECONDARY, it came from
+
+        Raises:
+            Exception: The primary's error if every source started failed
+        """
+        started = time.monotonic()
+        delay = self.delay()
+        pending = {asyncio.ensure_future(primary()): PRIMARY}
+        errors = {}
+        hedged = False
+        winner = None
+        try:
+            while pending:
+                waiting_to_hedge = secondary is not None and not hedged
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=(
+                        max(0.0, started + delay - time.monotonic())
+                        if waiting_to_hedge
+                        else None
+                    ),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    source = pending.pop(task)
+                    if task.exception() is None:
+                        winner = source
+                        if source == PRIMARY:
+                            self._record_latency(time.monotonic() - started)
+                        self._count(hedged, source, started, delay)
+                        return task.result(), source
+                    errors[source] = task.exception()
+                # Either the delay is over or the primary already failed.
+                if waiting_to_hedge:
+                    hedged = True
+                    pending[asyncio.ensure_future(secondary())] = SECONDARY
+            self._count(hedged, None, started, delay)
+            raise errors.get(PRIMARY) or errors[SECONDARY]
+        finally:
+            losers = []
+            for task, source in pending.items():
+                if source == PRIMARY and winner == SECONDARY:
+                    self._finish_in_background(task, started)
+                else:
+                    task.cancel()
+                    losers.append(task)
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+
+    def _finish_in_background(self, task: asyncio.Future, started: float) -> None:
+        """Record the real latency of a primary beaten by the secondary.
+
+        Its result is dropped, the primary caches what it fetched itself. On
+        Lambda it may only finish in the next invocation, the container is
+        frozen in between, so its latency is capped at MAX_DELAY: the delay
+        never exceeds it anyway.
+        """
+
+        def record(task: asyncio.Future) -> None:
+            self._background.discard(task)
+            if not task.cancelled() and task.exception() is None:
+                self._record_latency(min(time.monotonic() - started, MAX_DELAY))
+
+        self._background.add(task)
+        task.add_done_callback(record)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = self._counts.copy()
+        calls = counts["calls"]
+        return {
+            "hedge": self.name,
+            "calls": calls,
+            "hedged": counts["hedged"],
+            "hedge_rate": round(counts["hedged"] / calls, 3) if calls else 0.0,
+            "primary_wins": counts[PRIMARY],
+            "secondary_wins": counts[SECONDARY],
+            "hedged_primary_wins": counts["hedged_" + PRIMARY],
+            "failures": counts["failures"],
+            "delay_ms": round(self.delay() * 1000),
+        }
+
+    def _record_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _count(
+        self, hedged: bool, winner: Optional[str], started: float, delay: float
+    ) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._counts["calls"] += 1
+            if hedged:
+                self._counts["hedged"] += 1
+            if winner is None:
+                self._counts["failures"] += 1
+            else:
+                self._counts[winner] += 1
+                if hedged and winner == PRIMARY:
+                    self._counts["hedged_" + PRIMARY] += 1
+            log_stats = now - self._last_log >= STATS_LOG_INTERVAL
+            if log_stats:
+                self._last_log = now
+
+        if hedged:
+            logger.info(
+                "Hedged request",
+                extra={
+                    "hedge": self.name,
+                    "winner": winner,
+                    "delay_ms": round(delay * 1000),
+                    "duration_ms": round((now - started) * 1000),
+                },
+            )
+        if log_stats:
+            logger.info("Hedging stats", extra=self.stats())
+
+
+_hedges = {}
+_hedges_lock = threading.Lock()
+
+
+def get_hedge(name: str) -> Hedge:
+    """Return the process wide hedge of an upstream."""
+    with _hedges_lock:
+        hedge = _hedges.get(name)
+        if hedge is None:
+            hedge = _hedges[name] = Hedge(name)
+        return hedge
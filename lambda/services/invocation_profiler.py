@@ -0,0 +1,198 @@
+"""On-demand profiling of single Lambda invocations.
+
+PROFILE_SAMPLE_RATE is the share of invocations profiled, "1" for all of
+them. When it is unset or 0, profiled() returns the handler unchanged, so
+profiling costs nothing unless it is turned on.
+
+A profiled invocation runs under cProfile and tracemalloc. The top
+functions by cumulative and by own time and the top allocation sites are
+logged, tagged with the intent name (or request type). The gzipped pstats
+and tracemalloc snapshot are written where PROFILE_DUMP_URL says:
+"s3://bucket/prefix", or a local directory, /tmp/profiles by default,
+which also stands in for S3 when running locally. To read them back:
+
+    gunzip -c dump.pstats.gz > dump.pstats && python -m pstats dump.pstats
+    gunzip -c dump.tracemalloc.gz > dump.snapshot
+    python -c 'import tracemalloc; tracemalloc.Snapshot.load("dump.snapshot")'
+"""
+
+import cProfile
+import datetime
+import functools
+import gzip
+import io
+import marshal
+import os
+import pickle
+import pstats
+import random
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+from aws_lambda_powertools import Logger
+
+logger = Logger(service="invocation_profiler")
+
+DEFAULT_DUMP_URL = "/tmp/profiles"
+TOP_N = 15
+TRACEBACK_FRAMES = 10
+# Columns of pstats entries to rank functions by.
+OWN_TIME = 2
+CUMULATIVE_TIME = 3
+# Allocations made by the profilers themselves.
+IGNORED_ALLOCATIONS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+)
+
+
+class LocalDumpSink:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def write(self, key: str, data: bytes) -> str:
+        path = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+
+class S3DumpSink:
+    def __init__(self, bucket: str, prefix: str = "", client=None):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client("s3")
+        return self._client
+
+    def write(self, key: str, data: bytes) -> str:
+        key = f"{self.prefix}/{key}" if self.prefix else key
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+        return f"s3://{self.bucket}/{key}"
+
+
+def get_dump_sink(url: Optional[str] = None):
+    url = url or os.getenv("PROFILE_DUMP_URL") or DEFAULT_DUMP_URL
+    if url.startswith("s3://"):
+        bucket, _, prefix = url[len("s3://") :].partition("/")
+        return S3DumpSink(bucket, prefix)
+    return LocalDumpSink(url)
+
+
+def sample_rate() -> float:
+    try:
+        return min(max(float(os.getenv("PROFILE_SAMPLE_RATE") or 0), 0.0), 1.0)
+    except ValueError:
+        logger.warning("Invalid PROFILE_SAMPLE_RATE, profiling disabled")
+        return 0.0
+
+
+def profiled(handler: Callable) -> Callable:
+    """Wrap a Lambda handler to profile a sample of its invocations.
+
+    Returns the handler itself when profiling is disabled.
+    """
+    rate = sample_rate()
+    if not rate:
+        return handler
+    sink = get_dump_sink()
+    logger.info("Invocation profiling enabled", extra={"sample_rate": rate})
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if rate < 1 and random.random() >= rate:
+            return handler(event, context)
+        return profile_invocation(handler, event, context, sink)
+
+    return wrapper
+
+
+def profile_invocation(handler: Callable, event, context, sink):
+    """Run one invocation under cProfile and tracemalloc, then report it."""
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACEBACK_FRAMES)
+    profile = cProfile.Profile()
+    started = time.perf_counter()
+    try:
+        return profile.runcall(handler, event, context)
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        snapshot = tracemalloc.take_snapshot().filter_traces(IGNORED_ALLOCATIONS)
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+        try:
+            _report(event, profile, snapshot, duration_ms, peak, sink)
+        except Exception as e:
+            # Profiling must not fail the invocation
+            logger.warning(
+                "Failed to report invocation profile",
+                extra={"error_type": type(e).__name__, "error_message": str(e)},
+            )
+
+
+def _report(event, profile, snapshot, duration_ms, peak, sink) -> None:
+    request = (event or {}).get("request") or {}
+    label = (request.get("intent") or {}).get("name") or request.get("type", "unknown")
+    request_id = request.get("requestId") or str(int(time.time() * 1000))
+
+    profile.create_stats()
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    key = f"{datetime.date.today():%Y-%m-%d}/{label}/{request_id}"
+    dumps = [
+        sink.write(f"{key}.pstats.gz", gzip.compress(marshal.dumps(stats.stats))),
+        sink.write(
+            f"{key}.tracemalloc.gz",
+            gzip.compress(pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL)),
+        ),
+    ]
+
+    logger.info(
+        "Invocation profile",
+        extra={
+            "intent": label,
+            "request_id": request_id,
+            "duration_ms": round(duration_ms, 1),
+            "peak_memory_kb": peak // 1024,
+            "top_functions": _top_functions(stats, CUMULATIVE_TIME),
+            "hot_functions": _top_functions(stats, OWN_TIME),
+            "top_allocations": _top_allocations(snapshot),
+            "dumps": dumps,
+        },
+    )
+
+
+def _top_functions(stats: pstats.Stats, column: int) -> list:
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][column], reverse=True)
+    return [
+        {
+            "function": f"{os.path.basename(file)}:{line}({name})",
+            "calls": calls,
+            "own_ms": round(own * 1000, 2),
+            "cumulative_ms": round(cumulative * 1000, 2),
+        }
+        for (file, line, name), (_, calls, own, cumulative, _) in rows[:TOP_N]
+    ]
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot) -> list:
+    return [
+        {
+            "site": f"{frame.filename}:{frame.lineno}",
+            "size_kb": round(statistic.size / 1024, 1),
+            "count": statistic.count,
+        }
+        for statistic in snapshot.statistics("lineno")[:TOP_N]
+        for frame in statistic.traceback[:1]
+    ]
@@ -0,0 +1,244 @@
+"""Local astronomical prayer times computation.
+
+Port of the PrayTimes.org algorithm, tuned to match the Aladhan API output
+(same method ids, angle based high latitude rule, minute rounding) so it can
+stand in for Aladhan when the API is unavailable.
+"""
+
+import datetime
+import math
+from typing import Dict, Optional
+
+from models.prayer_day import PRAYERS, PrayerDay
+
+# Aladhan method id -> twilight angles in degrees below the horizon. Isha is
+# either an angle or a fixed delay after maghrib, maghrib defaults to sunset.
+METHODS = {
+    1: {"fajr": 18.0, "isha": 18.0},  # University of Islamic Sciences, Karachi
+    2: {"fajr": 15.0, "isha": 15.0},  # Islamic Society of North America
+    3: {"fajr": 18.0, "isha": 17.0},  # Muslim World League
+    4: {"fajr": 18.5, "isha_minutes": 90},  # Umm Al-Qura University, Makkah
+    5: {"fajr": 19.5, "isha": 17.5},  # Egyptian General Authority of Survey
+    7: {"fajr": 17.7, "isha": 14.0, "maghrib": 4.5},  # Institute of Geophysics, Tehran
+    12: {"fajr": 12.0, "isha": 12.0},  # Union Organization Islamic de France
+}
+
+DEFAULT_METHOD = 2
+RISE_SET_ANGLE = 0.833
+
+
+def _dsin(d):
+    return math.sin(math.radians(d))
+
+
+def _dcos(d):
+    return math.cos(math.radians(d))
+
+
+def _dtan(d):
+    return math.tan(math.radians(d))
+
+
+def _darcsin(x):
+    return math.degrees(math.asin(x))
+
+
+def _darccos(x):
+    return math.degrees(math.acos(x))
+
+
+def _darctan2(y, x):
+    return math.degrees(math.atan2(y, x))
+
+
+def _darccot(x):
+    return math.degrees(math.atan(1.0 / x))
+
+
+def _fix(a, b):
+    a = a - b * math.floor(a / b)
+    return a + b if a < 0 else a
+
+
+def _julian_date(date: datetime.date) -> float:
+    year, month = date.year, date.month
+    if month <= 2:
+        year -= 1
+        month += 12
+    a = math.floor(year / 100)
+    b = 2 - a + math.floor(a / 4)
+    return (
+        math.floor(365.25 * (year + 4716))
+        + math.floor(30.6001 * (month + 1))
+        + date.day
+        + b
+        - 1524.5
+    )
+
+
+def _sun_position(jd: float):
+    d = jd - 2451545.0
+    g = _fix(357.529 + 0.98560028 * d, 360)
+    q = _fix(280.459 + 0.98564736 * d, 360)
+    lon = _fix(q + 1.915 * _dsin(g) + 0.020 * _dsin(2 * g), 360)
+    e = 23.439 - 0.00000036 * d
+    ra = _darctan2(_dcos(e) * _dsin(lon), _dcos(lon)) / 15.0
+    equation = q / 15.0 - _fix(ra, 24)
+    declination = _darcsin(_dsin(e) * _dsin(lon))
+    return declination, equation
+
+
+class _Solver:
+    def __init__(self, latitude: float, longitude: float, date: datetime.date):
+        self.latitude = latitude
+        self.jd = _julian_date(date) - longitude / (15.0 * 24.0)
+
+    def mid_day(self, time: float) -> float:
+        _, equation = _sun_position(self.jd + time)
+        return _fix(12 - equation, 24)
+
+    def sun_angle_time(self, angle: float, time: float, ccw: bool = False) -> float:
+        declination, _ = _sun_position(self.jd + time)
+        noon = self.mid_day(time)
+        cos_t = (-_dsin(angle) - _dsin(declination) * _dsin(self.latitude)) / (
+            _dcos(declination) * _dcos(self.latitude)
+        )
+        # Polar day/night: the sun never reaches the angle, clamp and let the
+        # high latitude rule below fix the result.
+        t = _darccos(max(-1.0, min(1.0, cos_t))) / 15.0
+        return noon - t if ccw else noon + t
+
+    def asr_time(self, factor: int, time: float) -> float:
+        declination, _ = _sun_position(self.jd + time)
+        angle = -_darccot(factor + _dtan(abs(self.latitude - declination)))
+        return self.sun_angle_time(angle, time)
+
+
+def compute_prayer_times(
+    latitude: float,
+    longitude: float,
+    date: datetime.date,
+    utc_offset_hours: float,
+    method: int = DEFAULT_METHOD,
+    school: int = 0,
+) -> Dict[str, str]:
+    """Compute the prayer times of a day, in the same shape as Aladhan timings.
+
+    Args:
+        latitude: Location latitude in degrees
+        longitude: Location longitude in degrees
+        date: Local date to compute
+        utc_offset_hours: UTC offset of the location on that date (DST included)
+        method: Aladhan calculation method id
+        school: Asr juristic school, 0 for Shafi (standard) and 1 for Hanafi
+
+    Returns:
+        dict: Prayer name to "HH:MM" local time
+    """
+    minutes = _compute_minutes(
+        latitude, longitude, date, utc_offset_hours, method, school
+    )
+    return {
+        name: f"{value // 60:02d}:{value % 60:02d}" for name, value in minutes.items()
+    }
+
+
+def compute_prayer_day(
+    latitude: float,
+    longitude: float,
+    date: datetime.date,
+    timezone,
+    method: int = DEFAULT_METHOD,
+    school: int = 0,
+) -> PrayerDay:
+    """Compute the prayer times of a day straight into a PrayerDay.
+
+    Args:
+        timezone: pytz timezone of the location, its UTC offset on the date
+            (DST included) is applied
+    """
+    minutes = _compute_minutes(
+        latitude, longitude, date, utc_offset_hours(timezone, date), method, school
+    )
+    return PrayerDay.from_minutes(
+        (minutes[prayer] for prayer in PRAYERS), date, timezone
+    )
+
+
+def utc_offset_hours(timezone, date: datetime.date) -> float:
+    offset = timezone.utcoffset(datetime.datetime.combine(date, datetime.time(12, 0)))
+    return offset.total_seconds() / 3600
+
+
+def _compute_minutes(
+    latitude, longitude, date, offset_hours, method, school
+) -> Dict[str, int]:
+    params = METHODS.get(method, METHODS[DEFAULT_METHOD])
+    solver = _Solver(latitude, longitude, date)
+
+    # Two passes: the first from rough day portions, the second refined.
+    times = {
+        "Fajr": 5.0,
+        "Sunrise": 6.0,
+        "Dhuhr": 12.0,
+        "Asr": 13.0,
+        "Sunset": 18.0,
+        "Maghrib": 18.0,
+        "Isha": 18.0,
+    }
+    for _ in range(2):
+        portions = {name: value / 24.0 for name, value in times.items()}
+        times = {
+            "Fajr": solver.sun_angle_time(params["fajr"], portions["Fajr"], ccw=True),
+            "Sunrise": solver.sun_angle_time(
+                RISE_SET_ANGLE, portions["Sunrise"], ccw=True
+            ),
+            "Dhuhr": solver.mid_day(portions["Dhuhr"]),
+            "Asr": solver.asr_time(1 + school, portions["Asr"]),
+            "Sunset": solver.sun_angle_time(RISE_SET_ANGLE, portions["Sunset"]),
+            "Maghrib": solver.sun_angle_time(
+                params.get("maghrib", RISE_SET_ANGLE), portions["Maghrib"]
+            ),
+            "Isha": solver.sun_angle_time(params.get("isha", 18.0), portions["Isha"]),
+        }
+
+    shift = offset_hours - longitude / 15.0
+    times = {name: value + shift for name, value in times.items()}
+
+    if "isha_minutes" in params:
+        times["Isha"] = times["Maghrib"] + params["isha_minutes"] / 60.0
+
+    _adjust_high_latitudes(times, params)
+
+    return {
+        name: _round_minutes(times[name])
+        for name in ("Fajr", "Sunrise", "Dhuhr", "Asr", "Maghrib", "Isha")
+    }
+
+
+def _adjust_high_latitudes(times: Dict[str, float], params: dict) -> None:
+    """Angle based rule, Aladhan's default latitude adjustment."""
+    night = _fix(times["Sunrise"] - times["Sunset"], 24)
+
+    fajr_portion = params["fajr"] / 60.0 * night
+    if (
+        _is_invalid(times["Fajr"])
+        or _fix(times["Sunrise"] - times["Fajr"], 24) > fajr_portion
+    ):
+        times["Fajr"] = times["Sunrise"] - fajr_portion
+
+    if "isha" in params:
+        isha_portion = params["isha"] / 60.0 * night
+        if (
+            _is_invalid(times["Isha"])
+            or _fix(times["Isha"] - times["Sunset"], 24) > isha_portion
+        ):
+            times["Isha"] = times["Sunset"] + isha_portion
+
+
+def _is_invalid(value: Optional[float]) -> bool:
+    return value is None or math.isnan(value)
+
+
+def _round_minutes(hours: float) -> int:
+    return int(math.floor(_fix(hours, 24) * 60 + 0.5)) % (24 * 60)
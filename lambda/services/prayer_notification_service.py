@@ -1,7 +1,10 @@
+import asyncio
 import datetime
-from typing import List, Tuple
+import time
+from typing import List, Optional, Tuple
 
 import pytz
+from ask_sdk_core.response_helper import ResponseFactory
 from ask_sdk_model.interfaces.connections import SendRequestDirective
 from ask_sdk_model.services import ServiceException
 from ask_sdk_model.services.reminder_management import (
@@ -19,12 +22,30 @@ from ask_sdk_model.services.reminder_management import (
 from aws_lambda_powertools import Logger
 
 from auth.auth_permissions import permissions
-from services.geolocation_service import get_device_location
+from models.prayer_day import PrayerDay
+from repositories.user_state_repository import UserState, get_user_state
+from services.circuit_breaker import ALEXA_API, get_breaker, is_server_error
+from services import async_http
+from services.async_api_client import AsyncAlexaServiceClient
+from services.geolocation_service import (
+    get_device_location,
+    get_device_timezone_async,
+)
 from services.prayer_times_service import PrayerService
+from services.preferences_service import get_preferences
 from speech_text import get_speech_text
 
 logger = Logger(service="prayer_notification_service")
 
+# User state field holding the setup resolved while asking for the reminder
+# permission, and how long it stays usable.
+PENDING_SETUP_FIELD = "pendingReminderSetup"
+PENDING_SETUP_TTL = 600
+
+# User state field holding the alert token of each prayer's reminder, so
+# setting the reminders up again replaces them instead of piling them up.
+TOKENS_FIELD = "reminderTokens"
+
 
 class PrayerNotificationService:
     @staticmethod
@@ -37,11 +58,13 @@ class PrayerNotificationService:
         if not isinstance(scopes, dict):
             return None
 
-        permission_data = scopes.get(permission_key, {})
-        if not isinstance(permission_data, dict):
-            return None
+        permission_data = scopes.get(permission_key)
+        if isinstance(permission_data, dict):
+            return permission_data.get("status")
 
-        return permission_data.get("status")
+        # Deserialized envelopes hold Scope models with a PermissionStatus
+        status = getattr(permission_data, "status", None)
+        return getattr(status, "value", status)
 
     @staticmethod
     def check_reminder_permission(alexa_permissions):
@@ -94,27 +117,25 @@ class PrayerNotificationService:
         ).response
 
     @staticmethod
-    def setup_prayer_reminders(
-        prayer_times: dict,
-        reminder_service,
+    def build_reminder_requests(
+        prayer_times: PrayerDay,
         user_timezone: pytz.timezone,
         locale: str = "en-US",
-    ) -> Tuple[List[dict], str]:
-        """Set up daily prayer reminders for each prayer time.
+        lead_minutes: int = 0,
+    ) -> Tuple[List[Tuple[str, ReminderRequest]], str]:
+        """Build the daily reminder request of each prayer time.
 
         Args:
-            prayer_times: Dictionary of prayer times
-            reminder_service: Alexa reminder management service
+            prayer_times: The day's prayer times
             user_timezone: User's timezone
             locale: User's locale
+            lead_minutes: How long before each prayer the reminder rings
 
         Returns:
-            Tuple containing list of created reminders and formatted times string
-
-        Raises:
-            ServiceException: If there are issues creating reminders
+            Tuple containing (prayer, reminder request) pairs and formatted
+            times string
         """
-        reminders = []
+        requests = []
         formatted_times = []
         texts = get_speech_text(locale)
 
@@ -124,95 +145,239 @@ class PrayerNotificationService:
                 "num_prayers": len(PrayerService.PRAYERS),
                 "timezone": str(user_timezone),
                 "locale": locale,
-                "prayer_times": prayer_times,
+                "prayer_times": prayer_times.to_timings(),
             },
         )
 
-        for prayer in PrayerService.PRAYERS:
-            if prayer in prayer_times:
-                prayer_time = datetime.datetime.strptime(
-                    prayer_times[prayer], "%H:%M"
-                ).time()
+        # Reminders ring at the wall clock time of the device's timezone.
+        if prayer_times.timezone_name != user_timezone.zone:
+            prayer_times = prayer_times.shifted({}, timezone=user_timezone)
 
-                now = datetime.datetime.now(user_timezone)
-                today = now.date()
+        now = datetime.datetime.now(user_timezone)
+        today = now.date()
+        request_time = now.astimezone(pytz.UTC).isoformat()
+        same_day = prayer_times.date == today
 
-                reminder_time = user_timezone.localize(
-                    datetime.datetime.combine(today, prayer_time)
+        lead = datetime.timedelta(minutes=lead_minutes)
+
+        for prayer, prayer_time in prayer_times.moments():
+            if not same_day:
+                prayer_time = prayer_times.moment_on(prayer, today)
+            reminder_time = user_timezone.normalize(prayer_time - lead)
+            if reminder_time < now:
+                prayer_time = prayer_times.moment_on(
+                    prayer, today + datetime.timedelta(days=1)
                 )
+                reminder_time = user_timezone.normalize(prayer_time - lead)
 
-                if reminder_time < now:
-                    reminder_time = user_timezone.localize(
-                        datetime.datetime.combine(
-                            today + datetime.timedelta(days=1), prayer_time
-                        )
-                    )
+            formatted_times.append(f"{prayer} at {prayer_time.strftime('%I:%M %p')}")
 
-                formatted_times.append(
-                    f"{prayer} at {prayer_time.strftime('%I:%M %p')}"
-                )
+            notification_time = reminder_time.strftime("%Y-%m-%dT%H:%M:%S")
 
-                notification_time = reminder_time.strftime("%Y-%m-%dT%H:%M:%S")
-
-                logger.info(
-                    f"Setting up reminder for {prayer}",
-                    extra={
-                        "prayer": prayer,
-                        "notification_time": notification_time,
-                        "timezone": str(user_timezone),
-                        "reminder_time": str(reminder_time),
-                        "current_time": str(now),
-                    },
-                )
+            logger.info(
+                f"Setting up reminder for {prayer}",
+                extra={
+                    "prayer": prayer,
+                    "notification_time": notification_time,
+                    "timezone": str(user_timezone),
+                    "reminder_time": str(reminder_time),
+                    "current_time": str(now),
+                },
+            )
 
-                trigger = Trigger(
-                    object_type=TriggerType.SCHEDULED_ABSOLUTE,
-                    scheduled_time=notification_time,
-                    time_zone_id=str(user_timezone),
-                    recurrence=Recurrence(freq=RecurrenceFreq.DAILY, interval=1),
-                )
+            trigger = Trigger(
+                object_type=TriggerType.SCHEDULED_ABSOLUTE,
+                scheduled_time=notification_time,
+                time_zone_id=str(user_timezone),
+                recurrence=Recurrence(freq=RecurrenceFreq.DAILY, interval=1),
+            )
 
-                reminder_text = texts.PRAYER_TIME_REMINDER.format(prayer)
-                text = SpokenText(locale=locale, text=reminder_text)
-                alert_info = AlertInfo(SpokenInfo([text]))
-                push_notification = PushNotification(PushNotificationStatus.ENABLED)
-
-                reminder_request = ReminderRequest(
-                    request_time=datetime.datetime.now(pytz.UTC).isoformat(),
-                    trigger=trigger,
-                    alert_info=alert_info,
-                    push_notification=push_notification,
+            if lead_minutes:
+                reminder_text = texts.PRAYER_TIME_REMINDER_AHEAD.format(
+                    prayer, lead_minutes
                 )
+            else:
+                reminder_text = texts.PRAYER_TIME_REMINDER.format(prayer)
+            text = SpokenText(locale=locale, text=reminder_text)
+            alert_info = AlertInfo(SpokenInfo([text]))
+            push_notification = PushNotification(PushNotificationStatus.ENABLED)
+
+            reminder_request = ReminderRequest(
+                request_time=request_time,
+                trigger=trigger,
+                alert_info=alert_info,
+                push_notification=push_notification,
+            )
+            requests.append((prayer, reminder_request))
 
-                logger.info(
-                    f"Creating reminder for {prayer}",
-                    extra={
-                        "prayer": prayer,
-                        "reminder_request": str(reminder_request),
-                        "trigger_time": notification_time,
-                    },
-                )
+        return requests, ", ".join(formatted_times)
+
+    @staticmethod
+    def setup_prayer_reminders(
+        prayer_times: PrayerDay,
+        reminder_service,
+        user_timezone: pytz.timezone,
+        locale: str = "en-US",
+        lead_minutes: int = 0,
+    ) -> Tuple[List[dict], str]:
+        """Set up daily prayer reminders for each prayer time.
+
+        Args:
+            prayer_times: The day's prayer times
+            reminder_service: Alexa reminder management service
+            user_timezone: User's timezone
+            locale: User's locale
+            lead_minutes: How long before each prayer the reminder rings
+
+        Returns:
+            Tuple containing list of created reminders and formatted times string
+
+        Raises:
+            ServiceException: If there are issues creating reminders
+        """
+        reminder_requests, formatted_times = (
+            PrayerNotificationService.build_reminder_requests(
+                prayer_times, user_timezone, locale, lead_minutes
+            )
+        )
+
+        reminders = []
+        for prayer, reminder_request in reminder_requests:
+            logger.info(
+                f"Creating reminder for {prayer}",
+                extra={"prayer": prayer, "reminder_request": str(reminder_request)},
+            )
+            reminder = get_breaker(ALEXA_API).call(
+                reminder_service.create_reminder,
+                reminder_request,
+                is_failure=is_server_error,
+            )
+            PrayerNotificationService._log_created(prayer, reminder)
+            reminders.append(reminder)
+
+        logger.info(
+            "Completed setting up reminders",
+            extra={
+                "num_reminders_created": len(reminders),
+                "formatted_times": formatted_times,
+            },
+        )
+        return reminders, formatted_times
+
+    @staticmethod
+    async def setup_prayer_reminders_async(
+        prayer_times: PrayerDay,
+        alexa_client,
+        user_timezone: pytz.timezone,
+        locale: str = "en-US",
+        lead_minutes: int = 0,
+        state: Optional[UserState] = None,
+    ) -> Tuple[List[dict], str]:
+        """Coroutine variant of setup_prayer_reminders creating all reminders
+        concurrently.
 
-                reminder = reminder_service.create_reminder(reminder_request)
-                reminders.append(reminder)
+        With a user state, the reminders tracked in it are deleted first and
+        the tokens of the ones created are tracked in their place, failures
+        or not.
 
-                logger.info(
-                    f"Successfully created reminder for {prayer}",
-                    extra={
-                        "prayer": prayer,
-                        "reminder_id": getattr(reminder, "alert_token", None),
-                        "reminder_status": getattr(reminder, "status", None),
-                    },
+        Raises:
+            ServiceException: The first reminder deletion or creation error,
+                once every call has settled
+        """
+        reminder_requests, formatted_times = (
+            PrayerNotificationService.build_reminder_requests(
+                prayer_times, user_timezone, locale, lead_minutes
+            )
+        )
+
+        if state is not None:
+            await PrayerNotificationService.delete_reminders_async(alexa_client, state)
+
+        breaker = get_breaker(ALEXA_API)
+        results = await asyncio.gather(
+            *(
+                breaker.call_async(
+                    alexa_client.create_reminder,
+                    reminder_request,
+                    is_failure=is_server_error,
                 )
+                for _, reminder_request in reminder_requests
+            ),
+            return_exceptions=True,
+        )
+
+        reminders = []
+        tokens = {}
+        errors = []
+        for (prayer, _), result in zip(reminder_requests, results):
+            if isinstance(result, Exception):
+                errors.append(result)
+                continue
+            PrayerNotificationService._log_created(prayer, result)
+            reminders.append(result)
+            tokens[prayer] = result.alert_token
+        if state is not None:
+            state.set(TOKENS_FIELD, tokens)
 
         logger.info(
             "Completed setting up reminders",
             extra={
                 "num_reminders_created": len(reminders),
+                "num_reminders_failed": len(errors),
                 "formatted_times": formatted_times,
             },
         )
-        return reminders, ", ".join(formatted_times)
+        if errors:
+            raise errors[0]
+        return reminders, formatted_times
+
+    @staticmethod
+    async def delete_reminders_async(alexa_client, state: UserState) -> None:
+        """Delete the reminders tracked in the user state, already gone ones
+        included.
+
+        Raises:
+            ServiceException: The first deletion error, the reminders not
+                deleted stay tracked
+        """
+        tokens = dict(state.get(TOKENS_FIELD) or {})
+        if not tokens:
+            return
+
+        breaker = get_breaker(ALEXA_API)
+        results = await asyncio.gather(
+            *(
+                breaker.call_async(
+                    alexa_client.delete_reminder, token, is_failure=is_server_error
+                )
+                for token in tokens.values()
+            ),
+            return_exceptions=True,
+        )
+
+        error: Optional[Exception] = None
+        for prayer, result in zip(list(tokens), results):
+            if isinstance(result, ServiceException) and result.status_code == 404:
+                result = None
+            if isinstance(result, Exception):
+                error = error or result
+            else:
+                del tokens[prayer]
+
+        state.set(TOKENS_FIELD, tokens)
+        if error is not None:
+            raise error
+
+    @staticmethod
+    def _log_created(prayer, reminder):
+        logger.info(
+            f"Successfully created reminder for {prayer}",
+            extra={
+                "prayer": prayer,
+                "reminder_id": getattr(reminder, "alert_token", None),
+                "reminder_status": getattr(reminder, "status", None),
+            },
+        )
 
     @staticmethod
     def setup_prayer_notifications(handler_input):
@@ -244,109 +409,226 @@ class PrayerNotificationService:
                 extra={"latitude": latitude, "longitude": longitude},
             )
 
-            # Get prayer times
-            prayer_times = PrayerService.get_prayer_times(latitude, longitude)
+            preferences = get_preferences(handler_input)
+            timezone, timings_result = PrayerNotificationService._fetch_timings(
+                req_envelope, latitude, longitude, preferences
+            )
 
-            if not prayer_times:
-                logger.error("Failed to get prayer times after retries")
+            if not timezone:
                 return response_builder.speak(texts.ERROR).response
 
-            # Get user timezone
-            device_id = req_envelope.context.system.device.device_id
-
-            try:
-                timezone = handler_input.service_client_factory.get_ups_service().get_system_time_zone(
-                    device_id
-                )
+            logger.info("Got user timezone", extra={"timezone": timezone})
 
-                user_timezone = pytz.timezone(timezone)
-                logger.info("Got user timezone", extra={"timezone": timezone})
-            except Exception as e:
+            if isinstance(timings_result, Exception):
                 logger.error(
-                    "Failed to get user timezone",
-                    extra={
-                        "error_type": type(e).__name__,
-                        "error": str(e),
-                        "device_id": device_id,
-                    },
+                    "Failed to get prayer times from every tier",
+                    extra={"error_type": type(timings_result).__name__},
                 )
-
                 return response_builder.speak(texts.ERROR).response
 
-            # Set up reminders
-            try:
-                reminder_service = (
-                    handler_input.service_client_factory.get_reminder_management_service()
-                )
+            prayer_times, tier = timings_result
+            handler_input.attributes_manager.request_attributes["timings_tier"] = tier
+            logger.info("Prayer times served", extra={"timings_tier": tier})
 
-                logger.info("prayer_notification_service: Setting up prayer reminders")
+            return PrayerNotificationService._create_reminders(
+                handler_input, prayer_times, pytz.timezone(timezone), preferences
+            )
 
-                reminders, formatted_times = (
-                    PrayerNotificationService.setup_prayer_reminders(
-                        prayer_times,
-                        reminder_service,
-                        user_timezone,
-                        locale=locale,
-                    )
-                )
+        except Exception as e:
+            logger.exception(
+                f"Failed to set up prayer reminders: {str(e)}",
+            )
 
-                logger.info(
-                    "Successfully set up reminders",
-                    extra={
-                        "num_reminders": len(reminders),
-                        "formatted_times": formatted_times,
-                    },
-                )
+            return handler_input.response_builder.speak(texts.ERROR).response
 
-                return response_builder.speak(
-                    texts.REMINDER_SETUP_CONFIRMATION.format(formatted_times)
-                ).response
-            except ServiceException as e:
-                logger.error(
-                    "Failed to set up reminders",
-                    extra={
-                        "error": str(e),
-                        "status_code": getattr(e, "status_code", None),
-                        "error_type": type(e).__name__,
-                        "traceback": True,
-                    },
+    @staticmethod
+    def _fetch_timings(req_envelope, latitude, longitude, preferences):
+        """Get the device timezone and the prayer times concurrently.
+
+        The fallback chain waits for the timezone only if a degraded tier
+        needs it.
+
+        Returns:
+            Tuple of the timezone name (None if unavailable) and the
+            (PrayerDay, tier) pair, or the exception of the fallback chain
+        """
+        alexa_client = AsyncAlexaServiceClient.from_envelope(req_envelope)
+        device_id = req_envelope.context.system.device.device_id
+
+        async def fetch():
+            timezone_task = asyncio.ensure_future(
+                get_device_timezone_async(alexa_client, device_id)
+            )
+            timings_task = asyncio.ensure_future(
+                PrayerService.get_prayer_times_with_fallback_async(
+                    latitude,
+                    longitude,
+                    preferences.method,
+                    preferences.school,
+                    timezone_resolver=lambda: timezone_task,
                 )
+            )
+            return await asyncio.gather(
+                timezone_task, timings_task, return_exceptions=True
+            )
 
-                if e.status_code == 401:
-                    # 401 typically means no permission (or skill manifest not updated)
-                    # If it still fails here, either the user closed the permission prompt,
-                    # or Alexa hasn't fully updated the token for this single invocation.
-                    logger.info("Asking user to enable reminder permissions")
+        return async_http.run(fetch())
 
-                    return response_builder.speak(
-                        texts.NOTIFY_MISSING_REMINDER_PERMISSIONS
-                    ).response
-                elif e.status_code == 403:
-                    logger.info("Max reminders limit reached")
-                    return response_builder.speak(texts.MAX_REMINDERS_ERROR).response
+    @staticmethod
+    def _create_reminders(handler_input, prayer_times, user_timezone, preferences):
+        """Create the reminders and answer with the outcome."""
+        response_builder = handler_input.response_builder
+        locale = handler_input.request_envelope.request.locale
+        texts = get_speech_text(locale)
 
-                return response_builder.speak(texts.ERROR).response
+        try:
+            logger.info("prayer_notification_service: Setting up prayer reminders")
+
+            reminders, formatted_times = async_http.run(
+                PrayerNotificationService.setup_prayer_reminders_async(
+                    prayer_times.shifted(preferences.offsets),
+                    AsyncAlexaServiceClient.from_envelope(
+                        handler_input.request_envelope
+                    ),
+                    user_timezone,
+                    locale=locale,
+                    lead_minutes=preferences.reminder_lead_minutes,
+                    state=get_user_state(handler_input),
+                )
+            )
 
-            # Return success response
-            confirmation_text = texts.REMINDER_SETUP_CONFIRMATION.format(
-                formatted_times
+            logger.info(
+                "Successfully set up reminders",
+                extra={
+                    "num_reminders": len(reminders),
+                    "formatted_times": formatted_times,
+                },
             )
 
-            play_directive = PrayerService.get_adhan_directive()
+            # Also reached from the accepted permission request
+            # (handle_connections_response), which plays the Adhan as well.
+            play_directive = PrayerService.get_adhan_directive(handler_input)
 
             return (
-                response_builder.speak(confirmation_text)
+                response_builder.speak(
+                    texts.REMINDER_SETUP_CONFIRMATION.format(formatted_times)
+                )
                 .add_directive(play_directive)
                 .set_should_end_session(True)
                 .response
             )
+        except ServiceException as e:
+            logger.error(
+                "Failed to set up reminders",
+                extra={
+                    "error": str(e),
+                    "status_code": getattr(e, "status_code", None),
+                    "error_type": type(e).__name__,
+                    "traceback": True,
+                },
+            )
+
+            if e.status_code == 401:
+                # 401 typically means no permission (or skill manifest not updated)
+                # If it still fails here, either the user closed the permission prompt,
+                # or Alexa hasn't fully updated the token for this single invocation.
+                logger.info("Asking user to enable reminder permissions")
+
+                return response_builder.speak(
+                    texts.NOTIFY_MISSING_REMINDER_PERMISSIONS
+                ).response
+            elif e.status_code == 403:
+                logger.info("Max reminders limit reached")
+                return response_builder.speak(texts.MAX_REMINDERS_ERROR).response
+
+            return response_builder.speak(texts.ERROR).response
+
+    @staticmethod
+    def stash_pending_setup(handler_input) -> bool:
+        """Resolve what the reminders need before asking for the permission.
+
+        The location, timezone and prayer times are kept in the user state
+        for PENDING_SETUP_TTL seconds, so an accepted permission request
+        creates the reminders right away instead of looking them up again.
+        Never raises, nothing is kept when something is unavailable.
+
+        Returns:
+            bool: Whether the setup was stashed
+        """
+        req_envelope = handler_input.request_envelope
+        try:
+            # A throwaway response builder, the failure messages of the
+            # lookup are not meant for this response.
+            success, location_result = get_device_location(
+                req_envelope, ResponseFactory(), handler_input.service_client_factory
+            )
+            if not success:
+                return False
+            latitude, longitude = location_result
 
+            preferences = get_preferences(handler_input)
+            timezone, timings_result = PrayerNotificationService._fetch_timings(
+                req_envelope, latitude, longitude, preferences
+            )
+            if not timezone or isinstance(timings_result, Exception):
+                return False
+            prayer_times, _ = timings_result
+
+            get_user_state(handler_input).set(
+                PENDING_SETUP_FIELD,
+                {
+                    "timezone": timezone,
+                    "method": preferences.method,
+                    "school": preferences.school,
+                    "date": prayer_times.date.isoformat(),
+                    "timingsTimezone": prayer_times.timezone_name or timezone,
+                    "minutes": list(prayer_times.minutes),
+                    "expiresAt": int(time.time()) + PENDING_SETUP_TTL,
+                },
+            )
+            logger.info("Reminder setup stashed until permission is granted")
+            return True
         except Exception as e:
-            logger.exception(
-                f"Failed to set up prayer reminders: {str(e)}",
+            logger.warning(
+                "Failed to stash reminder setup",
+                extra={"error_type": type(e).__name__, "error_message": str(e)},
             )
+            return False
 
-            return handler_input.response_builder.speak(texts.ERROR).response
+    @staticmethod
+    def setup_pending_notifications(handler_input):
+        """Create the reminders stashed by stash_pending_setup.
+
+        Returns:
+            The response, None when no usable setup is stashed
+        """
+        state = get_user_state(handler_input)
+        pending = state.get(PENDING_SETUP_FIELD)
+        if not pending:
+            return None
+        state.delete(PENDING_SETUP_FIELD)
+
+        preferences = get_preferences(handler_input)
+        if (
+            pending["expiresAt"] < time.time()
+            or pending["method"] != preferences.method
+            or pending["school"] != preferences.school
+        ):
+            logger.info("Stashed reminder setup is stale")
+            return None
+
+        prayer_times = PrayerDay.from_minutes(
+            pending["minutes"],
+            datetime.date.fromisoformat(pending["date"]),
+            pytz.timezone(pending["timingsTimezone"]),
+        )
+        logger.info("Setting up reminders from the stashed setup")
+        return PrayerNotificationService._create_reminders(
+            handler_input,
+            prayer_times,
+            pytz.timezone(pending["timezone"]),
+            preferences,
+        )
 
     @staticmethod
     def handle_connections_response(handler_input):
@@ -374,18 +656,20 @@ class PrayerNotificationService:
             if status == "ACCEPTED":
                 logger.info("User accepted the reminder permission request.")
 
-                # Instead of setting up reminders now, politely let them know they're set
-                # for next time
-                return (
-                    handler_input.response_builder.speak(
-                        texts.PERMISSIONS_ACCEPTED_REINVITE
-                    )
-                    .set_should_end_session(True)
-                    .response
+                # Set the reminders up right away, from what the request
+                # asking for the permission stashed if it is still usable.
+                response = PrayerNotificationService.setup_pending_notifications(
+                    handler_input
+                )
+                if response is not None:
+                    return response
+                return PrayerNotificationService.setup_prayer_notifications(
+                    handler_input
                 )
             else:
                 # The user denied or something else
                 logger.info("User denied the permission request")
+                get_user_state(handler_input).delete(PENDING_SETUP_FIELD)
                 return (
                     handler_input.response_builder.speak(texts.PERMISSION_DENIED)
                     .set_should_end_session(True)
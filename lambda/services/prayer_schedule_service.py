@@ -0,0 +1,252 @@
+"""Prayer times of another day or of several days (GetPrayerScheduleIntent).
+
+The days asked for come from the AMAZON.DATE slots "date" and "endDate":
+a day ("tomorrow", "on friday"), a week ("this week"), a weekend or a
+month, at most MAX_DAYS days from the first one. Their timings are fetched
+together by PrayerService.get_prayer_days_async.
+
+Only DAYS_PER_PROMPT days are read at once. The days left are kept in the
+session attributes, already rendered, and read when the user says yes.
+"""
+
+import datetime
+import re
+from typing import List, Optional
+
+from ask_sdk_core.utils import get_slot
+from aws_lambda_powertools import Logger
+
+from models.prayer_day import PrayerDay
+from services import async_http
+from services.async_api_client import AsyncAlexaServiceClient
+from services.geolocation_service import get_device_location, get_device_timezone_async
+from services.prayer_times_service import PrayerService
+from services.preferences_service import get_preferences
+from speech_text import get_speech_text
+
+logger = Logger(service="prayer_schedule_service")
+
+MAX_DAYS = 7
+DAYS_PER_PROMPT = 3
+# Session attribute holding the rendered days not read yet.
+PENDING_DAYS_ATTRIBUTE = "pendingScheduleDays"
+
+# AMAZON.DATE values
+DAY_VALUE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+WEEK_VALUE = re.compile(r"(\d{4})-W(\d{1,2})(-WE)?")
+MONTH_VALUE = re.compile(r"(\d{4})-(\d{2})")
+PRESENT_VALUE = "PRESENT_REF"
+
+
+def _parse_range(value: str, today: datetime.date):
+    """First and last dates an AMAZON.DATE value stands for, None if
+    it is not a day, week, weekend or month (a season, a decade...)."""
+    day = DAY_VALUE.fullmatch(value)
+    if day:
+        date = datetime.date(*(int(part) for part in day.groups()))
+        return date, date
+    week = WEEK_VALUE.fullmatch(value)
+    if week:
+        monday = datetime.date.fromisocalendar(int(week[1]), int(week[2]), 1)
+        if week[3]:
+            return monday + datetime.timedelta(days=5), monday + datetime.timedelta(
+                days=6
+            )
+        return monday, monday + datetime.timedelta(days=6)
+    month = MONTH_VALUE.fullmatch(value)
+    if month:
+        first = datetime.date(int(month[1]), int(month[2]), 1)
+        next_month = (first + datetime.timedelta(days=32)).replace(day=1)
+        return first, next_month - datetime.timedelta(days=1)
+    if value == PRESENT_VALUE:
+        return today, today
+    return None
+
+
+def resolve_dates(
+    value: Optional[str], end_value: Optional[str], today: datetime.date
+) -> Optional[List[datetime.date]]:
+    """Dates asked for by the date and endDate slot values.
+
+    No date stands for today. Weeks and months in progress start today
+    rather than on days already past. None if a value is not supported or
+    the range ends before it starts.
+    """
+    try:
+        span = _parse_range(value, today) if value else (today, today)
+        end_span = _parse_range(end_value, today) if end_value else span
+    except ValueError:
+        return None
+    if span is None or end_span is None:
+        return None
+    first, last = span[0], end_span[1]
+    if first < today <= last:
+        first = today
+    if last < first:
+        return None
+    last = min(last, first + datetime.timedelta(days=MAX_DAYS - 1))
+    return [
+        first + datetime.timedelta(days=days) for days in range((last - first).days + 1)
+    ]
+
+
+def has_pending_days(handler_input) -> bool:
+    return bool(
+        handler_input.attributes_manager.session_attributes.get(PENDING_DAYS_ATTRIBUTE)
+    )
+
+
+class PrayerScheduleService:
+    @staticmethod
+    def get_schedule_with_location(handler_input):
+        """Answer with the prayer times of the days the slots ask for.
+
+        Args:
+            handler_input: The Alexa handler input
+
+        Returns:
+            Response: The first days read, asking whether to read the rest
+        """
+        locale = handler_input.request_envelope.request.locale
+        texts = get_speech_text(locale)
+        req_envelope = handler_input.request_envelope
+        response_builder = handler_input.response_builder
+        alexa_permissions = req_envelope.context.system.user.permissions
+
+        if not (alexa_permissions and alexa_permissions.consent_token):
+            logger.warning("Missing permissions for device address")
+            return (
+                response_builder.speak(texts.NOTIFY_MISSING_LOCATION_PERMISSIONS)
+                .set_should_end_session(False)
+                .response
+            )
+
+        success, location_result = get_device_location(
+            req_envelope, response_builder, handler_input.service_client_factory
+        )
+
+        if not success:
+            return location_result
+
+        latitude, longitude = location_result
+        preferences = get_preferences(handler_input)
+        value = _slot_value(handler_input, "date")
+        end_value = _slot_value(handler_input, "endDate")
+
+        try:
+            alexa_client = AsyncAlexaServiceClient.from_envelope(req_envelope)
+            device_id = req_envelope.context.system.device.device_id
+
+            async def fetch():
+                timezone_name = PrayerService._cached_timezone(
+                    latitude, longitude, preferences.method, preferences.school
+                ) or await get_device_timezone_async(alexa_client, device_id)
+                today = PrayerService._local_today(timezone_name)
+                dates = resolve_dates(value, end_value, today)
+                if not dates:
+                    return today, None, None
+                days, tier = await PrayerService.get_prayer_days_async(
+                    latitude,
+                    longitude,
+                    preferences.method,
+                    preferences.school,
+                    dates,
+                    timezone_name,
+                )
+                return today, days, tier
+
+            today, days, tier = async_http.run(fetch())
+            if days is None:
+                logger.info(
+                    "Unsupported schedule dates",
+                    extra={"date": value, "end_date": end_value},
+                )
+                return (
+                    response_builder.speak(texts.SCHEDULE_UNSUPPORTED_DATES)
+                    .ask(texts.SCHEDULE_UNSUPPORTED_DATES)
+                    .response
+                )
+            handler_input.attributes_manager.request_attributes["timings_tier"] = tier
+            logger.info(
+                "Prayer schedule served",
+                extra={"timings_tier": tier, "days": len(days)},
+            )
+
+            lines = [
+                PrayerScheduleService.render_day(
+                    day.shifted(preferences.offsets), today, texts
+                )
+                for day in days
+            ]
+            return PrayerScheduleService._read(handler_input, lines, texts)
+        except Exception as e:
+            logger.error(
+                "Error getting prayer schedule",
+                extra={"error_type": type(e).__name__, "error_message": str(e)},
+            )
+            return (
+                response_builder.speak(texts.ERROR)
+                .set_should_end_session(False)
+                .response
+            )
+
+    @staticmethod
+    def read_pending_days(handler_input):
+        """Read the next days kept by the previous answer, without any I/O."""
+        texts = get_speech_text(handler_input.request_envelope.request.locale)
+        lines = handler_input.attributes_manager.session_attributes.pop(
+            PENDING_DAYS_ATTRIBUTE, []
+        )
+        return PrayerScheduleService._read(handler_input, lines, texts)
+
+    @staticmethod
+    def drop_pending_days(handler_input):
+        texts = get_speech_text(handler_input.request_envelope.request.locale)
+        handler_input.attributes_manager.session_attributes.pop(
+            PENDING_DAYS_ATTRIBUTE, None
+        )
+        return (
+            handler_input.response_builder.speak(texts.GOODBYE)
+            .set_should_end_session(True)
+            .response
+        )
+
+    @staticmethod
+    def render_day(day: PrayerDay, today: datetime.date, texts) -> str:
+        if day.date == today:
+            label = texts.SCHEDULE_TODAY
+        elif day.date == today + datetime.timedelta(days=1):
+            label = texts.SCHEDULE_TOMORROW
+        else:
+            label = texts.SCHEDULE_DATE.format(
+                weekday=texts.WEEKDAYS[day.date.weekday()],
+                day=day.date.day,
+                month=texts.MONTHS[day.date.month - 1],
+            )
+        return texts.SCHEDULE_DAY.format(label, day.format())
+
+    @staticmethod
+    def _read(handler_input, lines: List[str], texts):
+        read, left = lines[:DAYS_PER_PROMPT], lines[DAYS_PER_PROMPT:]
+        response_builder = handler_input.response_builder
+        speech_text = " ".join(read)
+        if not left:
+            return (
+                response_builder.speak(speech_text)
+                .set_should_end_session(True)
+                .response
+            )
+
+        handler_input.attributes_manager.session_attributes[PENDING_DAYS_ATTRIBUTE] = (
+            left
+        )
+        return (
+            response_builder.speak(f"{speech_text} {texts.SCHEDULE_MORE}")
+            .ask(texts.SCHEDULE_MORE)
+            .response
+        )
+
+
+def _slot_value(handler_input, name: str) -> Optional[str]:
+    slot = get_slot(handler_input, name)
+    return slot.value if slot is not None else None
@@ -1,8 +1,12 @@
+import asyncio
 import datetime
+import math
 import os
+import threading
 import time
-from typing import Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
+import aiohttp
 import pytz
 import requests
 from ask_sdk_model.interfaces.audioplayer import (
@@ -13,45 +17,108 @@ from ask_sdk_model.interfaces.audioplayer import (
 )
 from aws_lambda_powertools import Logger
 
-from services.geolocation_service import get_device_location, get_city_name
+from models.prayer_day import PRAYERS, PrayerDay
+from services import async_http, audio_assets, request_stats, timings_cache
+from services.async_api_client import AsyncAlexaServiceClient
+from services.circuit_breaker import ALADHAN, ALADHAN_MIRROR, get_breaker
+from services.geolocation_service import (
+    get_device_location,
+    get_city_name_async,
+    get_device_timezone,
+    get_device_timezone_async,
+)
+from services.hedging import get_hedge
+from services.prayer_calculation import compute_prayer_day
+from services.preferences_service import FULL_ADHAN, get_preferences
+from services.timetable_store import get_timetable
 from speech_text import get_speech_text
 
 logger = Logger(service="prayer_times_service")
 
 
+class TimingsTier:
+    """Which step of the fallback chain served the timings."""
+
+    FRESH_CACHE = "fresh_cache"
+    TIMETABLE = "timetable"
+    UPSTREAM = "upstream"
+    STALE_CACHE = "stale_cache"
+    LOCAL = "local"
+
+
 class PrayerService:
     BASE_URL = "http://api.aladhan.com/v1/timings"
-    PRAYERS = ["Fajr", "Dhuhr", "Asr", "Maghrib", "Isha"]
+    CALENDAR_URL = "http://api.aladhan.com/v1/calendar"
+    PRAYERS = list(PRAYERS)
     MAX_RETRIES = 3
     RETRY_DELAY = 1
+    REQUEST_TIMEOUT = 5
+    # Total time the fallback chain gives Aladhan before moving on.
+    UPSTREAM_BUDGET = 3.0
+
+    _refreshing = set()
+    _refreshing_lock = threading.Lock()
 
     @staticmethod
-    def get_prayer_times(
-        latitude: float, longitude: float, method: int = 2
-    ) -> Optional[dict]:
-        """
-        Get prayer times from Aladhan API with retry logic
-        method=2 is Islamic Society of North America (ISNA)
+    def parse_timings(data: dict) -> PrayerDay:
+        """Parse an Aladhan timings payload once, at the upstream boundary."""
+        date = datetime.datetime.strptime(
+            data["date"]["gregorian"]["date"], "%d-%m-%Y"
+        ).date()
+        timezone_name = data.get("meta", {}).get("timezone")
+        return PrayerDay.from_timings(
+            data["timings"],
+            date,
+            pytz.timezone(timezone_name) if timezone_name else None,
+        )
+
+    @staticmethod
+    def fetch_timings(
+        latitude: float,
+        longitude: float,
+        method: int = 2,
+        school: int = 0,
+        date: Optional[datetime.date] = None,
+        budget: Optional[float] = None,
+    ) -> dict:
+        """Fetch the raw Aladhan timings payload (timings, date and meta).
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            method: Aladhan calculation method
+            school: Asr juristic school, 0 for Shafi and 1 for Hanafi
+            date: Date to fetch, today at the location when omitted
+            budget: Seconds all attempts together may take, unbounded if None
+
+        Raises:
+            requests.exceptions.RequestException: If every attempt failed or
+                the budget ran out
+            CircuitOpenError: If the Aladhan breaker is open, without waiting
         """
-        now = datetime.datetime.now(pytz.UTC)
-        params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "method": method,
-            "timestamp": int(now.timestamp()),
-        }
+        params = PrayerService._timings_params(
+            latitude, longitude, method, school, date
+        )
+        deadline = time.monotonic() + budget if budget is not None else None
+        breaker = get_breaker(ALADHAN)
 
         for attempt in range(PrayerService.MAX_RETRIES):
+            timeout = PrayerService.REQUEST_TIMEOUT
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    raise requests.exceptions.Timeout("Aladhan API budget exhausted")
             try:
-                response = requests.get(
+                response = breaker.call(
+                    _get,
                     PrayerService.BASE_URL,
                     params=params,
-                    timeout=5,
+                    timeout=timeout,
                     headers={"User-Agent": "AlexaAdhanSkill/1.0"},
+                    is_failure=_is_aladhan_failure,
                 )
-                response.raise_for_status()
                 data = response.json()
-                return data["data"]["timings"]
+                return data["data"]
             except requests.exceptions.RequestException as e:
                 logger.error(
                     "Aladhan API error",
@@ -66,30 +133,555 @@ class PrayerService:
                         ),
                     },
                 )
-                if attempt < PrayerService.MAX_RETRIES - 1:
+                if attempt < PrayerService.MAX_RETRIES - 1 and (
+                    deadline is None
+                    or deadline - time.monotonic() > PrayerService.RETRY_DELAY
+                ):
                     time.sleep(PrayerService.RETRY_DELAY)
                     continue
                 raise
 
     @staticmethod
-    def format_prayer_times(timings: dict) -> str:
-        formatted = []
+    def _timings_params(latitude, longitude, method, school, date) -> dict:
+        if date is None:
+            now = datetime.datetime.now(pytz.UTC)
+        else:
+            now = pytz.UTC.localize(
+                datetime.datetime.combine(date, datetime.time(12, 0))
+            )
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "method": method,
+            "school": school,
+            "timestamp": int(now.timestamp()),
+        }
+
+    @staticmethod
+    async def fetch_timings_async(
+        latitude: float,
+        longitude: float,
+        method: int = 2,
+        school: int = 0,
+        date: Optional[datetime.date] = None,
+        budget: Optional[float] = None,
+        url: Optional[str] = None,
+        breaker_name: str = ALADHAN,
+    ) -> dict:
+        """Coroutine variant of fetch_timings on the pooled async session.
 
-        for prayer in PrayerService.PRAYERS:
-            if prayer in timings:
-                formatted.append(f"{prayer}: {timings[prayer]}")
+        url and breaker_name select another host of the Aladhan API, e.g.
+        the ALADHAN_MIRROR_URL mirror.
+        """
+        params = PrayerService._timings_params(
+            latitude, longitude, method, school, date
+        )
+        deadline = time.monotonic() + budget if budget is not None else None
+        breaker = get_breaker(breaker_name)
 
-        return ", ".join(formatted)
+        for attempt in range(PrayerService.MAX_RETRIES):
+            timeout = PrayerService.REQUEST_TIMEOUT
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    raise asyncio.TimeoutError("Aladhan API budget exhausted")
+            try:
+                _, data = await breaker.call_async(
+                    async_http.get_json,
+                    url or PrayerService.BASE_URL,
+                    params=params,
+                    timeout=timeout,
+                    is_failure=_is_aladhan_failure,
+                )
+                return data["data"]
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(
+                    "Aladhan API error",
+                    extra={
+                        "attempt": attempt + 1,
+                        "max_retries": PrayerService.MAX_RETRIES,
+                        "error": str(e),
+                        "status_code": getattr(e, "status", None),
+                    },
+                )
+                if attempt < PrayerService.MAX_RETRIES - 1 and (
+                    deadline is None
+                    or deadline - time.monotonic() > PrayerService.RETRY_DELAY
+                ):
+                    await asyncio.sleep(PrayerService.RETRY_DELAY)
+                    continue
+                raise
 
     @staticmethod
-    def get_adhan_directive() -> PlayDirective:
-        adhan_url = f"{os.getenv('ATHAN_BUCKET_URL')}/adhan.mp3"
+    async def get_prayer_times_with_fallback_async(
+        latitude: float,
+        longitude: float,
+        method: int = 2,
+        school: int = 0,
+        timezone_resolver: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+        days_ahead: int = 0,
+    ) -> Tuple[PrayerDay, str]:
+        """Get a day's prayer times, degrading instead of failing.
+
+        Tiers are tried in order: fresh cache, precomputed timetable,
+        Aladhan within UPSTREAM_BUDGET, stale cached timings shifted to the
+        day, local astronomical computation. Aladhan requests slower than
+        usual are hedged (see services/hedging.py) with the
+        ALADHAN_MIRROR_URL mirror if set, else with the degraded tiers.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            method: Aladhan calculation method
+            school: Asr juristic school, 0 for Shafi and 1 for Hanafi
+            timezone_resolver: Returns an awaitable of the location timezone,
+                e.g. a task already running next to this one. Awaited only
+                when the cache does not know the timezone and a degraded
+                tier or another day needs it
+            days_ahead: 0 for today at the location, 1 for tomorrow...
+
+        Returns:
+            Tuple of the PrayerDay and the TimingsTier that served them
+
+        Raises:
+            LookupError: If no tier could produce timings
+        """
+        timezone_name = PrayerService._cached_timezone(
+            latitude, longitude, method, school
+        )
+        if not timezone_name and days_ahead and timezone_resolver is not None:
+            timezone_name = await timezone_resolver()
+
+        date, entry = PrayerService._lookup_fresh(
+            latitude, longitude, method, school, timezone_name, days_ahead
+        )
+        if entry is not None:
+            return entry.day, TimingsTier.FRESH_CACHE
+
+        day = PrayerService._lookup_timetable(
+            latitude, longitude, method, school, days_ahead
+        )
+        if day is not None:
+            return day, TimingsTier.TIMETABLE
+
+        deadline = time.monotonic() + PrayerService.UPSTREAM_BUDGET
+
+        async def fetch(url, breaker_name):
+            data = await PrayerService.fetch_timings_async(
+                latitude,
+                longitude,
+                method,
+                school,
+                date=date,
+                budget=max(0.0, deadline - time.monotonic()),
+                url=url,
+                breaker_name=breaker_name,
+            )
+            entry = PrayerService._cache_timings(
+                latitude, longitude, method, school, data
+            )
+            return entry.day, TimingsTier.UPSTREAM
+
+        async def degraded():
+            nonlocal timezone_name
+            if not timezone_name and timezone_resolver is not None:
+                timezone_name = await timezone_resolver()
+            return PrayerService._degraded_timings(
+                latitude, longitude, method, school, timezone_name, days_ahead
+            )
+
+        mirror_url = os.getenv("ALADHAN_MIRROR_URL")
+        try:
+            (day, tier), _ = await get_hedge(ALADHAN).run(
+                lambda: fetch(PrayerService.BASE_URL, ALADHAN),
+                (
+                    (lambda: fetch(mirror_url, ALADHAN_MIRROR))
+                    if mirror_url
+                    else degraded
+                ),
+            )
+            return day, tier
+        except Exception as e:
+            logger.warning(
+                "Aladhan unavailable, falling back",
+                extra={"error_type": type(e).__name__, "error_message": str(e)},
+            )
+
+        return await degraded()
+
+    @staticmethod
+    async def fetch_calendar_async(
+        latitude: float,
+        longitude: float,
+        method: int,
+        school: int,
+        year: int,
+        month: int,
+        budget: Optional[float] = None,
+    ) -> List[dict]:
+        """Fetch the raw Aladhan timings payloads of a whole month at once.
+
+        A single attempt: callers fall back to local computation rather
+        than retry within their budget.
+        """
+        timeout = PrayerService.REQUEST_TIMEOUT
+        if budget is not None:
+            timeout = min(timeout, budget)
+        _, data = await get_breaker(ALADHAN).call_async(
+            async_http.get_json,
+            f"{PrayerService.CALENDAR_URL}/{year}/{month}",
+            params={
+                "latitude": latitude,
+                "longitude": longitude,
+                "method": method,
+                "school": school,
+            },
+            timeout=timeout,
+            is_failure=_is_aladhan_failure,
+        )
+        return data["data"]
+
+    @staticmethod
+    async def get_prayer_days_async(
+        latitude: float,
+        longitude: float,
+        method: int,
+        school: int,
+        dates: List[datetime.date],
+        timezone_name: Optional[str],
+        upstream: bool = True,
+    ) -> Tuple[List[PrayerDay], str]:
+        """Prayer times of several days, fetched together.
+
+        Days are taken from the fresh cache, then the timetable. The
+        others come from one Aladhan calendar request per month they fall
+        in, every day of which is cached so the following days need no
+        request. The days of months Aladhan fails to answer, or of every
+        month without upstream, are computed locally.
+
+        Returns:
+            The days in the order of dates and the tier of the last step
+            that served one of them
+
+        Raises:
+            LookupError: If days had to be computed without a timezone
+        """
+        location = timings_cache.location_key(latitude, longitude, method, school)
+        days: Dict[datetime.date, PrayerDay] = {}
+        tier = TimingsTier.FRESH_CACHE
+        for date in dates:
+            entry = timings_cache.get_fresh(location, date)
+            if entry is not None:
+                days[date] = entry.day
+
+        timetable = get_timetable()
+        located = (
+            timetable.locate(latitude, longitude) if timetable and not school else None
+        )
+        if located is not None:
+            cell, timetable_timezone = located
+            for date in dates:
+                minutes = None if date in days else timetable.lookup(cell, method, date)
+                if minutes is not None:
+                    days[date] = PrayerDay.from_minutes(
+                        minutes, date, pytz.timezone(timetable_timezone)
+                    )
+                    tier = TimingsTier.TIMETABLE
+
+        missing = [date for date in dates if date not in days]
+        if missing and upstream:
+            months = sorted({(date.year, date.month) for date in missing})
+            # A month that fails does not discard the months that answered.
+            calendars = await asyncio.gather(
+                *(
+                    PrayerService.fetch_calendar_async(
+                        latitude,
+                        longitude,
+                        method,
+                        school,
+                        year,
+                        month,
+                        budget=PrayerService.UPSTREAM_BUDGET,
+                    )
+                    for year, month in months
+                ),
+                return_exceptions=True,
+            )
+            for (year, month), calendar in zip(months, calendars):
+                try:
+                    if isinstance(calendar, BaseException):
+                        raise calendar
+                    for data in calendar:
+                        entry = PrayerService._cache_timings(
+                            latitude, longitude, method, school, data
+                        )
+                        if entry.date in missing:
+                            days[entry.date] = entry.day
+                    tier = TimingsTier.UPSTREAM
+                except Exception as e:
+                    logger.warning(
+                        "Aladhan calendar unavailable, computing locally",
+                        extra={
+                            "year": year,
+                            "month": month,
+                            "error_type": type(e).__name__,
+                            "error_message": str(e),
+                        },
+                    )
+
+        missing = [date for date in dates if date not in days]
+        if missing:
+            if not timezone_name:
+                raise LookupError("No timezone to compute prayer times")
+            for date in missing:
+                days[date] = compute_prayer_day(
+                    latitude,
+                    longitude,
+                    date,
+                    pytz.timezone(timezone_name),
+                    method=method,
+                    school=school,
+                )
+            tier = TimingsTier.LOCAL
+
+        return [days[date] for date in dates], tier
+
+    @staticmethod
+    def _cached_timezone(latitude, longitude, method, school) -> Optional[str]:
+        """Timezone known without I/O, from the cache or the timetable."""
+        location = timings_cache.location_key(latitude, longitude, method, school)
+        latest = timings_cache.get_latest(location)
+        if latest and latest.timezone:
+            return latest.timezone
+
+        timetable = get_timetable()
+        located = timetable.locate(latitude, longitude) if timetable else None
+        return located[1] if located else None
+
+    @staticmethod
+    def _lookup_timetable(
+        latitude, longitude, method, school, days_ahead
+    ) -> Optional[PrayerDay]:
+        timetable = get_timetable()
+        # The timetable is precomputed for the standard (Shafi) Asr only.
+        if timetable is None or school:
+            return None
+        located = timetable.locate(latitude, longitude)
+        if located is None:
+            return None
+        cell, timezone_name = located
+        date = PrayerService._local_today(timezone_name) + datetime.timedelta(
+            days=days_ahead
+        )
+        minutes = timetable.lookup(cell, method, date)
+        if minutes is None:
+            return None
+        return PrayerDay.from_minutes(minutes, date, pytz.timezone(timezone_name))
+
+    @staticmethod
+    def _lookup_fresh(latitude, longitude, method, school, timezone_name, days_ahead):
+        """Return the local date asked for (None if unknown) and its fresh entry."""
+        if not timezone_name:
+            return None, None
+        date = PrayerService._local_today(timezone_name) + datetime.timedelta(
+            days=days_ahead
+        )
+        location = timings_cache.location_key(latitude, longitude, method, school)
+        return date, timings_cache.get_fresh(location, date)
+
+    @staticmethod
+    def _degraded_timings(
+        latitude, longitude, method, school, timezone_name, days_ahead
+    ) -> Tuple[PrayerDay, str]:
+        """Stale cache shifted to the date, else local computation."""
+        if not timezone_name:
+            raise LookupError("No timezone to compute degraded prayer times")
+
+        location = timings_cache.location_key(latitude, longitude, method, school)
+        date = PrayerService._local_today(timezone_name) + datetime.timedelta(
+            days=days_ahead
+        )
+        stale = timings_cache.get_stale(location, date)
+        if stale is not None:
+            entry, _ = stale
+            PrayerService._refresh_in_background(
+                latitude, longitude, method, school, date
+            )
+            if entry.date == date:
+                return entry.day, TimingsTier.STALE_CACHE
+            return (
+                PrayerService._shift_timings(
+                    entry.day,
+                    latitude,
+                    longitude,
+                    method,
+                    school,
+                    date,
+                    entry.day.timezone or pytz.timezone(timezone_name),
+                ),
+                TimingsTier.STALE_CACHE,
+            )
+
+        day = compute_prayer_day(
+            latitude,
+            longitude,
+            date,
+            pytz.timezone(timezone_name),
+            method=method,
+            school=school,
+        )
+        return day, TimingsTier.LOCAL
+
+    @staticmethod
+    def get_schedule_index(
+        latitude: float,
+        longitude: float,
+        method: int = 2,
+        school: int = 0,
+        timezone_resolver: Optional[Callable[[], Optional[str]]] = None,
+        offsets: Optional[Dict[str, int]] = None,
+    ) -> timings_cache.ScheduleIndex:
+        """Get the sorted schedule of today's and tomorrow's prayers.
+
+        The index is kept in the timings cache, so once built for the day a
+        warm container answers next prayer questions without any I/O.
+
+        Args:
+            offsets: The user's per prayer minute adjustments, part of the
+                schedule key since they change the schedule
+
+        Raises:
+            LookupError: If the timezone or the timings are unavailable
+        """
+        offsets = offsets or {}
+        location = timings_cache.location_key(latitude, longitude, method, school)
+        schedule_key = location + (tuple(sorted(offsets.items())),)
+        timezone_name = PrayerService._cached_timezone(
+            latitude, longitude, method, school
+        )
+        if not timezone_name and timezone_resolver is not None:
+            timezone_name = timezone_resolver()
+        if not timezone_name:
+            raise LookupError("No timezone to build the prayer schedule")
+
+        today = PrayerService._local_today(timezone_name)
+        index = timings_cache.get_schedule(schedule_key, today)
+        if index is not None:
+            return index
+
+        async def resolve_timezone():
+            return timezone_name
+
+        async def fetch():
+            return await asyncio.gather(
+                *(
+                    PrayerService.get_prayer_times_with_fallback_async(
+                        latitude,
+                        longitude,
+                        method,
+                        school,
+                        timezone_resolver=resolve_timezone,
+                        days_ahead=days_ahead,
+                    )
+                    for days_ahead in (0, 1)
+                )
+            )
+
+        days = []
+        degraded = False
+        for day, tier in async_http.run(fetch()):
+            degraded = degraded or tier in (
+                TimingsTier.STALE_CACHE,
+                TimingsTier.LOCAL,
+            )
+            days.append(day.shifted(offsets))
+
+        index = timings_cache.ScheduleIndex.build(days)
+        timings_cache.put_schedule(schedule_key, today, index, degraded=degraded)
+        return index
+
+    @staticmethod
+    def _fetch_and_cache(latitude, longitude, method, school, date=None):
+        data = PrayerService.fetch_timings(
+            latitude, longitude, method, school, date=date
+        )
+        return PrayerService._cache_timings(latitude, longitude, method, school, data)
+
+    @staticmethod
+    def _cache_timings(latitude, longitude, method, school, data):
+        return timings_cache.put(
+            timings_cache.location_key(latitude, longitude, method, school),
+            PrayerService.parse_timings(data),
+        )
+
+    @staticmethod
+    def _refresh_in_background(latitude, longitude, method, school, date):
+        """Refresh a stale entry without holding the response.
+
+        Lambda freezes the container once the response is returned, so the
+        refresh may complete at the start of the next warm invocation.
+        """
+        key = timings_cache.location_key(latitude, longitude, method, school) + (date,)
+        with PrayerService._refreshing_lock:
+            if key in PrayerService._refreshing:
+                return
+            PrayerService._refreshing.add(key)
+
+        def refresh():
+            try:
+                PrayerService._fetch_and_cache(
+                    latitude, longitude, method, school, date=date
+                )
+            except Exception as e:
+                logger.warning(
+                    "Background timings refresh failed",
+                    extra={"error_type": type(e).__name__, "error_message": str(e)},
+                )
+            finally:
+                with PrayerService._refreshing_lock:
+                    PrayerService._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    @staticmethod
+    def _shift_timings(
+        day, latitude, longitude, method, school, to_date, user_timezone
+    ) -> PrayerDay:
+        """Move a day's timings to to_date by the locally computed drift."""
+        before = compute_prayer_day(
+            latitude, longitude, day.date, user_timezone, method=method, school=school
+        )
+        after = compute_prayer_day(
+            latitude, longitude, to_date, user_timezone, method=method, school=school
+        )
+        drift = {
+            prayer: after.minute_of(prayer) - minutes for prayer, minutes in before
+        }
+        return day.shifted(drift, date=to_date, timezone=user_timezone)
+
+    @staticmethod
+    def _local_today(timezone_name: str) -> datetime.date:
+        return datetime.datetime.now(pytz.timezone(timezone_name)).date()
+
+    @staticmethod
+    def get_adhan_directive(handler_input=None) -> PlayDirective:
+        """Play the Adhan variant suited to the device and the user's choice.
+
+        The stream token names the variant, so playback events and failures
+        can be told apart per variant.
+        """
+        adhan, device = FULL_ADHAN, "speaker"
+        if handler_input is not None:
+            adhan = get_preferences(handler_input).adhan
+            device = audio_assets.device_class(handler_input.request_envelope)
+        variant, file_name = audio_assets.choose_variant(adhan, device)
+        adhan_url = f"{os.getenv('ATHAN_BUCKET_URL')}/{file_name}"
 
         return PlayDirective(
             play_behavior=PlayBehavior.REPLACE_ALL,
             audio_item=AudioItem(
                 stream=Stream(
-                    token="adhan_token",
+                    token=f"adhan_{variant}",
                     url=adhan_url,
                     offset_in_milliseconds=0,
                 )
@@ -131,14 +723,74 @@ class PrayerService:
             return location_result
 
         latitude, longitude = location_result
+        preferences = get_preferences(handler_input)
+
+        response_key = PrayerService.response_key(
+            latitude,
+            longitude,
+            preferences.method,
+            preferences.school,
+            preferences.offsets,
+            locale,
+        )
+        timezone_name = PrayerService._cached_timezone(
+            latitude, longitude, preferences.method, preferences.school
+        )
+        if timezone_name:
+            speech_text = timings_cache.get_response(
+                response_key, PrayerService._local_today(timezone_name)
+            )
+            if speech_text is not None:
+                logger.info("Prayer times served", extra={"timings_tier": "response"})
+                request_stats.record(
+                    latitude,
+                    longitude,
+                    preferences.method,
+                    preferences.school,
+                    preferences.offsets,
+                    locale,
+                    timezone_name,
+                )
+                return (
+                    response_builder.speak(speech_text)
+                    .set_should_end_session(True)
+                    .response
+                )
 
         try:
-            prayer_times = PrayerService.get_prayer_times(latitude, longitude)
-            formatted_times = PrayerService.format_prayer_times(prayer_times)
+            alexa_client = AsyncAlexaServiceClient.from_envelope(req_envelope)
+            device_id = req_envelope.context.system.device.device_id
+
+            async def fetch():
+                return await asyncio.gather(
+                    PrayerService.get_prayer_times_with_fallback_async(
+                        latitude,
+                        longitude,
+                        preferences.method,
+                        preferences.school,
+                        timezone_resolver=lambda: get_device_timezone_async(
+                            alexa_client, device_id
+                        ),
+                    ),
+                    get_city_name_async(latitude, longitude),
+                )
+
+            (prayer_times, tier), city_name = async_http.run(fetch())
+            handler_input.attributes_manager.request_attributes["timings_tier"] = tier
+            logger.info("Prayer times served", extra={"timings_tier": tier})
 
-            city_name = get_city_name(latitude, longitude)
-            location_text = texts.LOCATION_TEXT.format(city_name) if city_name else ""
-            speech_text = texts.PRIER_TIMES.format(formatted_times) + location_text
+            speech_text = PrayerService.render_prayer_times(
+                prayer_times, tier, city_name, preferences.offsets, response_key, texts
+            )
+            request_stats.record(
+                latitude,
+                longitude,
+                preferences.method,
+                preferences.school,
+                preferences.offsets,
+                locale,
+                prayer_times.timezone_name,
+            )
 
             return (
                 response_builder.speak(speech_text)
@@ -156,6 +808,178 @@ class PrayerService:
                 .response
             )
 
+    @staticmethod
+    def response_key(
+        latitude: float,
+        longitude: float,
+        method: int,
+        school: int,
+        offsets: Dict[str, int],
+        locale: str,
+    ) -> tuple:
+        """Key of a rendered prayer times answer.
+
+        The answer only depends on the location cell, the local date, the
+        preferences and the locale, users sharing them share the speech.
+        """
+        return timings_cache.location_key(latitude, longitude, method, school) + (
+            tuple(sorted(offsets.items())),
+            locale,
+        )
+
+    @staticmethod
+    def render_prayer_times(
+        prayer_times: PrayerDay,
+        tier: str,
+        city_name: Optional[str],
+        offsets: Dict[str, int],
+        response_key: tuple,
+        texts,
+    ) -> str:
+        """Render the prayer times answer and keep it in the timings cache."""
+        formatted_times = prayer_times.shifted(offsets).format()
+
+        location_text = texts.LOCATION_TEXT.format(city_name) if city_name else ""
+        speech_text = texts.PRIER_TIMES.format(formatted_times) + location_text
+        # Answers missing the city or built from degraded timings are
+        # rendered again soon, once the upstreams may be back.
+        timings_cache.put_response(
+            response_key,
+            prayer_times.date,
+            speech_text,
+            degraded=not city_name
+            or tier in (TimingsTier.STALE_CACHE, TimingsTier.LOCAL),
+        )
+        return speech_text
+
+    @staticmethod
+    def prime_location(
+        latitude: float,
+        longitude: float,
+        method: int,
+        school: int,
+        offsets: Dict[str, int],
+        locale: str,
+        timezone_name: str,
+    ) -> bool:
+        """Fill the caches prayer times and next prayer requests of a
+        location read: timings, schedule and rendered answer.
+
+        Returns:
+            False if the answer of the day was already rendered, nothing
+            is fetched then
+        """
+        response_key = PrayerService.response_key(
+            latitude, longitude, method, school, offsets, locale
+        )
+        if timings_cache.get_response(
+            response_key, PrayerService._local_today(timezone_name)
+        ):
+            return False
+
+        async def resolve_timezone():
+            return timezone_name
+
+        async def fetch():
+            return await asyncio.gather(
+                PrayerService.get_prayer_times_with_fallback_async(
+                    latitude,
+                    longitude,
+                    method,
+                    school,
+                    timezone_resolver=resolve_timezone,
+                ),
+                get_city_name_async(latitude, longitude),
+            )
+
+        (prayer_times, tier), city_name = async_http.run(fetch())
+        PrayerService.render_prayer_times(
+            prayer_times,
+            tier,
+            city_name,
+            offsets,
+            response_key,
+            get_speech_text(locale),
+        )
+        PrayerService.get_schedule_index(
+            latitude,
+            longitude,
+            method,
+            school,
+            timezone_resolver=lambda: timezone_name,
+            offsets=offsets,
+        )
+        return True
+
+    @staticmethod
+    def format_duration(minutes: int, texts) -> str:
+        hours, minutes = divmod(minutes, 60)
+        parts = []
+        if hours:
+            parts.append(texts.DURATION_HOURS[hours > 1].format(hours))
+        if minutes or not hours:
+            parts.append(texts.DURATION_MINUTES[minutes > 1].format(minutes))
+        return texts.DURATION_SEPARATOR.join(parts)
+
+    @staticmethod
+    def get_next_prayer_with_location(handler_input):
+        """Answer with the next prayer and the time left until it.
+
+        Args:
+            handler_input: The Alexa handler input
+
+        Returns:
+            Response: Response naming the next prayer
+        """
+        locale = handler_input.request_envelope.request.locale
+        texts = get_speech_text(locale)
+        req_envelope = handler_input.request_envelope
+        response_builder = handler_input.response_builder
+
+        success, location_result = get_device_location(
+            req_envelope, response_builder, handler_input.service_client_factory
+        )
+
+        if not success:
+            return location_result
+
+        latitude, longitude = location_result
+        preferences = get_preferences(handler_input)
+
+        try:
+            index = PrayerService.get_schedule_index(
+                latitude,
+                longitude,
+                preferences.method,
+                preferences.school,
+                timezone_resolver=lambda: get_device_timezone(
+                    req_envelope, handler_input.service_client_factory
+                ),
+                offsets=preferences.offsets,
+            )
+            now = time.time()
+            prayer, moment = index.next_prayer(now)
+            minutes_left = max(1, math.ceil((moment.timestamp() - now) / 60))
+
+            speech_text = texts.NEXT_PRAYER.format(
+                prayer, PrayerService.format_duration(minutes_left, texts)
+            )
+            return (
+                response_builder.speak(speech_text)
+                .set_should_end_session(True)
+                .response
+            )
+        except Exception as e:
+            logger.error(
+                "Error getting next prayer",
+                extra={"error_type": type(e).__name__, "error_message": str(e)},
+            )
+            return (
+                response_builder.speak(texts.ERROR)
+                .set_should_end_session(False)
+                .response
+            )
+
     @staticmethod
     def handle_service_exception(handler_input, exception):
         """Handle service exceptions and return appropriate responses.
@@ -189,3 +1013,15 @@ class PrayerService:
             .set_should_end_session(False)
             .response
         )
+
+
+def _get(url, **kwargs):
+    response = requests.get(url, **kwargs)
+    response.raise_for_status()
+    return response
+
+
+def _is_aladhan_failure(exception: Exception) -> bool:
+    response = getattr(exception, "response", None)
+    status_code = getattr(response, "status_code", getattr(exception, "status", None))
+    return status_code is None or status_code >= 500 or status_code == 429
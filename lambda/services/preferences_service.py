@@ -0,0 +1,345 @@
+"""Per-user calculation preferences, fields of the user state item.
+
+Preferences are read at most once per invocation and kept in an in-process
+TTL cache, so a warm container answers its regular users without any
+DynamoDB call. Users without an item get locale defaults, which are cached
+too, so a missing item does not cost a read on every request either.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from ask_sdk_core.utils import get_slot
+from ask_sdk_model.slu.entityresolution import StatusCode
+from aws_lambda_powertools import Logger
+
+from models.prayer_day import PRAYERS
+from repositories.user_state_repository import get_user_state
+from services.prayer_calculation import METHODS
+from speech_text import get_speech_text
+
+logger = Logger(service="preferences_service")
+
+CACHE_TTL_SECONDS = 300
+MAX_ENTRIES = 4096
+MAX_OFFSET_MINUTES = 30
+MAX_REMINDER_LEAD_MINUTES = 60
+REQUEST_ATTRIBUTE = "preferences"
+
+SHAFI = 0
+HANAFI = 1
+
+# Adhan played: the whole call, or the opening takbir only.
+FULL_ADHAN = "full"
+TAKBIR_ONLY = "takbir"
+
+# UserPreferences attribute -> user state field.
+FIELDS = {
+    "method": "method",
+    "school": "school",
+    "offsets": "offsets",
+    "reminder_lead_minutes": "reminderLeadMinutes",
+    "adhan": "adhan",
+}
+
+# Aladhan method used when the user never chose one.
+DEFAULT_METHODS = {
+    "fr-FR": 12,  # Union Organization Islamic de France
+}
+DEFAULT_METHOD = 2  # Islamic Society of North America
+
+
+class UserPreferences:
+    __slots__ = ("method", "school", "offsets", "reminder_lead_minutes", "adhan")
+
+    def __init__(
+        self,
+        method: int = DEFAULT_METHOD,
+        school: int = SHAFI,
+        offsets: Optional[Dict[str, int]] = None,
+        reminder_lead_minutes: int = 0,
+        adhan: str = FULL_ADHAN,
+    ):
+        self.method = method
+        self.school = school
+        self.offsets = offsets or {}
+        self.reminder_lead_minutes = reminder_lead_minutes
+        self.adhan = adhan
+
+    @classmethod
+    def defaults(cls, locale: Optional[str]) -> "UserPreferences":
+        return cls(method=DEFAULT_METHODS.get(locale, DEFAULT_METHOD))
+
+    @classmethod
+    def from_fields(cls, fields: dict, locale: Optional[str]) -> "UserPreferences":
+        """Build from stored user state fields, locale defaults for the rest."""
+        preferences = cls.defaults(locale)
+        for name, field in FIELDS.items():
+            if field in fields:
+                setattr(preferences, name, fields[field])
+        return preferences
+
+    def copy(self) -> "UserPreferences":
+        return UserPreferences(
+            self.method,
+            self.school,
+            dict(self.offsets),
+            self.reminder_lead_minutes,
+            self.adhan,
+        )
+
+
+# User id -> (stored preference fields, expiry). Fields rather than
+# UserPreferences since the defaults depend on the request locale.
+_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _cached(user_id: str) -> Optional[dict]:
+    with _lock:
+        cached = _cache.get(user_id)
+        if cached is None:
+            return None
+        fields, expires_at = cached
+        if time.time() >= expires_at:
+            del _cache[user_id]
+            return None
+        _cache.move_to_end(user_id)
+        return fields
+
+
+def _remember(user_id: str, fields: dict) -> None:
+    with _lock:
+        _cache[user_id] = (fields, time.time() + CACHE_TTL_SECONDS)
+        _cache.move_to_end(user_id)
+        while len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def get_preferences(handler_input) -> UserPreferences:
+    """Return the user's preferences, read through the request and TTL caches.
+
+    Never raises: a DynamoDB error is logged and answered with the locale
+    defaults, personalization must not take the skill down.
+    """
+    request_attributes = handler_input.attributes_manager.request_attributes
+    preferences = request_attributes.get(REQUEST_ATTRIBUTE)
+    if preferences is not None:
+        return preferences
+
+    req_envelope = handler_input.request_envelope
+    user_id = req_envelope.context.system.user.user_id
+    locale = req_envelope.request.locale
+
+    fields = _cached(user_id)
+    if fields is None:
+        state = get_user_state(handler_input)
+        fields = {
+            field: state.get(field)
+            for field in FIELDS.values()
+            if state.get(field) is not None
+        }
+        # Defaults served because of an error are not cached, the next
+        # invocation tries the table again.
+        if not state.load_failed:
+            _remember(user_id, fields)
+
+    preferences = UserPreferences.from_fields(fields, locale)
+    request_attributes[REQUEST_ATTRIBUTE] = preferences
+    return preferences
+
+
+def update_preferences(handler_input, **changes) -> UserPreferences:
+    """Change preferences in the user state and this container's cache.
+
+    The user state is flushed when the invocation ends. Other warm
+    containers pick the change up when their entry expires, within
+    CACHE_TTL_SECONDS.
+
+    Raises:
+        ValueError: If a value is out of the supported range
+        RuntimeError: If the stored preferences could not be read, writing
+            would overwrite them blindly
+    """
+    preferences = get_preferences(handler_input).copy()
+    for name, value in changes.items():
+        setattr(preferences, name, value)
+    validate(preferences)
+
+    req_envelope = handler_input.request_envelope
+    user_id = req_envelope.context.system.user.user_id
+    state = get_user_state(handler_input)
+    if state.load_failed:
+        raise RuntimeError("User state unavailable")
+    fields = dict(_cached(user_id) or {})
+    for name in changes:
+        fields[FIELDS[name]] = getattr(preferences, name)
+        state.set(FIELDS[name], getattr(preferences, name))
+
+    _remember(user_id, fields)
+    handler_input.attributes_manager.request_attributes[REQUEST_ATTRIBUTE] = preferences
+    logger.info(
+        "User preferences updated",
+        extra={"changes": {name: str(value) for name, value in changes.items()}},
+    )
+    return preferences
+
+
+def validate(preferences: UserPreferences) -> None:
+    if preferences.method not in METHODS:
+        raise ValueError(f"Unsupported calculation method {preferences.method}")
+    if preferences.school not in (SHAFI, HANAFI):
+        raise ValueError(f"Unsupported Asr school {preferences.school}")
+    for prayer, minutes in preferences.offsets.items():
+        if prayer not in PRAYERS or abs(minutes) > MAX_OFFSET_MINUTES:
+            raise ValueError(f"Unsupported offset {minutes} for {prayer}")
+    if not 0 <= preferences.reminder_lead_minutes <= MAX_REMINDER_LEAD_MINUTES:
+        raise ValueError(
+            f"Unsupported reminder lead time {preferences.reminder_lead_minutes}"
+        )
+    if preferences.adhan not in (FULL_ADHAN, TAKBIR_ONLY):
+        raise ValueError(f"Unsupported Adhan {preferences.adhan}")
+
+
+class PreferencesService:
+    """Voice intents changing the user's preferences."""
+
+    @staticmethod
+    def set_calculation_method(handler_input):
+        texts = _texts(handler_input)
+        method, name = _resolved_slot(handler_input, "method")
+        return PreferencesService._update(
+            handler_input,
+            texts.PREFERENCE_METHOD_SET.format(name),
+            method=int(method) if method is not None else None,
+        )
+
+    @staticmethod
+    def set_asr_school(handler_input):
+        texts = _texts(handler_input)
+        school, name = _resolved_slot(handler_input, "school")
+        return PreferencesService._update(
+            handler_input,
+            texts.PREFERENCE_SCHOOL_SET.format(name),
+            school=int(school) if school is not None else None,
+        )
+
+    @staticmethod
+    def set_prayer_offset(handler_input):
+        texts = _texts(handler_input)
+        prayer, _ = _resolved_slot(handler_input, "prayer")
+        direction, _ = _resolved_slot(handler_input, "direction")
+        minutes = _number_slot(handler_input, "minutes")
+        if prayer is None or minutes is None:
+            return PreferencesService._update(handler_input, None, offsets=None)
+
+        offsets = dict(get_preferences(handler_input).offsets)
+        if minutes:
+            earlier = direction == "earlier"
+            offsets[prayer] = -minutes if earlier else minutes
+            message = texts.PREFERENCE_OFFSET_SET.format(
+                prayer, minutes, texts.PREFERENCE_OFFSET_DIRECTIONS[earlier]
+            )
+        else:
+            offsets.pop(prayer, None)
+            message = texts.PREFERENCE_OFFSET_CLEARED.format(prayer)
+        return PreferencesService._update(handler_input, message, offsets=offsets)
+
+    @staticmethod
+    def set_reminder_lead(handler_input):
+        texts = _texts(handler_input)
+        minutes = _number_slot(handler_input, "minutes")
+        message = (
+            texts.PREFERENCE_REMINDER_LEAD_SET.format(minutes)
+            if minutes
+            else texts.PREFERENCE_REMINDER_LEAD_CLEARED
+        )
+        return PreferencesService._update(
+            handler_input, message, reminder_lead_minutes=minutes
+        )
+
+    @staticmethod
+    def set_adhan(handler_input, preview=None):
+        """Choose between the full Adhan and the takbir only.
+
+        Args:
+            handler_input: The Alexa handler input
+            preview: Called with handler_input once the choice is saved,
+                returns the directive playing the chosen Adhan
+        """
+        texts = _texts(handler_input)
+        adhan, name = _resolved_slot(handler_input, "adhan")
+        return PreferencesService._update(
+            handler_input,
+            texts.PREFERENCE_ADHAN_SET.format(name),
+            preview=preview,
+            adhan=adhan,
+        )
+
+    @staticmethod
+    def _update(handler_input, message, preview=None, **changes):
+        """Apply changes and confirm them with message, then play the
+        directive returned by preview(handler_input) if given.
+
+        A None message or change value stands for a missing slot and is
+        answered with PREFERENCE_INVALID.
+        """
+        texts = _texts(handler_input)
+        response_builder = handler_input.response_builder
+
+        try:
+            if message is None or any(value is None for value in changes.values()):
+                raise ValueError("Missing slot value")
+            update_preferences(handler_input, **changes)
+        except ValueError as e:
+            logger.info("Rejected preference change", extra={"error": str(e)})
+            return (
+                response_builder.speak(texts.PREFERENCE_INVALID)
+                .set_should_end_session(False)
+                .response
+            )
+        except Exception as e:
+            logger.error(
+                "Failed to save user preferences",
+                extra={"error_type": type(e).__name__, "error_message": str(e)},
+            )
+            return (
+                response_builder.speak(texts.ERROR)
+                .set_should_end_session(False)
+                .response
+            )
+
+        response_builder.speak(message)
+        if preview is not None:
+            response_builder.add_directive(preview(handler_input))
+        return response_builder.set_should_end_session(True).response
+
+
+def _texts(handler_input):
+    return get_speech_text(handler_input.request_envelope.request.locale)
+
+
+def _resolved_slot(handler_input, name: str):
+    """Return the (id, spoken name) of a custom slot's resolved value."""
+    slot = get_slot(handler_input, name)
+    if slot is None or slot.resolutions is None:
+        return None, None
+    for resolution in slot.resolutions.resolutions_per_authority or []:
+        if resolution.status.code == StatusCode.ER_SUCCESS_MATCH and resolution.values:
+            value = resolution.values[0].value
+            return value.id, value.name
+    return None, None
+
+
+def _number_slot(handler_input, name: str) -> Optional[int]:
+    slot = get_slot(handler_input, name)
+    if slot is None or slot.value is None or not slot.value.isdigit():
+        return None
+    return int(slot.value)
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
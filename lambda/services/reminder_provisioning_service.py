@@ -0,0 +1,217 @@
+"""Reminder setup split between the voice session and a queue worker.
+
+In session, EnableNotificationsIntent only checks the permissions, captures
+what the worker cannot get later (API endpoint and token, the coordinates
+of mobile devices, the preferences the user heard about) and enqueues a
+provisioning job, so the response does not wait on the Device Settings,
+Aladhan and Reminders APIs.
+
+Out of session, worker.py resolves the location, timezone and prayer
+times of the job and reconciles the user's reminders: the reminders
+tracked in the user state, by a previous job or by the in-session setup
+enqueue failures fall back on, are deleted before the new ones are
+created, so asking again replaces reminders instead of piling them up and
+a retried job converges to one reminder per prayer.
+"""
+
+import asyncio
+import time
+
+import pytz
+from ask_sdk_model.services import ServiceException
+from aws_lambda_powertools import Logger
+
+from repositories.user_state_repository import UserState, get_repository
+from services import async_http
+from services.async_api_client import AsyncAlexaServiceClient
+from services.geolocation_service import (
+    device_supports_geolocation,
+    get_device_coordinates_async,
+    get_device_location,
+    get_device_timezone_async,
+)
+from services.prayer_notification_service import (
+    TOKENS_FIELD,
+    PrayerNotificationService,
+)
+from services.prayer_times_service import PrayerService
+from services.preferences_service import FIELDS, UserPreferences, get_preferences
+from services.reminder_queue import get_reminder_queue
+from speech_text import get_speech_text
+
+logger = Logger(service="reminder_provisioning_service")
+
+# User state field holding the id of the last job provisioned, the alert
+# tokens of its reminders are in TOKENS_FIELD.
+JOB_FIELD = "reminderJobId"
+
+# Reminders API statuses a retry cannot fix: the token expired or the
+# permission was revoked (401), or the user has too many reminders (403).
+PERMANENT_STATUSES = (401, 403)
+
+
+class ProvisioningError(Exception):
+    """A job step failed in a way a later attempt may not."""
+
+
+class ReminderProvisioningService:
+    @staticmethod
+    def queue_prayer_notifications(handler_input):
+        """Enqueue the user's reminder setup and answer at once.
+
+        Falls back to the in-session setup if the job cannot be enqueued.
+        """
+        req_envelope = handler_input.request_envelope
+        response_builder = handler_input.response_builder
+        system = req_envelope.context.system
+        locale = req_envelope.request.locale
+        texts = get_speech_text(locale)
+
+        if not PrayerNotificationService.check_reminder_permission(
+            system.user.permissions
+        ):
+            return PrayerNotificationService.request_reminder_permission(
+                response_builder, texts
+            )
+        if not system.api_access_token:
+            logger.warning("No API access token available")
+            return response_builder.speak(
+                texts.NOTIFY_MISSING_LOCATION_PERMISSIONS
+            ).response
+
+        # Mobile devices send their coordinates with the request only, the
+        # addresses of stationary devices are geocoded by the worker.
+        coordinates = None
+        if device_supports_geolocation(req_envelope):
+            success, location_result = get_device_location(
+                req_envelope, response_builder
+            )
+            if not success:
+                return location_result
+            coordinates = list(location_result)
+
+        preferences = get_preferences(handler_input)
+        job = {
+            "jobId": req_envelope.request.request_id,
+            "userId": system.user.user_id,
+            "deviceId": system.device.device_id,
+            "apiEndpoint": system.api_endpoint,
+            "apiAccessToken": system.api_access_token,
+            "locale": locale,
+            "coordinates": coordinates,
+            "preferences": {
+                field: getattr(preferences, name) for name, field in FIELDS.items()
+            },
+            "requestedAt": int(time.time()),
+        }
+
+        try:
+            get_reminder_queue().send(job)
+        except Exception as e:
+            logger.error(
+                "Failed to enqueue reminder provisioning, setting up in session",
+                extra={"error_type": type(e).__name__, "error_message": str(e)},
+            )
+            return PrayerNotificationService.setup_prayer_notifications(handler_input)
+
+        logger.info(
+            "Reminder provisioning queued",
+            extra={"job_id": job["jobId"], "has_coordinates": bool(coordinates)},
+        )
+        return (
+            response_builder.speak(texts.REMINDER_SETUP_QUEUED)
+            .set_should_end_session(True)
+            .response
+        )
+
+    @staticmethod
+    def provision(job: dict) -> None:
+        """Create or replace the reminders of a job.
+
+        Jobs already provisioned and jobs failing for good (expired token,
+        revoked permission, reminders limit) are logged and dropped.
+
+        Raises:
+            Exception: When a retry may succeed, so the message goes back
+                to the queue
+        """
+        job_id = job["jobId"]
+        repository = get_repository()
+        state = (
+            repository.load(job["userId"])
+            if repository is not None
+            else UserState(job["userId"])
+        )
+        if state.get(JOB_FIELD) == job_id:
+            logger.info("Job already provisioned", extra={"job_id": job_id})
+            return
+
+        try:
+            async_http.run(ReminderProvisioningService._provision(job, state))
+        except ServiceException as e:
+            if e.status_code not in PERMANENT_STATUSES:
+                raise
+            logger.warning(
+                "Reminder provisioning dropped",
+                extra={"job_id": job_id, "status_code": e.status_code},
+            )
+            state.set(JOB_FIELD, job_id)
+        finally:
+            if repository is not None and not repository.flush(state):
+                raise ProvisioningError("Failed to save reminder tokens")
+
+        logger.info("Reminder provisioning done", extra={"job_id": job_id})
+
+    @staticmethod
+    async def _provision(job: dict, state: UserState) -> None:
+        alexa_client = AsyncAlexaServiceClient(
+            job["apiEndpoint"], job["apiAccessToken"]
+        )
+        device_id = job["deviceId"]
+        locale = job["locale"]
+        preferences = UserPreferences.from_fields(job["preferences"], locale)
+
+        coordinates = job.get("coordinates") or await get_device_coordinates_async(
+            alexa_client, device_id
+        )
+        if not coordinates:
+            raise ProvisioningError("Device location unavailable")
+        latitude, longitude = coordinates
+
+        timezone_task = asyncio.ensure_future(
+            get_device_timezone_async(alexa_client, device_id)
+        )
+        prayer_times, tier = await PrayerService.get_prayer_times_with_fallback_async(
+            latitude,
+            longitude,
+            preferences.method,
+            preferences.school,
+            timezone_resolver=lambda: timezone_task,
+        )
+        timezone = await timezone_task
+        if not timezone:
+            raise ProvisioningError("Device timezone unavailable")
+
+        # Tokens of the reminders created are kept even if others failed,
+        # the retry deletes them before creating the whole set again.
+        reminders, formatted_times = (
+            await PrayerNotificationService.setup_prayer_reminders_async(
+                prayer_times.shifted(preferences.offsets),
+                alexa_client,
+                pytz.timezone(timezone),
+                locale=locale,
+                lead_minutes=preferences.reminder_lead_minutes,
+                state=state,
+            )
+        )
+
+        logger.info(
+            "Reminders reconciled",
+            extra={
+                "job_id": job["jobId"],
+                "timings_tier": tier,
+                "num_reminders_created": len(reminders),
+                "formatted_times": formatted_times,
+            },
+        )
+        state.set(JOB_FIELD, job["jobId"])
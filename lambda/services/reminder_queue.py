@@ -0,0 +1,168 @@
+"""Queue of reminder provisioning jobs, drained out of session by worker.py.
+
+REMINDER_QUEUE_URL selects the queue: the URL of the SQS FIFO queue of the
+stack, "memory" for an in-process stand-in to run the whole flow locally,
+or unset to keep setting reminders up in session.
+
+A user's jobs share a message group so they are provisioned in the order
+they were asked for, and the job id doubles as deduplication id so a
+retried skill invocation does not enqueue its job twice.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, List, Optional, Union
+
+from aws_lambda_powertools import Logger
+
+logger = Logger(service="reminder_queue")
+
+MEMORY = "memory"
+
+
+def _digest(value: str) -> str:
+    """SQS group and deduplication ids are limited to 128 characters, Alexa
+    user ids are longer."""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class SqsReminderQueue:
+    def __init__(self, url: str, client=None):
+        self.url = url
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client("sqs")
+        return self._client
+
+    def send(self, job: dict) -> None:
+        self.client.send_message(
+            QueueUrl=self.url,
+            MessageBody=json.dumps(job),
+            MessageGroupId=_digest(job["userId"]),
+            MessageDeduplicationId=_digest(job["jobId"]),
+        )
+
+
+class InMemoryReminderQueue:
+    """Stand-in for the SQS FIFO queue, delivered to the worker by drain().
+
+    Mirrors the parts of SQS the worker relies on: deduplication within
+    DEDUPLICATION_WINDOW, partial batch failures put back at the head of
+    the queue, and dead letters after MAX_RECEIVE_COUNT receives.
+    """
+
+    url = MEMORY
+    BATCH_SIZE = 10
+    MAX_RECEIVE_COUNT = 3
+    DEDUPLICATION_WINDOW = 300
+
+    def __init__(self):
+        self.messages = deque()
+        self.dead_letters: List[dict] = []
+        self._sent = {}
+        self._lock = threading.Lock()
+
+    def send(self, job: dict) -> None:
+        deduplication_id = _digest(job["jobId"])
+        now = time.time()
+        with self._lock:
+            self._sent = {
+                key: sent_at
+                for key, sent_at in self._sent.items()
+                if now - sent_at < self.DEDUPLICATION_WINDOW
+            }
+            if deduplication_id in self._sent:
+                logger.info("Duplicate job dropped", extra={"job_id": job["jobId"]})
+                return
+            self._sent[deduplication_id] = now
+            self.messages.append(
+                {
+                    "messageId": str(uuid.uuid4()),
+                    "receiptHandle": str(uuid.uuid4()),
+                    "body": json.dumps(job),
+                    "attributes": {
+                        "ApproximateReceiveCount": "0",
+                        "SentTimestamp": str(int(now * 1000)),
+                        "SenderId": "local",
+                        "ApproximateFirstReceiveTimestamp": str(int(now * 1000)),
+                        "MessageGroupId": _digest(job["userId"]),
+                        "MessageDeduplicationId": deduplication_id,
+                    },
+                    "messageAttributes": {},
+                    "md5OfBody": hashlib.md5(json.dumps(job).encode()).hexdigest(),
+                    "eventSource": "aws:sqs",
+                    "eventSourceARN": "arn:aws:sqs:local:000000000000:reminders.fifo",
+                    "awsRegion": "local",
+                }
+            )
+
+    def drain(self, handler: Callable, context=None) -> int:
+        """Deliver batches to an SQS event handler until the queue is empty.
+
+        Returns:
+            int: Number of messages processed successfully
+        """
+        processed = 0
+        while self.messages:
+            with self._lock:
+                batch = [
+                    self.messages.popleft()
+                    for _ in range(min(self.BATCH_SIZE, len(self.messages)))
+                ]
+            for record in batch:
+                attributes = record["attributes"]
+                attributes["ApproximateReceiveCount"] = str(
+                    int(attributes["ApproximateReceiveCount"]) + 1
+                )
+
+            try:
+                response = handler({"Records": batch}, context) or {}
+                failed = {
+                    failure["itemIdentifier"]
+                    for failure in response.get("batchItemFailures", [])
+                }
+            except Exception as e:
+                # Like Lambda, a handler error returns the whole batch
+                logger.warning(
+                    "Batch failed",
+                    extra={"error_type": type(e).__name__, "error_message": str(e)},
+                )
+                failed = {record["messageId"] for record in batch}
+            retried = []
+            for record in batch:
+                if record["messageId"] not in failed:
+                    processed += 1
+                elif (
+                    int(record["attributes"]["ApproximateReceiveCount"])
+                    >= self.MAX_RECEIVE_COUNT
+                ):
+                    self.dead_letters.append(record)
+                else:
+                    retried.append(record)
+            with self._lock:
+                self.messages.extendleft(reversed(retried))
+        return processed
+
+
+_queue = None
+
+
+def get_reminder_queue() -> Optional[Union[SqsReminderQueue, InMemoryReminderQueue]]:
+    """Queue of REMINDER_QUEUE_URL, None when reminders are set up in session."""
+    global _queue
+    url = os.getenv("REMINDER_QUEUE_URL")
+    if not url:
+        return None
+    if _queue is None or _queue.url != url:
+        _queue = InMemoryReminderQueue() if url == MEMORY else SqsReminderQueue(url)
+    return _queue
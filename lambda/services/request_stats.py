@@ -0,0 +1,218 @@
+"""Counts of the locations users ask prayer times for, across containers.
+
+Each container counts its requests per location in process and adds them
+to the DynamoDB items of the day at most every FLUSH_INTERVAL, so recording
+costs one UpdateItem per container and interval rather than a write per
+request. The warm-up (handlers/warmup.py) sums the items of the last
+HISTORY_DAYS days to find the locations worth priming.
+
+A location is what a rendered answer depends on: the timings cache cell,
+method, school, offsets and locale, plus its timezone so the warm-up
+knows when its next prayer is without any I/O. REQUEST_STATS_TABLE selects
+the table, recording is off when it is unset.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from aws_lambda_powertools import Logger
+
+from repositories.dynamodb import deserialize, get_client
+from services.timings_cache import COORDINATE_PRECISION
+
+logger = Logger(service="request_stats")
+
+KEY_PREFIX = "stats#locations#"
+FLUSH_INTERVAL = 60
+HISTORY_DAYS = 3
+# Items per day, a day's locations are spread over them to stay well below
+# the 400 KB item limit.
+SHARDS = 8
+MAX_PENDING = 512
+MAX_BATCH_ATTEMPTS = 5
+BATCH_RETRY_DELAY = 0.05
+EXPIRES_ATTRIBUTE = "expiresAt"
+
+
+class Location(NamedTuple):
+    latitude: float
+    longitude: float
+    method: int
+    school: int
+    offsets: Tuple[Tuple[str, int], ...]
+    locale: str
+    timezone: str
+
+    def to_attribute(self) -> str:
+        return json.dumps(
+            [
+                self.latitude,
+                self.longitude,
+                self.method,
+                self.school,
+                dict(self.offsets),
+                self.locale,
+                self.timezone,
+            ],
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_attribute(cls, value: str) -> "Location":
+        latitude, longitude, method, school, offsets, locale, timezone = json.loads(
+            value
+        )
+        return cls(
+            latitude,
+            longitude,
+            method,
+            school,
+            tuple(sorted(offsets.items())),
+            locale,
+            timezone,
+        )
+
+
+_pending: Counter = Counter()
+_last_flush = time.monotonic()
+_lock = threading.Lock()
+
+
+def _table_name() -> Optional[str]:
+    return os.getenv("REQUEST_STATS_TABLE")
+
+
+def record(
+    latitude: float,
+    longitude: float,
+    method: int,
+    school: int,
+    offsets: Dict[str, int],
+    locale: str,
+    timezone_name: Optional[str],
+) -> None:
+    """Count a prayer times request, flushing the counts when due."""
+    if not _table_name() or not timezone_name:
+        return
+    location = Location(
+        round(latitude, COORDINATE_PRECISION),
+        round(longitude, COORDINATE_PRECISION),
+        method,
+        school,
+        tuple(sorted(offsets.items())),
+        locale,
+        timezone_name,
+    )
+    with _lock:
+        _pending[location] += 1
+    flush()
+
+
+def flush(force: bool = False) -> None:
+    """Add the pending counts to today's items if FLUSH_INTERVAL elapsed.
+
+    Never raises: counts that failed to be written are kept for the next
+    flush, statistics must not fail a request.
+    """
+    global _last_flush
+    table_name = _table_name()
+    now = time.monotonic()
+    with _lock:
+        if not table_name or not _pending:
+            return
+        if (
+            not force
+            and now - _last_flush < FLUSH_INTERVAL
+            and len(_pending) < MAX_PENDING
+        ):
+            return
+        pending = _pending.copy()
+        _pending.clear()
+        _last_flush = now
+
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    expires_at = int(time.time()) + (HISTORY_DAYS + 1) * 86400
+    shards: Dict[int, List[Tuple[Location, int]]] = {}
+    for location, count in pending.items():
+        shards.setdefault(_shard(location), []).append((location, count))
+
+    for shard, counts in shards.items():
+        names = {"#expires": EXPIRES_ATTRIBUTE}
+        values = {":expires": {"N": str(expires_at)}}
+        clauses = []
+        for index, (location, count) in enumerate(counts):
+            names[f"#l{index}"] = location.to_attribute()
+            values[f":n{index}"] = {"N": str(count)}
+            clauses.append(f"#l{index} :n{index}")
+        try:
+            get_client().update_item(
+                TableName=table_name,
+                Key={"userId": {"S": _key(today, shard)}},
+                UpdateExpression="SET #expires = :expires ADD " + ", ".join(clauses),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+        except Exception as e:
+            logger.warning(
+                "Failed to flush request stats",
+                extra={"error_type": type(e).__name__, "error_message": str(e)},
+            )
+            with _lock:
+                for location, count in counts:
+                    _pending[location] += count
+
+
+def top_locations(limit: Optional[int] = None) -> List[Tuple[Location, int]]:
+    """Locations by number of requests over the last HISTORY_DAYS days."""
+    table_name = _table_name()
+    if not table_name:
+        return []
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    keys = [
+        {"userId": {"S": _key(today - datetime.timedelta(days=days), shard)}}
+        for days in range(HISTORY_DAYS)
+        for shard in range(SHARDS)
+    ]
+    # HISTORY_DAYS * SHARDS keys, within the 100 keys of one batch_get_item
+    request = {table_name: {"Keys": keys, "ConsistentRead": False}}
+
+    totals: Counter = Counter()
+    for attempt in range(MAX_BATCH_ATTEMPTS):
+        response = get_client().batch_get_item(RequestItems=request)
+        for item in response.get("Responses", {}).get(table_name, []):
+            for name, value in item.items():
+                if name in ("userId", EXPIRES_ATTRIBUTE):
+                    continue
+                try:
+                    totals[Location.from_attribute(name)] += deserialize(value)
+                except (ValueError, TypeError, AttributeError):
+                    logger.warning(
+                        "Skipping malformed stats entry", extra={"entry": name}
+                    )
+        request = response.get("UnprocessedKeys") or {}
+        if not request:
+            break
+        time.sleep(BATCH_RETRY_DELAY * 2**attempt)
+    else:
+        raise RuntimeError("DynamoDB kept keys unprocessed")
+    return totals.most_common(limit)
+
+
+def _shard(location: Location) -> int:
+    digest = hashlib.sha256(location.to_attribute().encode("utf-8")).digest()
+    return digest[0] % SHARDS
+
+
+def _key(date: datetime.date, shard: int) -> str:
+    return f"{KEY_PREFIX}{date.isoformat()}#{shard}"
+
+
+def clear() -> None:
+    with _lock:
+        _pending.clear()
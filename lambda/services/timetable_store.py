@@ -0,0 +1,168 @@
+"""Reader of the precomputed timetable file shipped in the Lambda layer.
+
+Layout, all little-endian:
+
+    header      HEADER struct (magic, version, geohash precision, first
+                date ordinal, number of days, counts of the tables below)
+    methods     one uint8 Aladhan method id per method variant
+    timezones   TIMEZONE_NAME_SIZE bytes, NUL padded, per timezone
+    cell index  REGION struct per region: a dense rectangle of geohash
+                cells, its timezone and the record number of its first cell
+    timings     per cell, per method, per day: one uint16 local
+                minutes-since-midnight per prayer, NO_VALUE when missing
+
+Only the header and the small tables are read when the file is opened,
+timings are read straight from the memory map with fixed offset
+arithmetic, so a lookup is O(1) and nothing is parsed at cold start.
+"""
+
+import datetime
+import mmap
+import os
+import struct
+import threading
+from typing import List, Optional, Tuple
+
+from aws_lambda_powertools import Logger
+
+from models.prayer_day import PRAYERS
+from services import geohash
+
+logger = Logger(service="timetable_store")
+
+MAGIC = b"ADHANTT1"
+VERSION = 1
+HEADER = struct.Struct("<8sHBBIHBBH")
+REGION = struct.Struct("<IIIIB3xI")
+TIMEZONE_NAME_SIZE = 32
+DAY = struct.Struct("<" + "H" * len(PRAYERS))
+
+DEFAULT_PATH = "/opt/timetable/timetable.bin"
+
+
+class Region:
+    __slots__ = ("row", "rows", "column", "columns", "timezone", "first_cell")
+
+    def __init__(self, row, rows, column, columns, timezone, first_cell):
+        self.row = row
+        self.rows = rows
+        self.column = column
+        self.columns = columns
+        self.timezone = timezone
+        self.first_cell = first_cell
+
+    def cell_number(self, row: int, column: int) -> Optional[int]:
+        if not (
+            self.row <= row < self.row + self.rows
+            and self.column <= column < self.column + self.columns
+        ):
+            return None
+        return self.first_cell + (row - self.row) * self.columns + column - self.column
+
+
+class Timetable:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            version,
+            self.precision,
+            prayer_count,
+            start_ordinal,
+            self.days,
+            method_count,
+            timezone_count,
+            region_count,
+        ) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or prayer_count != len(PRAYERS):
+            raise ValueError(f"Unsupported timetable file {path}")
+
+        self.start = datetime.date.fromordinal(start_ordinal)
+        offset = HEADER.size
+
+        self.methods = list(self._map[offset : offset + method_count])
+        offset += method_count
+
+        self.timezones = []
+        for _ in range(timezone_count):
+            name = self._map[offset : offset + TIMEZONE_NAME_SIZE]
+            self.timezones.append(name.rstrip(b"\0").decode("ascii"))
+            offset += TIMEZONE_NAME_SIZE
+
+        self.regions: List[Region] = []
+        for _ in range(region_count):
+            row, rows, column, columns, timezone_index, first_cell = REGION.unpack_from(
+                self._map, offset
+            )
+            self.regions.append(
+                Region(
+                    row,
+                    rows,
+                    column,
+                    columns,
+                    self.timezones[timezone_index],
+                    first_cell,
+                )
+            )
+            offset += REGION.size
+
+        self._data_offset = offset
+        self._method_stride = self.days * DAY.size
+        self._cell_stride = method_count * self._method_stride
+
+    def locate(self, latitude: float, longitude: float) -> Optional[Tuple[int, str]]:
+        """Return the cell record number and timezone of a point, if covered."""
+        row, column = geohash.cell_of(latitude, longitude, self.precision)
+        for region in self.regions:
+            cell = region.cell_number(row, column)
+            if cell is not None:
+                return cell, region.timezone
+        return None
+
+    def lookup(
+        self, cell: int, method: int, date: datetime.date
+    ) -> Optional[Tuple[int, ...]]:
+        """Return the minutes of a located cell, ordered as PRAYERS.
+
+        The values are those of the file, NO_VALUE included, ready for
+        PrayerDay.from_minutes. None if the date or method is not covered.
+        """
+        day = (date - self.start).days
+        if not 0 <= day < self.days or method not in self.methods:
+            return None
+
+        offset = (
+            self._data_offset
+            + cell * self._cell_stride
+            + self.methods.index(method) * self._method_stride
+            + day * DAY.size
+        )
+        return DAY.unpack_from(self._map, offset)
+
+
+_timetable: Optional[Timetable] = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def get_timetable() -> Optional[Timetable]:
+    """Open the layer's timetable once per container, None when not shipped."""
+    global _timetable, _loaded
+    if _loaded:
+        return _timetable
+    with _lock:
+        if not _loaded:
+            path = os.getenv("TIMETABLE_PATH", DEFAULT_PATH)
+            if os.path.exists(path):
+                try:
+                    _timetable = Timetable(path)
+                except Exception as e:
+                    logger.error(
+                        "Failed to open timetable",
+                        extra={"path": path, "error": str(e)},
+                    )
+            _loaded = True
+    return _timetable
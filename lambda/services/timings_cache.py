@@ -0,0 +1,220 @@
+"""In-process prayer timings cache shared across warm invocations."""
+
+import bisect
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from models.prayer_day import PrayerDay
+
+MAX_ENTRIES = 2048
+# Timings of a given date never change, the TTL only bounds how long a
+# container keeps serving an answer that a data fix upstream may have changed.
+FRESH_TTL_SECONDS = 12 * 3600
+STALE_MAX_AGE_DAYS = 7
+# ~1 km, well below the distance that moves a prayer time by a minute.
+COORDINATE_PRECISION = 2
+# A schedule built from stale or locally computed timings is rebuilt soon so
+# that it picks up Aladhan's answer once the upstream is back.
+DEGRADED_SCHEDULE_TTL_SECONDS = 600
+
+
+class CachedTimings:
+    __slots__ = ("day", "fetched_at")
+
+    def __init__(self, day: PrayerDay, fetched_at: float):
+        self.day = day
+        self.fetched_at = fetched_at
+
+    @property
+    def date(self) -> datetime.date:
+        return self.day.date
+
+    @property
+    def timezone(self) -> Optional[str]:
+        return self.day.timezone_name
+
+    def is_fresh(self, now: float) -> bool:
+        return now - self.fetched_at < FRESH_TTL_SECONDS
+
+
+class ScheduleIndex:
+    """Today's and tomorrow's prayers of a location, sorted by UTC epoch."""
+
+    __slots__ = ("epochs", "moments")
+
+    def __init__(
+        self, epochs: List[float], moments: List[Tuple[str, datetime.datetime]]
+    ):
+        self.epochs = epochs
+        self.moments = moments
+
+    @classmethod
+    def build(cls, days: Iterable[PrayerDay]) -> "ScheduleIndex":
+        """Build from consecutive days, reusing their localized moments.
+
+        Each day localizes its times on its own date, so a DST change between
+        today and tomorrow moves tomorrow's prayers by the right amount.
+        """
+        slots = sorted(
+            (epoch, moment)
+            for day in days
+            for epoch, moment in zip(day.epochs(), day.moments())
+        )
+        return cls([epoch for epoch, _ in slots], [moment for _, moment in slots])
+
+    def next_prayer(
+        self, now: Optional[float] = None
+    ) -> Optional[Tuple[str, datetime.datetime]]:
+        """Return the first prayer strictly after now, with its local time."""
+        now = time.time() if now is None else now
+        position = bisect.bisect_right(self.epochs, now)
+        if position >= len(self.epochs):
+            return None
+        return self.moments[position]
+
+
+_entries: "OrderedDict[tuple, CachedTimings]" = OrderedDict()
+_latest: "OrderedDict[tuple, CachedTimings]" = OrderedDict()
+_schedules: "OrderedDict[tuple, Tuple[datetime.date, ScheduleIndex, float]]" = (
+    OrderedDict()
+)
+# Rendered answers, see get_response.
+_responses: "OrderedDict[tuple, Tuple[datetime.date, str, float]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def location_key(
+    latitude: float, longitude: float, method: int, school: int = 0
+) -> tuple:
+    return (
+        round(latitude, COORDINATE_PRECISION),
+        round(longitude, COORDINATE_PRECISION),
+        method,
+        school,
+    )
+
+
+def get(location: tuple, date: datetime.date) -> Optional[CachedTimings]:
+    with _lock:
+        entry = _entries.get(location + (date,))
+        if entry is not None:
+            _entries.move_to_end(location + (date,))
+        return entry
+
+
+def get_fresh(location: tuple, date: datetime.date) -> Optional[CachedTimings]:
+    entry = get(location, date)
+    if entry is not None and entry.is_fresh(time.time()):
+        return entry
+    return None
+
+
+def get_latest(location: tuple) -> Optional[CachedTimings]:
+    """Most recently stored entry for a location, whatever its date."""
+    with _lock:
+        return _latest.get(location)
+
+
+def get_stale(
+    location: tuple, date: datetime.date
+) -> Optional[Tuple[CachedTimings, int]]:
+    """Return the closest usable entry for the location and its age in days."""
+    entry = get(location, date)
+    if entry is not None:
+        return entry, 0
+
+    latest = get_latest(location)
+    if latest is None:
+        return None
+
+    age_days = abs((date - latest.date).days)
+    if age_days > STALE_MAX_AGE_DAYS:
+        return None
+    return latest, age_days
+
+
+def put(location: tuple, day: PrayerDay) -> CachedTimings:
+    date = day.date
+    entry = CachedTimings(day, time.time())
+    with _lock:
+        _entries[location + (date,)] = entry
+        _entries.move_to_end(location + (date,))
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+        latest = _latest.get(location)
+        if latest is None or latest.date <= date:
+            _latest[location] = entry
+            _latest.move_to_end(location)
+            while len(_latest) > MAX_ENTRIES:
+                _latest.popitem(last=False)
+    return entry
+
+
+def get_schedule(location: tuple, date: datetime.date) -> Optional[ScheduleIndex]:
+    """Return the location's schedule if it was built for that local date.
+
+    location is a location_key, optionally extended with whatever else
+    changes the schedule.
+    """
+    with _lock:
+        cached = _schedules.get(location)
+    if cached is None:
+        return None
+    built_for, index, expires_at = cached
+    if built_for != date or time.time() >= expires_at:
+        return None
+    return index
+
+
+def put_schedule(
+    location: tuple,
+    date: datetime.date,
+    index: ScheduleIndex,
+    degraded: bool = False,
+) -> None:
+    ttl = DEGRADED_SCHEDULE_TTL_SECONDS if degraded else FRESH_TTL_SECONDS
+    with _lock:
+        _schedules[location] = (date, index, time.time() + ttl)
+        _schedules.move_to_end(location)
+        while len(_schedules) > MAX_ENTRIES:
+            _schedules.popitem(last=False)
+
+
+def get_response(key: tuple, date: datetime.date) -> Optional[str]:
+    """Return the speech rendered for key if it was rendered for that local date.
+
+    key is a location_key extended with everything else the answer depends
+    on (offsets, locale), so the speech is the same for every user sharing it.
+    """
+    with _lock:
+        cached = _responses.get(key)
+        if cached is None:
+            return None
+        rendered_for, speech, expires_at = cached
+        if rendered_for != date or time.time() >= expires_at:
+            return None
+        _responses.move_to_end(key)
+        return speech
+
+
+def put_response(
+    key: tuple, date: datetime.date, speech: str, degraded: bool = False
+) -> None:
+    ttl = DEGRADED_SCHEDULE_TTL_SECONDS if degraded else FRESH_TTL_SECONDS
+    with _lock:
+        _responses[key] = (date, speech, time.time() + ttl)
+        _responses.move_to_end(key)
+        while len(_responses) > MAX_ENTRIES:
+            _responses.popitem(last=False)
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+        _latest.clear()
+        _schedules.clear()
+        _responses.clear()
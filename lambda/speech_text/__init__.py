@@ -1,6 +1,10 @@
+from speech_text.en_speech_text import SpeechText as EnSpeechText
+from speech_text.fr_speech_text import SpeechText as FrSpeechText
+
+# Locale -> SpeechText, resolved once at import rather than on every call.
+SPEECH_TEXTS = {"fr-FR": FrSpeechText}
+DEFAULT_SPEECH_TEXT = EnSpeechText
+
+
 def get_speech_text(locale):
-    if locale == "fr-FR":
-        from speech_text.fr_speech_text import SpeechText
-    else:
-        from speech_text.en_speech_text import SpeechText
-    return SpeechText
+    return SPEECH_TEXTS.get(locale, DEFAULT_SPEECH_TEXT)
@@ -15,13 +15,53 @@ class SpeechText:
     ASK_REMINDER_PERMISSION = "Would you like me to set up daily prayer time reminders?"
     MAX_REMINDERS_ERROR = "Sorry, you've reached the maximum number of reminders. Please delete some existing reminders and try again."
     REMINDER_SETUP_CONFIRMATION = "I'll set up daily prayer reminders"
+    REMINDER_SETUP_QUEUED = "I'm setting up your daily prayer reminders, they will appear in your Alexa app in a moment."
     PERMISSION_DENIED = "Okay, I won't set up any reminders. You can ask me again anytime if you change your mind."
     PRIER_TIMES = "The prayer times for today are: {}."
     PRAYER_TIME_REMINDER = "Time for {} prayer"
+    PRAYER_TIME_REMINDER_AHEAD = "{} prayer in {} minutes"
     LOCATION_TEXT = " in {}."
+    NEXT_PRAYER = "The next prayer is {} in {}."
+    DURATION_HOURS = ("{} hour", "{} hours")
+    DURATION_MINUTES = ("{} minute", "{} minutes")
+    DURATION_SEPARATOR = " and "
+    PREFERENCE_METHOD_SET = "Okay, I'll use the {} calculation method."
+    PREFERENCE_SCHOOL_SET = "Okay, I'll calculate Asr following the {} school."
+    PREFERENCE_OFFSET_SET = "Okay, {} will be {} minutes {}."
+    PREFERENCE_OFFSET_DIRECTIONS = ("later", "earlier")
+    PREFERENCE_OFFSET_CLEARED = "Okay, {} is no longer adjusted."
+    PREFERENCE_REMINDER_LEAD_SET = "Okay, your reminders will ring {} minutes before each prayer. Say 'Enable notifications' to update them."
+    PREFERENCE_REMINDER_LEAD_CLEARED = "Okay, your reminders will ring at prayer time. Say 'Enable notifications' to update them."
+    PREFERENCE_ADHAN_SET = "Okay, I'll play the {}. Here it is."
+    PREFERENCE_INVALID = "Sorry, I can't use that setting."
     REMINDER_PERMISSION_ALREADY_GRANTED = "You already have reminders permission! Would you like to set up a daily reminder?"
     REMINDER_PERMISSION_NOT_READY = "You don't have reminders permission yet. Please enable notifications to set up reminders."
-    PERMISSIONS_ACCEPTED_REINVITE = (
-        "Great! Your permissions have been updated. "
-        "Please say 'Enable notifications' again, and I'll set up your prayer reminders."
+    SCHEDULE_DAY = "{}: {}."
+    SCHEDULE_TODAY = "Today"
+    SCHEDULE_TOMORROW = "Tomorrow"
+    SCHEDULE_DATE = "{weekday}, {month} {day}"
+    SCHEDULE_MORE = "Do you want the next days?"
+    SCHEDULE_UNSUPPORTED_DATES = "Sorry, I can give the prayer times of a day or of a week. Which days do you want?"
+    WEEKDAYS = (
+        "Monday",
+        "Tuesday",
+        "Wednesday",
+        "Thursday",
+        "Friday",
+        "Saturday",
+        "Sunday",
+    )
+    MONTHS = (
+        "January",
+        "February",
+        "March",
+        "April",
+        "May",
+        "June",
+        "July",
+        "August",
+        "September",
+        "October",
+        "November",
+        "December",
     )
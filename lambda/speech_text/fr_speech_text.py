@@ -17,13 +17,45 @@ class SpeechText:
     )
     MAX_REMINDERS_ERROR = "Désolé, vous avez atteint le nombre maximum de rappels. Veuillez supprimer des rappels existants et réessayer."
     REMINDER_SETUP_CONFIRMATION = "Je vais configurer des rappels quotidiens de prière"
+    REMINDER_SETUP_QUEUED = "Je configure vos rappels quotidiens de prière, ils apparaîtront dans votre application Alexa dans un instant."
     PERMISSION_DENIED = "D'accord, je ne configurerai pas de rappels. Vous pouvez me le redemander à tout moment si vous changez d'avis."
     PRIER_TIMES = "Les heures de prière pour aujourd'hui sont : {}."
     LOCATION_TEXT = " à {}."
+    NEXT_PRAYER = "La prochaine prière est {} dans {}."
+    DURATION_HOURS = ("{} heure", "{} heures")
+    DURATION_MINUTES = ("{} minute", "{} minutes")
+    DURATION_SEPARATOR = " et "
+    PREFERENCE_METHOD_SET = "D'accord, j'utiliserai la méthode de calcul {}."
+    PREFERENCE_SCHOOL_SET = "D'accord, je calculerai Asr selon l'école {}."
+    PREFERENCE_OFFSET_SET = "D'accord, {} sera {} minutes {}."
+    PREFERENCE_OFFSET_DIRECTIONS = ("plus tard", "plus tôt")
+    PREFERENCE_OFFSET_CLEARED = "D'accord, {} n'est plus ajusté."
+    PREFERENCE_REMINDER_LEAD_SET = "D'accord, vos rappels sonneront {} minutes avant chaque prière. Dites 'Activer notifications' pour les mettre à jour."
+    PREFERENCE_REMINDER_LEAD_CLEARED = "D'accord, vos rappels sonneront à l'heure de la prière. Dites 'Activer notifications' pour les mettre à jour."
+    PREFERENCE_ADHAN_SET = "D'accord, Adhan choisi : {}. Le voici."
+    PREFERENCE_INVALID = "Désolé, je ne peux pas utiliser ce réglage."
     PRAYER_TIME_REMINDER = "L'heure de la prière {} est arrivée"
+    PRAYER_TIME_REMINDER_AHEAD = "La prière {} est dans {} minutes"
     REMINDER_PERMISSION_ALREADY_GRANTED = "Vous avez déjà les permissions pour les rappels. Voulez-vous configurer des rappels quotidiens pour les heures de prière?"
     REMINDER_PERMISSION_NOT_READY = "Vous n'avez pas les permissions pour les rappels. Veuillez activer les notifications pour configurer des rappels."
-    PERMISSIONS_ACCEPTED_REINVITE = (
-        "Parfait ! Vos permissions ont été mises à jour. "
-        "Veuillez dire 'Activer notifications' à nouveau, et je configurerai vos rappels de prière."
+    SCHEDULE_DAY = "{} : {}."
+    SCHEDULE_TODAY = "Aujourd'hui"
+    SCHEDULE_TOMORROW = "Demain"
+    SCHEDULE_DATE = "{weekday} {day} {month}"
+    SCHEDULE_MORE = "Voulez-vous les jours suivants ?"
+    SCHEDULE_UNSUPPORTED_DATES = "Désolé, je peux donner les heures de prière d'un jour ou d'une semaine. Quels jours voulez-vous ?"
+    WEEKDAYS = ("lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche")
+    MONTHS = (
+        "janvier",
+        "février",
+        "mars",
+        "avril",
+        "mai",
+        "juin",
+        "juillet",
+        "août",
+        "septembre",
+        "octobre",
+        "novembre",
+        "décembre",
     )
@@ -0,0 +1,31 @@
+"""Entry point of ReminderProvisioningFunction, fed by the reminder queue.
+
+Records are processed in order and reported as partial batch failures, so
+only the failed jobs go back to the queue. A failed job skips the rest of
+its user's jobs in the batch, keeping each user's jobs in order, while the
+other users' jobs go on.
+"""
+
+import json
+
+from aws_lambda_powertools.utilities.batch import (
+    SqsFifoPartialProcessor,
+    process_partial_response,
+)
+
+from services.reminder_provisioning_service import ReminderProvisioningService
+
+processor = SqsFifoPartialProcessor(skip_group_on_error=True)
+
+
+def record_handler(record):
+    ReminderProvisioningService.provision(json.loads(record.body))
+
+
+def handler(event, context):
+    return process_partial_response(
+        event=event,
+        record_handler=record_handler,
+        processor=processor,
+        context=context,
+    )
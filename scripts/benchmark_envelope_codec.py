@@ -0,0 +1,190 @@
+"""Compare the CPU cost per invocation of the ask-sdk serializer and EnvelopeCodec.
+
+Usage (from the repository root):
+
+    PYTHONPATH=lambda python scripts/benchmark_envelope_codec.py
+
+The request is a GetPrayerTimesIntent whose context.System is built from
+context_system_payload_example.json. Each iteration decodes the request,
+reads the fields the handlers read (locale, intent name, permissions,
+device id, geolocation) and encodes a spoken response, like one
+invocation of the Lambda handler does around the skill dispatch.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+from ask_sdk_core.serialize import DefaultSerializer
+from ask_sdk_model import RequestEnvelope, ResponseEnvelope
+from ask_sdk_model.context import Context
+from ask_sdk_model.interfaces.system import SystemState
+from ask_sdk_model.ui import SsmlOutputSpeech
+from ask_sdk_model.response import Response
+
+from services.envelope_codec import EnvelopeCodec
+
+EXAMPLE = os.path.join(
+    os.path.dirname(__file__), os.pardir, "context_system_payload_example.json"
+)
+IDENTIFIER = "amzn1.ask.account." + "A" * 200
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--example", default=EXAMPLE, help="context.System example")
+    return parser.parse_args(argv)
+
+
+def to_payload(model_class, values):
+    """Turn the snake_case attribute dump of a model into its JSON payload.
+
+    Empty strings stand for present but unset objects in the example.
+    """
+    payload = {}
+    attribute_map = getattr(model_class, "attribute_map", {})
+    for name, value in values.items():
+        type_name = model_class.deserialized_types[name]
+        key = attribute_map.get(name, name)
+        if type_name.startswith(("ask_sdk_model", "dict(")) and not value:
+            value = {}
+        elif type_name == "str" and not value:
+            value = IDENTIFIER
+        if isinstance(value, dict) and type_name.startswith("ask_sdk_model"):
+            module_name, _, class_name = type_name.rpartition(".")
+            child = getattr(importlib.import_module(module_name), class_name)
+            if hasattr(child, "deserialized_types") and not (
+                hasattr(child, "get_real_child_model")
+            ):
+                value = to_payload(child, value)
+        payload[key] = value
+    return payload
+
+
+def build_event(system_example):
+    system = to_payload(SystemState, system_example)
+    context = {
+        Context.attribute_map["system"]: system,
+        Context.attribute_map["geolocation"]: {
+            "timestamp": "2026-01-01T12:00:00Z",
+            "coordinate": {
+                "latitudeInDegrees": 48.8566,
+                "longitudeInDegrees": 2.3522,
+                "accuracyInMeters": 10,
+            },
+        },
+        Context.attribute_map["viewport"]: {
+            "experiences": [{"arcMinuteWidth": 246, "arcMinuteHeight": 144}],
+            "mode": "HUB",
+            "shape": "RECTANGLE",
+            "pixelWidth": 1024,
+            "pixelHeight": 600,
+            "dpi": 160,
+            "currentPixelWidth": 1024,
+            "currentPixelHeight": 600,
+            "touch": ["SINGLE"],
+            "keyboard": ["DIRECTION"],
+        },
+    }
+    return {
+        "version": "1.0",
+        "session": {
+            "new": True,
+            "sessionId": "amzn1.echo-api.session." + "S" * 36,
+            "application": {"applicationId": "amzn1.ask.skill." + "K" * 36},
+            "attributes": {},
+            "user": {"userId": IDENTIFIER},
+        },
+        "context": context,
+        "request": {
+            "type": "IntentRequest",
+            "requestId": "amzn1.echo-api.request." + "R" * 36,
+            "timestamp": "2026-01-01T12:00:00Z",
+            "locale": "en-US",
+            "intent": {"name": "GetPrayerTimesIntent", "confirmationStatus": "NONE"},
+        },
+    }
+
+
+def build_response():
+    return ResponseEnvelope(
+        version="1.0",
+        session_attributes={},
+        user_agent="ask-python/1.19.0",
+        response=Response(
+            output_speech=SsmlOutputSpeech(
+                ssml="<speak>Fajr: 06:12, Dhuhr: 13:01, Asr: 15:48, "
+                "Maghrib: 18:20, Isha: 19:45</speak>"
+            ),
+            should_end_session=True,
+        ),
+    )
+
+
+def touch(envelope):
+    """Read what the handlers of one invocation read."""
+    system = envelope.context.system
+    return (
+        envelope.request.locale,
+        envelope.request.intent.name,
+        system.user.permissions.consent_token,
+        system.user.permissions.scopes,
+        system.device.device_id,
+        system.device.supported_interfaces.geolocation,
+        envelope.context.geolocation.coordinate.latitude_in_degrees,
+        system.api_access_token,
+        envelope.session.attributes,
+    )
+
+
+def measure(label, invocation, iterations):
+    invocation()
+    start = time.process_time()
+    for _ in range(iterations):
+        invocation()
+    per_invocation = (time.process_time() - start) / iterations * 1e6
+    print(f"{label:<10} {per_invocation:9.1f} us CPU per invocation")
+    return per_invocation
+
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    with open(args.example) as f:
+        event = build_event(json.load(f))
+    response_envelope = build_response()
+    serializer = DefaultSerializer()
+
+    def default():
+        envelope = serializer.deserialize(json.dumps(event), RequestEnvelope)
+        touch(envelope)
+        return serializer.serialize(response_envelope)
+
+    def fast():
+        envelope = EnvelopeCodec.decode_request(event)
+        touch(envelope)
+        return EnvelopeCodec.encode_response(response_envelope)
+
+    touched = [
+        serializer.serialize(list(touch(envelope)))
+        for envelope in (
+            serializer.deserialize(json.dumps(event), RequestEnvelope),
+            EnvelopeCodec.decode_request(event),
+        )
+    ]
+    if default() != fast() or touched[0] != touched[1]:
+        raise SystemExit("EnvelopeCodec output differs from DefaultSerializer")
+
+    baseline = measure("ask-sdk", default, args.iterations)
+    codec = measure("codec", fast, args.iterations)
+    print(
+        f"saving     {baseline - codec:9.1f} us CPU per invocation "
+        f"({baseline / codec:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
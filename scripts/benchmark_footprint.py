@@ -0,0 +1,501 @@
+"""Measure the memory and cold start footprint of the skill function.
+
+Usage (from the repository root):
+
+    python scripts/benchmark_footprint.py \
+        --timetable lambda_layers/prayer_times_functions_layers/timetable/timetable.bin
+
+Every intent runs in a fresh interpreter, like a cold Lambda container:
+the time and CPU of `import app`, then of the first (cold) invocation,
+then of --warm warm invocations, and the peak RSS of the process. The
+bundled data files (timetable, Adhan manifest) are loaded alone in fresh
+interpreters too, to show what each one adds.
+
+The Alexa APIs and Aladhan are served by a local stub, with the same
+timings every day, and Nominatim answers a fixed city, so the numbers
+measure the function rather than the network and every run sends the
+same requests. With a timetable covering the test location no request
+reaches the Aladhan stub either.
+
+Lambda gives a function CPU in proportion to its memory, one vCPU at
+1769 MB, so the CPU time measured here is scaled for each memory size to
+project the duration and cost of an invocation. The run fails (exit
+status 1) when a measurement exceeds scripts/footprint_budget.json, the
+cold start as projected at the memory size of template.yaml.
+"""
+
+import argparse
+import calendar
+import copy
+import datetime
+import importlib
+import json
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+LAMBDA_DIR = os.path.join(ROOT, "lambda")
+TEMPLATE = os.path.join(ROOT, "template.yaml")
+BUDGET = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "footprint_budget.json"
+)
+
+MEMORY_SIZES = (128, 256, 512, 1024, 1769)
+FULL_VCPU_MB = 1769
+# arm64 on-demand prices, us-east-1
+PRICE_PER_GB_SECOND = 0.0000133334
+PRICE_PER_MILLION_REQUESTS = 0.20
+
+LATITUDE, LONGITUDE = 48.8566, 2.3522
+TIMEZONE = "Europe/Paris"
+# Answered by the Aladhan stub for every day
+TIMINGS = {
+    "Fajr": "06:12",
+    "Sunrise": "07:48",
+    "Dhuhr": "13:41",
+    "Asr": "16:37",
+    "Maghrib": "19:28",
+    "Isha": "20:58",
+}
+
+BASE_EVENT = {
+    "version": "1.0",
+    "session": {
+        "new": True,
+        "sessionId": "amzn1.echo-api.session.benchmark",
+        "application": {"applicationId": "amzn1.ask.skill.benchmark"},
+        "attributes": {},
+        "user": {"userId": "amzn1.ask.account.benchmark"},
+    },
+    "context": {
+        "System": {
+            "application": {"applicationId": "amzn1.ask.skill.benchmark"},
+            "user": {
+                "userId": "amzn1.ask.account.benchmark",
+                "permissions": {
+                    "consentToken": "benchmark",
+                    "scopes": {
+                        "alexa::alerts:reminders:skill:readwrite": {"status": "GRANTED"}
+                    },
+                },
+            },
+            "device": {
+                "deviceId": "amzn1.ask.device.benchmark",
+                "supportedInterfaces": {"Geolocation": {}, "AudioPlayer": {}},
+            },
+            "apiEndpoint": None,
+            "apiAccessToken": "benchmark",
+        },
+        "Geolocation": {
+            "timestamp": "2026-01-01T12:00:00Z",
+            "coordinate": {
+                "latitudeInDegrees": LATITUDE,
+                "longitudeInDegrees": LONGITUDE,
+                "accuracyInMeters": 10,
+            },
+        },
+    },
+    "request": {
+        "requestId": "amzn1.echo-api.request.benchmark",
+        "timestamp": "2026-01-01T12:00:00Z",
+        "locale": "en-US",
+    },
+}
+
+# Benchmark name -> request
+REQUESTS = {
+    "LaunchRequest": {"type": "LaunchRequest"},
+    "GetPrayerTimesIntent": {"type": "IntentRequest", "intent": "GetPrayerTimesIntent"},
+    "GetNextPrayerIntent": {"type": "IntentRequest", "intent": "GetNextPrayerIntent"},
+    "EnableNotificationsIntent": {
+        "type": "IntentRequest",
+        "intent": "EnableNotificationsIntent",
+    },
+    "SetReminderLeadIntent": {
+        "type": "IntentRequest",
+        "intent": "SetReminderLeadIntent",
+        "slots": {"minutes": "10"},
+    },
+    "AMAZON.HelpIntent": {"type": "IntentRequest", "intent": "AMAZON.HelpIntent"},
+    "SessionEndedRequest": {"type": "SessionEndedRequest", "reason": "USER_INITIATED"},
+}
+
+# Bundled data -> code loading it, run after the modules it needs are imported
+DATA_LOADERS = {
+    "timetable": (
+        "from services import timetable_store",
+        "timetable_store.get_timetable()",
+    ),
+    "adhan_manifest": (
+        "from services import audio_assets",
+        "audio_assets.reload()",
+    ),
+}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timetable", help="Timetable file, as in the layer")
+    parser.add_argument("--manifest", help="Adhan manifest, as in the package")
+    parser.add_argument("--warm", type=int, default=50, help="Warm invocations")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold runs per intent")
+    parser.add_argument("--budget", default=BUDGET)
+    parser.add_argument("--intents", nargs="*", default=list(REQUESTS))
+    parser.add_argument("--json", action="store_true", help="Print raw results")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--child-data", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def build_event(name: str, api_endpoint: str) -> dict:
+    spec = REQUESTS[name]
+    event = copy.deepcopy(BASE_EVENT)
+    event["context"]["System"]["apiEndpoint"] = api_endpoint
+    request = event["request"]
+    request["type"] = spec["type"]
+    if "intent" in spec:
+        request["intent"] = {
+            "name": spec["intent"],
+            "confirmationStatus": "NONE",
+            "slots": {
+                slot: {"name": slot, "value": value, "confirmationStatus": "NONE"}
+                for slot, value in spec.get("slots", {}).items()
+            },
+        }
+    if "reason" in spec:
+        request["reason"] = spec["reason"]
+    return event
+
+
+class UpstreamStub(BaseHTTPRequestHandler):
+    """Device settings and reminders endpoints of the Alexa APIs, timings
+    and calendar endpoints of Aladhan."""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.endswith("/settings/System.timeZone"):
+            return self._send(200, TIMEZONE)
+        if url.path == "/v1/timings":
+            timestamp = int(parse_qs(url.query)["timestamp"][0])
+            date = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+            return self._send(200, {"data": aladhan_day(date.date())})
+        calendar_path = re.fullmatch(r"/v1/calendar/(\d+)/(\d+)", url.path)
+        if calendar_path:
+            year, month = int(calendar_path[1]), int(calendar_path[2])
+            days = calendar.monthrange(year, month)[1]
+            return self._send(
+                200,
+                {
+                    "data": [
+                        aladhan_day(datetime.date(year, month, day))
+                        for day in range(1, days + 1)
+                    ]
+                },
+            )
+        self._send(404, {"message": "not stubbed"})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._send(201, {"alertToken": "benchmark", "status": "ON"})
+
+    def do_DELETE(self):
+        self._send(204, {})
+
+
+def aladhan_day(date: datetime.date) -> dict:
+    return {
+        "timings": TIMINGS,
+        "date": {"gregorian": {"date": date.strftime("%d-%m-%Y")}},
+        "meta": {"timezone": TIMEZONE},
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return peak_rss_mb()
+
+
+def timed(function):
+    wall, cpu = time.perf_counter(), time.process_time()
+    function()
+    return (time.perf_counter() - wall) * 1000, (time.process_time() - cpu) * 1000
+
+
+def run_child(name: str, api_endpoint: str, warm: int) -> dict:
+    """Cold then warm invocations of one request, in this fresh interpreter."""
+    sys.path.insert(0, LAMBDA_DIR)
+    result = {"intent": name, "startup_rss_mb": current_rss_mb()}
+
+    modules = {}
+    result["import_ms"], result["import_cpu_ms"] = timed(
+        lambda: modules.setdefault("app", importlib.import_module("app"))
+    )
+    handler = modules["app"].handler
+    result["import_rss_mb"] = current_rss_mb()
+
+    async def city(latitude, longitude):
+        return "Paris"
+
+    from services import prayer_times_service
+
+    prayer_times_service.get_city_name_async = city
+    # Aladhan is reached through the stub, never the real API
+    PrayerService = prayer_times_service.PrayerService
+    PrayerService.BASE_URL = f"{api_endpoint}/v1/timings"
+    PrayerService.CALENDAR_URL = f"{api_endpoint}/v1/calendar"
+
+    event = build_event(name, api_endpoint)
+    result["cold_ms"], result["cold_cpu_ms"] = timed(lambda: handler(event, None))
+
+    walls, cpus = [], []
+    for _ in range(warm):
+        wall, cpu = timed(lambda: handler(copy.deepcopy(event), None))
+        walls.append(wall)
+        cpus.append(cpu)
+    result["warm_ms"] = statistics.median(walls)
+    result["warm_cpu_ms"] = statistics.median(cpus)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_child_data(name: str) -> dict:
+    """What loading one bundled data file adds, in this fresh interpreter."""
+    sys.path.insert(0, LAMBDA_DIR)
+    setup, load = DATA_LOADERS[name]
+    namespace = {}
+    exec(setup, namespace)
+    before = current_rss_mb()
+    load_ms, load_cpu_ms = timed(lambda: exec(load, namespace))
+    return {
+        "data": name,
+        "load_ms": load_ms,
+        "load_cpu_ms": load_cpu_ms,
+        "rss_added_mb": current_rss_mb() - before,
+    }
+
+
+def spawn(args, env, *child_args) -> dict:
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *child_args],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode:
+        raise SystemExit(f"{' '.join(child_args)} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def child_env(args) -> dict:
+    env = dict(os.environ)
+    env.update(
+        {
+            "POWERTOOLS_LOG_LEVEL": "CRITICAL",
+            "POWERTOOLS_METRICS_NAMESPACE": "Benchmark",
+            "DYNAMODB_ENDPOINT_URL": "memory",
+            "PREFERENCES_TABLE": "benchmark",
+            "CIRCUIT_BREAKER_TABLE": "",
+            "REMINDER_QUEUE_URL": "memory",
+            "PROFILE_SAMPLE_RATE": "0",
+            "ATHAN_BUCKET_URL": "https://media.invalid",
+            # No mirror, only the Aladhan stub answers
+            "ALADHAN_MIRROR_URL": "",
+        }
+    )
+    # Unset, the defaults point at the layer and the package, as on Lambda
+    if args.timetable:
+        env["TIMETABLE_PATH"] = os.path.abspath(args.timetable)
+    if args.manifest:
+        env["ADHAN_MANIFEST_PATH"] = os.path.abspath(args.manifest)
+    return env
+
+
+def template_memory_size() -> int:
+    with open(TEMPLATE) as f:
+        match = re.search(r"Handler: app\.handler.*?MemorySize: (\d+)", f.read(), re.S)
+    return int(match.group(1))
+
+
+def project(cpu_ms: float, wall_ms: float, memory_mb: int):
+    """Projected duration (ms) and cost per million invocations (USD).
+
+    The CPU part of the duration scales with the share of a vCPU the memory
+    size gets, the rest (waiting on I/O) does not.
+    """
+    share = min(1.0, memory_mb / FULL_VCPU_MB)
+    duration = cpu_ms / share + max(0.0, wall_ms - cpu_ms)
+    billed_seconds = max(1, round(duration)) / 1000
+    cost = (
+        billed_seconds * memory_mb / 1024 * PRICE_PER_GB_SECOND * 1e6
+        + PRICE_PER_MILLION_REQUESTS
+    )
+    return duration, cost
+
+
+def check_budget(budget: dict, results, data_results, memory_size: int):
+    violations = []
+    for result in results:
+        # As long as it would take on the function's share of a vCPU
+        cold_start, _ = project(
+            result["import_cpu_ms"] + result["cold_cpu_ms"],
+            result["import_ms"] + result["cold_ms"],
+            memory_size,
+        )
+        limits = [
+            ("peak_rss_mb", result["peak_rss_mb"], budget["max_peak_rss_mb"]),
+            ("projected_cold_start_ms", cold_start, budget["max_cold_start_ms"]),
+            ("warm_cpu_ms", result["warm_cpu_ms"], budget["max_warm_cpu_ms"]),
+        ]
+        # Keep headroom below the function's memory for the runtime itself
+        limits.append(
+            (
+                "peak_rss_share",
+                result["peak_rss_mb"] / memory_size,
+                budget["max_memory_share"],
+            )
+        )
+        for metric, value, limit in limits:
+            if value > limit:
+                violations.append(f"{result['intent']}: {metric} {value:.2f} > {limit}")
+    for result in data_results:
+        limit = budget["max_data_rss_mb"].get(result["data"])
+        if limit is not None and result["rss_added_mb"] > limit:
+            violations.append(
+                f"{result['data']}: rss_added_mb {result['rss_added_mb']:.1f} > {limit}"
+            )
+    return violations
+
+
+def report(results, data_results, memory_size: int) -> None:
+    print(
+        f"{'intent':<26} {'import':>8} {'cold':>8} {'warm':>8} {'warm cpu':>9}"
+        f" {'rss':>7}"
+    )
+    for r in results:
+        print(
+            f"{r['intent']:<26} {r['import_ms']:>6.0f}ms {r['cold_ms']:>6.1f}ms"
+            f" {r['warm_ms']:>6.2f}ms {r['warm_cpu_ms']:>7.2f}ms"
+            f" {r['peak_rss_mb']:>5.1f}MB"
+        )
+
+    if data_results:
+        print(f"\n{'bundled data':<26} {'load':>8} {'rss added':>10}")
+        for r in data_results:
+            print(f"{r['data']:<26} {r['load_ms']:>6.1f}ms {r['rss_added_mb']:>8.1f}MB")
+
+    # Projection for a cold start (import and first invocation) and the
+    # slowest warm intent.
+    cold = max(results, key=lambda r: r["import_cpu_ms"] + r["cold_cpu_ms"])
+    warm = max(results, key=lambda r: r["warm_cpu_ms"])
+    print(f"\nProjection (cold: {cold['intent']}, warm: {warm['intent']})")
+    print(f"{'memory':>8} {'cold start':>11} {'warm':>9} {'warm $/1M':>10}")
+    for memory_mb in sorted(set(MEMORY_SIZES) | {memory_size}):
+        if memory_mb < max(r["peak_rss_mb"] for r in results):
+            continue
+        cold_ms, _ = project(
+            cold["import_cpu_ms"] + cold["cold_cpu_ms"],
+            cold["import_ms"] + cold["cold_ms"],
+            memory_mb,
+        )
+        warm_ms, warm_cost = project(warm["warm_cpu_ms"], warm["warm_ms"], memory_mb)
+        marker = "  <- template.yaml" if memory_mb == memory_size else ""
+        print(
+            f"{memory_mb:>6}MB {cold_ms:>9.0f}ms {warm_ms:>7.1f}ms"
+            f" {warm_cost:>9.2f}${marker}"
+        )
+
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    if args.child:
+        name, api_endpoint = args.child.split("@", 1)
+        print(json.dumps(run_child(name, api_endpoint, args.warm)))
+        return
+    if args.child_data:
+        print(json.dumps(run_child_data(args.child_data)))
+        return
+
+    with open(args.budget) as f:
+        budget = json.load(f)
+    memory_size = template_memory_size()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), UpstreamStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+    env = child_env(args)
+
+    results = []
+    for name in args.intents:
+        runs = [
+            spawn(
+                args, env, "--child", f"{name}@{api_endpoint}", "--warm", str(args.warm)
+            )
+            for _ in range(args.repeat)
+        ]
+        # Median of each measurement across the cold runs
+        results.append(
+            {
+                key: (
+                    statistics.median(run[key] for run in runs)
+                    if isinstance(runs[0][key], float)
+                    else runs[0][key]
+                )
+                for key in runs[0]
+            }
+        )
+    data_results = [
+        spawn(args, env, "--child-data", name)
+        for name, path in (
+            ("timetable", args.timetable),
+            ("adhan_manifest", args.manifest),
+        )
+        if path
+    ]
+    server.shutdown()
+
+    if args.json:
+        print(json.dumps({"intents": results, "data": data_results}, indent=2))
+    else:
+        report(results, data_results, memory_size)
+
+    violations = check_budget(budget, results, data_results, memory_size)
+    if violations:
+        print("\nOver budget:", file=sys.stderr)
+        for violation in violations:
+            print(f"  {violation}", file=sys.stderr)
+        raise SystemExit(1)
+    print("\nWithin budget", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
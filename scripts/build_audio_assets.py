@@ -0,0 +1,345 @@
+"""Validate an Adhan MP3 and encode its low-latency variants and manifest.
+
+Usage (from the repository root, needs ffmpeg built with libmp3lame):
+
+    python scripts/build_audio_assets.py \
+        --source media/a1.mp3 \
+        --output media/adhan \
+        --manifest lambda/assets/adhan_manifest.json
+
+Every file, the source included, must be a clean stream of MPEG Layer III
+frames with one sample rate and channel layout. The variants have their
+leading silence trimmed and, except "trimmed", are loudness normalized:
+
+    trimmed     leading silence removed, source bitrate
+    normalized  loudness normalized, 128 kbps stereo
+    low         loudness normalized, 48 kbps mono, for slow links
+    takbir      the opening takbir only, 64 kbps mono
+
+File names carry a content hash so the bucket can serve them as immutable.
+The manifest lists each variant's file, duration, byte size, bitrate and
+remaining leading silence; lambda/services/audio_assets.py reads it.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+
+MANIFEST_VERSION = 1
+
+# Bitrates (kbps) of Layer III by bitrate index, MPEG-1 then MPEG-2/2.5
+BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates by MPEG version bits
+SAMPLE_RATES = {
+    0b11: (44100, 48000, 32000),  # MPEG-1
+    0b10: (22050, 24000, 16000),  # MPEG-2
+    0b00: (11025, 12000, 8000),  # MPEG-2.5
+}
+# What Echo devices play
+SUPPORTED_SAMPLE_RATES = {16000, 22050, 24000, 32000, 44100, 48000}
+SUPPORTED_BITRATES = range(16, 385)
+
+SILENCE_THRESHOLD = "-50dB"
+TRIM_FILTER = (
+    f"silenceremove=start_periods=1:start_threshold={SILENCE_THRESHOLD}"
+    ":start_silence=0.05"
+)
+LOUDNORM_FILTER = "loudnorm=I=-16:TP=-1.5:LRA=11"
+
+# Variant -> (filters, bitrate kbps or None for the source's, channels, sample rate)
+VARIANTS = {
+    "trimmed": ((TRIM_FILTER,), None, None, None),
+    "normalized": ((TRIM_FILTER, LOUDNORM_FILTER), 128, 2, 44100),
+    "low": ((TRIM_FILTER, LOUDNORM_FILTER), 48, 1, 22050),
+    "takbir": ((TRIM_FILTER, LOUDNORM_FILTER), 64, 1, 24000),
+}
+
+# Assumed for the time to first audio estimate printed at the end: devices
+# start playing once PREBUFFER_SECONDS of audio arrived over BANDWIDTH.
+PREBUFFER_SECONDS = 1.0
+BANDWIDTH_BITS_PER_SECOND = 1_000_000
+
+
+class InvalidMp3(ValueError):
+    pass
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", required=True, help="Source MP3 file")
+    parser.add_argument("--output", required=True, help="Directory of the variants")
+    parser.add_argument("--manifest", required=True, help="Manifest file to write")
+    parser.add_argument(
+        "--base-path",
+        default=None,
+        help="Path of the variants in the bucket, defaults to the output "
+        "directory's name",
+    )
+    parser.add_argument(
+        "--takbir-seconds",
+        type=float,
+        default=16.0,
+        help="Length of the takbir clip after the leading silence",
+    )
+    parser.add_argument("--ffmpeg", default="ffmpeg")
+    parser.add_argument(
+        "--validate-only",
+        action="store_true",
+        help="Only check the frames of the source",
+    )
+    return parser.parse_args(argv)
+
+
+def skip_id3v2(data: bytes) -> int:
+    """Offset of the first byte after a leading ID3v2 tag."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        if byte & 0x80:
+            raise InvalidMp3("Invalid ID3v2 tag size")
+        size = size << 7 | byte
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def audio_end(data: bytes) -> int:
+    """Offset where trailing ID3v1 and APEv2 tags start."""
+    end = len(data)
+    if end >= 128 and data[end - 128 : end - 125] == b"TAG":
+        end -= 128
+    if end >= 32 and data[end - 32 : end - 24] == b"APETAGEX":
+        (size,) = struct.unpack_from("<I", data, end - 20)
+        end -= size + 32 if data[end - 9] & 0x80 else size
+    return end
+
+
+def parse_header(header: int):
+    """Return (frame length, samples, sample rate, bitrate, channels)."""
+    if header >> 21 != 0x7FF:
+        raise InvalidMp3("Lost frame sync")
+    version = header >> 19 & 0b11
+    layer = header >> 17 & 0b11
+    bitrate_index = header >> 12 & 0b1111
+    sample_rate_index = header >> 10 & 0b11
+    padding = header >> 9 & 1
+    channel_mode = header >> 6 & 0b11
+
+    if version == 0b01:
+        raise InvalidMp3("Reserved MPEG version")
+    if layer != 0b01:
+        raise InvalidMp3("Not an MPEG Layer III frame")
+    if bitrate_index in (0, 0b1111):
+        raise InvalidMp3("Free format or invalid bitrate")
+    if sample_rate_index == 0b11:
+        raise InvalidMp3("Invalid sample rate")
+
+    mpeg1 = version == 0b11
+    bitrate = BITRATES[1 if mpeg1 else 2][bitrate_index]
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    samples = 1152 if mpeg1 else 576
+    length = (144 if mpeg1 else 72) * bitrate * 1000 // sample_rate + padding
+    return length, samples, sample_rate, bitrate, 1 if channel_mode == 0b11 else 2
+
+
+def inspect_mp3(path: str) -> dict:
+    """Walk every frame of an MP3 file.
+
+    Raises:
+        InvalidMp3: On junk between frames, a truncated last frame, a
+            format Echo devices do not play or a change of sample rate or
+            channel layout mid-stream
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    offset = skip_id3v2(data)
+    end = audio_end(data)
+    frames = samples = 0
+    bitrates = set()
+    stream_format = None
+
+    while offset < end:
+        if end - offset < 4:
+            raise InvalidMp3(f"Trailing bytes at offset {offset}")
+        (header,) = struct.unpack_from(">I", data, offset)
+        try:
+            length, frame_samples, sample_rate, bitrate, channels = parse_header(header)
+        except InvalidMp3 as e:
+            raise InvalidMp3(f"{e} at offset {offset}")
+        if offset + length > end:
+            raise InvalidMp3(f"Truncated frame at offset {offset}")
+        if stream_format is None:
+            stream_format = (sample_rate, channels)
+        elif stream_format != (sample_rate, channels):
+            raise InvalidMp3(f"Format changes at offset {offset}")
+
+        frames += 1
+        samples += frame_samples
+        bitrates.add(bitrate)
+        offset += length
+
+    if not frames:
+        raise InvalidMp3("No MPEG audio frames")
+    sample_rate, channels = stream_format
+    if sample_rate not in SUPPORTED_SAMPLE_RATES:
+        raise InvalidMp3(f"Unsupported sample rate {sample_rate}")
+    if not set(bitrates) <= set(SUPPORTED_BITRATES):
+        raise InvalidMp3(f"Unsupported bitrate in {sorted(bitrates)}")
+
+    duration_ms = samples * 1000 // sample_rate
+    return {
+        "bytes": len(data),
+        "durationMs": duration_ms,
+        "bitrate": round(len(data) * 8 / duration_ms) if duration_ms else 0,
+        "sampleRate": sample_rate,
+        "channels": channels,
+        "frames": frames,
+        "vbr": len(bitrates) > 1,
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+
+
+def leading_silence_ms(ffmpeg: str, path: str) -> int:
+    """Length of the silence opening a file, as ffmpeg silencedetect sees it."""
+    result = subprocess.run(
+        [
+            ffmpeg,
+            "-hide_banner",
+            "-nostats",
+            "-i",
+            path,
+            "-af",
+            f"silencedetect=noise={SILENCE_THRESHOLD}:d=0.05",
+            "-f",
+            "null",
+            "-",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    start = re.search(r"silence_start: (-?[\d.]+)", result.stderr)
+    if start is None or float(start.group(1)) > 0.01:
+        return 0
+    end = re.search(r"silence_end: ([\d.]+)", result.stderr)
+    # Silent to the end of the file
+    if end is None:
+        return inspect_mp3(path)["durationMs"]
+    return round(float(end.group(1)) * 1000)
+
+
+def encode_variant(ffmpeg, source, target, variant, source_info, takbir_seconds):
+    filters, bitrate, channels, sample_rate = VARIANTS[variant]
+    filters = list(filters)
+    if variant == "takbir":
+        fade = 1.0
+        filters += [
+            f"atrim=0:{takbir_seconds}",
+            f"afade=t=out:st={takbir_seconds - fade}:d={fade}",
+        ]
+
+    command = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", source]
+    command += ["-af", ",".join(filters), "-map_metadata", "-1", "-id3v2_version", "0"]
+    command += ["-c:a", "libmp3lame", "-b:a", f"{bitrate or source_info['bitrate']}k"]
+    command += ["-ac", str(channels or source_info["channels"])]
+    command += ["-ar", str(sample_rate or source_info["sampleRate"]), target]
+    subprocess.run(command, check=True)
+
+
+def first_audio_ms(entry: dict) -> int:
+    """Estimated time to first audio: the prebuffer download then the silence."""
+    prebuffer_bits = entry["bitrate"] * 1000 * PREBUFFER_SECONDS
+    return round(
+        prebuffer_bits / BANDWIDTH_BITS_PER_SECOND * 1000 + entry["leadingSilenceMs"]
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+
+    try:
+        source_info = inspect_mp3(args.source)
+    except InvalidMp3 as e:
+        raise SystemExit(f"{args.source}: {e}")
+    print(
+        f"{args.source}: {source_info['frames']} frames, "
+        f"{source_info['durationMs'] / 1000:.1f} s, {source_info['bitrate']} kbps",
+        file=sys.stderr,
+    )
+    if args.validate_only:
+        return
+
+    os.makedirs(args.output, exist_ok=True)
+    base_path = args.base_path or os.path.basename(os.path.normpath(args.output))
+    stem = os.path.splitext(os.path.basename(args.source))[0]
+
+    variants = {
+        "original": {
+            "file": os.path.basename(args.source),
+            **source_info,
+            "leadingSilenceMs": leading_silence_ms(args.ffmpeg, args.source),
+        }
+    }
+    with tempfile.TemporaryDirectory() as work:
+        for variant in VARIANTS:
+            encoded = os.path.join(work, f"{variant}.mp3")
+            encode_variant(
+                args.ffmpeg,
+                args.source,
+                encoded,
+                variant,
+                source_info,
+                args.takbir_seconds,
+            )
+            try:
+                info = inspect_mp3(encoded)
+            except InvalidMp3 as e:
+                raise SystemExit(f"{variant}: {e}")
+
+            name = f"{stem}-{variant}-{info['sha256'][:12]}.mp3"
+            shutil.move(encoded, os.path.join(args.output, name))
+            variants[variant] = {
+                "file": f"{base_path}/{name}",
+                **info,
+                "leadingSilenceMs": leading_silence_ms(
+                    args.ffmpeg, os.path.join(args.output, name)
+                ),
+            }
+
+    for entry in variants.values():
+        del entry["frames"], entry["sha256"]
+
+    manifest = {"version": MANIFEST_VERSION, "variants": variants}
+    os.makedirs(os.path.dirname(args.manifest) or ".", exist_ok=True)
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+    print(
+        f"{'variant':<11}{'bytes':>10}{'duration':>10}{'kbps':>6}"
+        f"{'silence':>9}{'first audio':>13}",
+        file=sys.stderr,
+    )
+    for variant, entry in variants.items():
+        print(
+            f"{variant:<11}{entry['bytes']:>10}{entry['durationMs'] / 1000:>9.1f}s"
+            f"{entry['bitrate']:>6}{entry['leadingSilenceMs']:>7}ms"
+            f"{first_audio_ms(entry):>11}ms",
+            file=sys.stderr,
+        )
+    print(f"Wrote {args.manifest}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
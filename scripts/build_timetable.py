@@ -0,0 +1,159 @@
+"""Precompute a year of prayer times for a geohash grid into timetable.bin.
+
+Usage (from the repository root):
+
+    PYTHONPATH=lambda python scripts/build_timetable.py \
+        --regions lambda_layers/prayer_times_functions_layers/timetable_regions.json \
+        --output lambda_layers/prayer_times_functions_layers/timetable/timetable.bin
+
+See lambda/services/timetable_store.py for the file layout.
+"""
+
+import argparse
+import datetime
+import json
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pytz
+
+from services import geohash
+from services.prayer_calculation import compute_prayer_day
+from services.timetable_store import (
+    DAY,
+    HEADER,
+    MAGIC,
+    PRAYERS,
+    REGION,
+    TIMEZONE_NAME_SIZE,
+    VERSION,
+)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regions", required=True, help="Regions JSON file")
+    parser.add_argument("--output", required=True, help="Timetable file to write")
+    parser.add_argument(
+        "--start",
+        type=datetime.date.fromisoformat,
+        default=datetime.date.today().replace(month=1, day=1),
+        help="First date (YYYY-MM-DD), defaults to January 1st of this year",
+    )
+    parser.add_argument("--days", type=int, default=366)
+    parser.add_argument("--precision", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def region_grid(region, precision):
+    """The rectangle of cells lying entirely in the region's bbox.
+
+    Cells straddling an edge are left out, so a region never serves a point
+    outside its bbox and its timezone. Regions may overlap, the timetable
+    serves a cell from the first region covering it.
+    """
+    south, west, north, east = region["bbox"]
+    lat_bits, lon_bits = geohash.grid_bits(precision)
+    lat_size = 180.0 / (1 << lat_bits)
+    lon_size = 360.0 / (1 << lon_bits)
+    first_row = math.ceil((south + 90.0) / lat_size)
+    last_row = math.floor((north + 90.0) / lat_size) - 1
+    first_column = math.ceil((west + 180.0) / lon_size)
+    last_column = math.floor((east + 180.0) / lon_size) - 1
+    return (
+        first_row,
+        last_row - first_row + 1,
+        first_column,
+        last_column - first_column + 1,
+    )
+
+
+def compute_cell(task):
+    """Return the packed timings of one cell for every method and day."""
+    latitude, longitude, timezone_name, methods, start, days = task
+    timezone = pytz.timezone(timezone_name)
+    chunks = []
+    for method in methods:
+        for day in range(days):
+            date = start + datetime.timedelta(days=day)
+            prayer_day = compute_prayer_day(
+                latitude, longitude, date, timezone, method=method
+            )
+            chunks.append(DAY.pack(*prayer_day.minutes))
+    return b"".join(chunks)
+
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    with open(args.regions) as f:
+        config = json.load(f)
+
+    methods = config["methods"]
+    regions = config["regions"]
+    timezones = sorted({region["timezone"] for region in regions})
+
+    grids = [region_grid(region, args.precision) for region in regions]
+    tasks = []
+    for region, (row, rows, column, columns) in zip(regions, grids):
+        for r in range(row, row + rows):
+            for c in range(column, column + columns):
+                latitude, longitude = geohash.cell_center(r, c, args.precision)
+                tasks.append(
+                    (
+                        latitude,
+                        longitude,
+                        region["timezone"],
+                        methods,
+                        args.start,
+                        args.days,
+                    )
+                )
+
+    print(
+        f"Computing {len(tasks)} cells x {len(methods)} methods x {args.days} days",
+        file=sys.stderr,
+    )
+
+    with open(args.output, "wb") as out:
+        out.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                args.precision,
+                len(PRAYERS),
+                args.start.toordinal(),
+                args.days,
+                len(methods),
+                len(timezones),
+                len(regions),
+            )
+        )
+        out.write(bytes(methods))
+        for name in timezones:
+            out.write(name.encode("ascii").ljust(TIMEZONE_NAME_SIZE, b"\0"))
+
+        first_cell = 0
+        for region, (row, rows, column, columns) in zip(regions, grids):
+            out.write(
+                REGION.pack(
+                    row,
+                    rows,
+                    column,
+                    columns,
+                    timezones.index(region["timezone"]),
+                    first_cell,
+                )
+            )
+            first_cell += rows * columns
+
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for packed in pool.map(compute_cell, tasks, chunksize=16):
+                out.write(packed)
+
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
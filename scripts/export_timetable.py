@@ -0,0 +1,427 @@
+"""Export prayer timetables of many locations as CSV, NDJSON or iCalendar.
+
+Usage (from the repository root):
+
+    PYTHONPATH=lambda python scripts/export_timetable.py \
+        --locations mosques.csv --start 2026-11-01 --end 2026-11-30 \
+        --format csv --output november.csv
+
+    PYTHONPATH=lambda python scripts/export_timetable.py \
+        --bbox 48.7,2.2,49.0,2.5 --step 0.05 --timezone Europe/Paris \
+        --start 2026-01-01 --end 2026-12-31 --format ndjson > paris.ndjson
+
+The locations file is a CSV with name, latitude, longitude and timezone
+columns. Timings come from PrayerService.get_prayer_days_async, like the
+skill's schedules: the timetable at TIMETABLE_PATH if set, then one
+Aladhan calendar request per location-month, then the engine the skill
+computes its degraded answers with for the months Aladhan fails to
+answer. --source local skips Aladhan, for large grids.
+
+Each location-month is computed and rendered by a worker process and
+written as soon as the ones before it are. Locations are read lazily and
+only a few location-months per worker are in flight, so memory stays
+constant whatever the number of locations and the date range.
+"""
+
+import argparse
+import contextlib
+import csv
+import datetime
+import io
+import json
+import logging
+import multiprocessing.util
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, NamedTuple
+
+import pytz
+
+from models.prayer_day import PRAYERS, format_minutes
+from services.prayer_calculation import METHODS
+
+FORMATS = ("csv", "ndjson", "ics")
+# Location-months queued per worker ahead of the one being written.
+QUEUE_DEPTH = 4
+ICS_LINE_OCTETS = 75
+PRODID = "-//alexa-adhan//timetable export//EN"
+
+
+class Location(NamedTuple):
+    name: str
+    latitude: float
+    longitude: float
+    timezone: str
+
+
+class Task(NamedTuple):
+    location: Location
+    first: datetime.date
+    last: datetime.date
+    method: int
+    school: int
+    source: str
+    output_format: str
+    stamp: str
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument("--locations", help="CSV file of locations")
+    where.add_argument(
+        "--bbox",
+        type=parse_bbox,
+        help="South,west,north,east of a grid of locations",
+    )
+    parser.add_argument("--step", type=float, default=0.1, help="Grid step, degrees")
+    parser.add_argument("--timezone", help="Timezone of the grid locations")
+    parser.add_argument(
+        "--start",
+        type=datetime.date.fromisoformat,
+        required=True,
+        help="First date (YYYY-MM-DD)",
+    )
+    parser.add_argument(
+        "--end",
+        type=datetime.date.fromisoformat,
+        required=True,
+        help="Last date (YYYY-MM-DD), included",
+    )
+    parser.add_argument("--method", type=int, default=2, choices=sorted(METHODS))
+    parser.add_argument("--school", type=int, default=0, choices=(0, 1))
+    parser.add_argument("--source", choices=("aladhan", "local"), default="aladhan")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output", help="File to write, standard output if omitted")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes, one per CPU by default, 0 to run inline",
+    )
+    args = parser.parse_args(argv)
+    if args.end < args.start:
+        parser.error("--end is before --start")
+    if args.bbox is not None:
+        if not args.timezone:
+            parser.error("--bbox needs --timezone")
+        if args.step <= 0:
+            parser.error("--step must be positive")
+    if args.timezone:
+        try:
+            pytz.timezone(args.timezone)
+        except pytz.UnknownTimeZoneError:
+            parser.error(f"Unknown timezone {args.timezone}")
+    return args
+
+
+def parse_bbox(value: str):
+    south, west, north, east = (float(part) for part in value.split(","))
+    if south > north or west > east:
+        raise argparse.ArgumentTypeError("Expected south,west,north,east")
+    return south, west, north, east
+
+
+def read_locations(path: str) -> Iterator[Location]:
+    with open(path, newline="") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                yield Location(
+                    row["name"],
+                    float(row["latitude"]),
+                    float(row["longitude"]),
+                    pytz.timezone(row["timezone"]).zone,
+                )
+            except (KeyError, TypeError, ValueError, pytz.UnknownTimeZoneError) as e:
+                raise SystemExit(f"{path}:{line}: invalid location ({e!r})")
+
+
+def grid_locations(bbox, step: float, timezone: str) -> Iterator[Location]:
+    south, west, north, east = bbox
+    # Integer steps, so rounding does not drop the last row or column.
+    rows = int((north - south) / step + 1e-9) + 1
+    columns = int((east - west) / step + 1e-9) + 1
+    for row in range(rows):
+        latitude = round(south + row * step, 6)
+        for column in range(columns):
+            longitude = round(west + column * step, 6)
+            yield Location(f"{latitude},{longitude}", latitude, longitude, timezone)
+
+
+def months(start: datetime.date, end: datetime.date):
+    """(first, last) dates of each calendar month of the range."""
+    first = start
+    while first <= end:
+        next_month = (first.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        last = min(end, next_month - datetime.timedelta(days=1))
+        yield first, last
+        first = next_month
+
+
+def prayer_days(task: Task):
+    """Days of one location-month, at most one Aladhan request for all."""
+    # Imported once the services' logs are sent to stderr (log_to_stderr),
+    # some log when imported.
+    from services import async_http
+    from services.prayer_times_service import PrayerService
+
+    location = task.location
+    timezone = pytz.timezone(location.timezone)
+    dates = [
+        task.first + datetime.timedelta(days=days)
+        for days in range((task.last - task.first).days + 1)
+    ]
+    days, _ = async_http.run(
+        PrayerService.get_prayer_days_async(
+            location.latitude,
+            location.longitude,
+            task.method,
+            task.school,
+            dates,
+            location.timezone,
+            upstream=task.source == "aladhan",
+        )
+    )
+    for day in days:
+        if day.timezone is None:
+            day = day.shifted({}, timezone=timezone)
+        yield day
+
+
+def render_chunk(task: Task) -> str:
+    """Compute and render one location-month, in a worker process."""
+    try:
+        return RENDERERS[task.output_format][1](task, prayer_days(task))
+    except Exception as e:
+        raise RuntimeError(
+            f"{task.location.name} {task.first:%Y-%m}: {type(e).__name__}: {e}"
+        ) from None
+
+
+def csv_header(args) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(
+        ("name", "latitude", "longitude", "timezone", "date") + PRAYERS
+    )
+    return buffer.getvalue()
+
+
+def csv_rows(task: Task, days) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    location = task.location
+    for day in days:
+        writer.writerow(
+            (
+                location.name,
+                location.latitude,
+                location.longitude,
+                location.timezone,
+                day.date.isoformat(),
+            )
+            + tuple(day.time_of(prayer) or "" for prayer in PRAYERS)
+        )
+    return buffer.getvalue()
+
+
+def ndjson_rows(task: Task, days) -> str:
+    location = task.location
+    return "".join(
+        json.dumps(
+            {
+                "name": location.name,
+                "latitude": location.latitude,
+                "longitude": location.longitude,
+                "timezone": location.timezone,
+                "date": day.date.isoformat(),
+                "method": task.method,
+                "school": task.school,
+                "timings": day.to_timings(),
+            },
+            ensure_ascii=False,
+        )
+        + "\n"
+        for day in days
+    )
+
+
+def ics_header(args) -> str:
+    return ics_lines(
+        (
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            f"PRODID:{PRODID}",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            "X-WR-CALNAME:Prayer times",
+        )
+    )
+
+
+def ics_events(task: Task, days) -> str:
+    location = task.location
+    name = ics_text(location.name)
+    lines: List[str] = []
+    for day in days:
+        for prayer, moment in day.moments():
+            start = moment.astimezone(pytz.utc)
+            lines += (
+                "BEGIN:VEVENT",
+                f"UID:{start:%Y%m%d}-{prayer.lower()}-{location.latitude}"
+                f"-{location.longitude}@alexa-adhan",
+                f"DTSTAMP:{task.stamp}",
+                f"DTSTART:{start:%Y%m%dT%H%M%SZ}",
+                f"SUMMARY:{prayer} ({format_minutes(day.minute_of(prayer))})",
+                f"LOCATION:{name}",
+                f"GEO:{location.latitude};{location.longitude}",
+                "TRANSP:TRANSPARENT",
+                "END:VEVENT",
+            )
+    return ics_lines(lines)
+
+
+def ics_footer(args) -> str:
+    return ics_lines(("END:VCALENDAR",))
+
+
+def ics_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def ics_lines(lines: Iterable[str]) -> str:
+    """CRLF terminated content lines, folded at 75 octets."""
+    folded = []
+    for line in lines:
+        encoded = line.encode("utf-8")
+        limit = ICS_LINE_OCTETS
+        while len(encoded) > limit:
+            cut = limit
+            # Never split a UTF-8 sequence.
+            while encoded[cut] & 0xC0 == 0x80:
+                cut -= 1
+            folded.append(encoded[:cut].decode("utf-8") + "\r\n ")
+            encoded = encoded[cut:]
+            # Continuation lines start with a space.
+            limit = ICS_LINE_OCTETS - 1
+        folded.append(encoded.decode("utf-8") + "\r\n")
+    return "".join(folded)
+
+
+# Format -> (header, location-month rows, footer)
+RENDERERS = {
+    "csv": (csv_header, csv_rows, None),
+    "ndjson": (None, ndjson_rows, None),
+    "ics": (ics_header, ics_events, ics_footer),
+}
+
+
+def tasks(args, locations: Iterable[Location]) -> Iterator[Task]:
+    stamp = datetime.datetime.now(pytz.utc).strftime("%Y%m%dT%H%M%SZ")
+    for location in locations:
+        for first, last in months(args.start, args.end):
+            yield Task(
+                location,
+                first,
+                last,
+                args.method,
+                args.school,
+                args.source,
+                args.format,
+                stamp,
+            )
+
+
+def render(pool, task_iterator: Iterator[Task], depth: int) -> Iterator[str]:
+    """Render tasks in order, with at most depth of them submitted ahead.
+
+    Executor.map would submit the whole iterator at once.
+    """
+    if pool is None:
+        yield from map(render_chunk, task_iterator)
+        return
+    pending = deque()
+    for task in task_iterator:
+        pending.append(pool.submit(render_chunk, task))
+        if len(pending) >= depth:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    locations = (
+        read_locations(args.locations)
+        if args.locations
+        else grid_locations(args.bbox, args.step, args.timezone)
+    )
+    header, _, footer = RENDERERS[args.format]
+    workers = os.cpu_count() if args.workers is None else args.workers
+
+    out = (
+        open(args.output, "w", newline="", encoding="utf-8")
+        if args.output
+        else open(sys.stdout.fileno(), "w", newline="", encoding="utf-8", closefd=False)
+    )
+    log_to_stderr()
+    chunks = 0
+    try:
+        if header:
+            out.write(header(args))
+        executor = (
+            ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+            if workers
+            else contextlib.nullcontext()
+        )
+        with executor as pool:
+            for rendered in render(pool, tasks(args, locations), workers * QUEUE_DEPTH):
+                out.write(rendered)
+                chunks += 1
+        if footer:
+            out.write(footer(args))
+    finally:
+        out.close()
+        close_session()
+
+    print(f"Exported {chunks} location-months", file=sys.stderr)
+
+
+def log_to_stderr() -> None:
+    """The services log to standard output, keep it for the export.
+
+    Powertools loggers keep the stream they were built with, the handlers
+    of those already built are moved to stderr too.
+    """
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    loggers = [logging.getLogger(), *logging.Logger.manager.loggerDict.values()]
+    for logger in loggers:
+        for handler in getattr(logger, "handlers", ()):
+            if isinstance(handler, logging.StreamHandler) and handler.stream in (
+                stdout,
+                sys.__stdout__,
+            ):
+                handler.setStream(sys.stderr)
+
+
+def init_worker() -> None:
+    log_to_stderr()
+    # Run when the worker exits, the pool gives no other hook.
+    multiprocessing.util.Finalize(None, close_session, exitpriority=10)
+
+
+def close_session() -> None:
+    """Close the HTTP session, if the services were used in this process."""
+    async_http = sys.modules.get("services.async_http")
+    if async_http is not None:
+        async_http.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import pytest
+
+from repositories import dynamodb
+
+
+@pytest.fixture
+def dynamodb_client(monkeypatch):
+    """The in-process DynamoDB stand-in, fresh for each test."""
+    monkeypatch.setenv("DYNAMODB_ENDPOINT_URL", dynamodb.MEMORY_ENDPOINT)
+    monkeypatch.setattr(dynamodb, "_client", None)
+    client = dynamodb.get_client()
+    assert isinstance(client, dynamodb.InMemoryDynamoDBClient)
+    return client
@@ -0,0 +1,72 @@
+import asyncio
+
+from services import hedging
+from services.hedging import PRIMARY, SECONDARY, Hedge
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+def answer(value, seconds=0.0):
+    async def call():
+        await asyncio.sleep(seconds)
+        return value
+
+    return call
+
+
+def test_fast_primary_is_not_hedged():
+    hedge = Hedge("test")
+    secondary_calls = []
+
+    async def secondary():
+        secondary_calls.append(1)
+        return "secondary"
+
+    assert run(hedge.run(answer("primary"), secondary)) == ("primary", PRIMARY)
+    assert secondary_calls == []
+
+
+def test_failed_primary_is_hedged_at_once():
+    hedge = Hedge("test")
+
+    async def primary():
+        raise ConnectionError()
+
+    assert run(hedge.run(primary, answer("secondary"))) == ("secondary", SECONDARY)
+    assert hedge.stats()["hedged"] == 1
+
+
+def test_delay_rises_with_the_latency_of_beaten_primaries(monkeypatch):
+    monkeypatch.setattr(hedging, "MIN_SAMPLES", 4)
+    monkeypatch.setattr(hedging, "MIN_DELAY", 0.01)
+    hedge = Hedge("test")
+    for _ in range(4):
+        hedge._record_latency(0.01)
+    assert hedge.delay() == 0.01
+
+    async def slowdown():
+        for _ in range(6):
+            result = await hedge.run(answer("primary", 0.1), answer("secondary"))
+            assert result == ("secondary", SECONDARY)
+        # The beaten primaries finish in the background.
+        await asyncio.sleep(0.15)
+
+    run(slowdown())
+
+    assert 0.1 <= hedge.delay() < 0.15
+
+
+def test_beaten_primary_latency_is_capped(monkeypatch):
+    monkeypatch.setattr(hedging, "MAX_DELAY", 0.05)
+    hedge = Hedge("test")
+
+    async def hedged():
+        task = asyncio.ensure_future(answer("primary", 0.1)())
+        hedge._finish_in_background(task, asyncio.get_running_loop().time())
+        await task
+
+    run(hedged())
+
+    assert list(hedge._latencies) == [0.05]
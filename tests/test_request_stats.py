@@ -0,0 +1,62 @@
+import pytest
+
+from services import request_stats
+
+TABLE = "stats"
+
+
+@pytest.fixture
+def stats(dynamodb_client, monkeypatch):
+    monkeypatch.setenv("REQUEST_STATS_TABLE", TABLE)
+    monkeypatch.setattr(request_stats, "BATCH_RETRY_DELAY", 0)
+    request_stats.clear()
+    yield dynamodb_client
+    request_stats.clear()
+
+
+def leave_unprocessed(client, monkeypatch, times):
+    """Make batch_get_item answer only the first key, `times` times."""
+    batch_get_item = client.batch_get_item
+    calls = []
+
+    def partial(RequestItems, **kwargs):
+        calls.append(RequestItems)
+        if len(calls) > times:
+            return batch_get_item(RequestItems, **kwargs)
+        request = RequestItems[TABLE]
+        response = batch_get_item({TABLE: {**request, "Keys": request["Keys"][:1]}})
+        response["UnprocessedKeys"] = {TABLE: {**request, "Keys": request["Keys"][1:]}}
+        return response
+
+    monkeypatch.setattr(client, "batch_get_item", partial)
+    return calls
+
+
+def record(latitude, count=1):
+    for _ in range(count):
+        request_stats.record(latitude, 2.35, 2, 0, {}, "fr-FR", "Europe/Paris")
+
+
+def test_top_locations_retries_unprocessed_keys(stats, monkeypatch):
+    for latitude, count in ((48.85, 3), (43.3, 1), (45.76, 2)):
+        record(latitude, count)
+    request_stats.flush(force=True)
+    calls = leave_unprocessed(stats, monkeypatch, times=2)
+
+    top = request_stats.top_locations()
+
+    assert [(location.latitude, count) for location, count in top] == [
+        (48.85, 3),
+        (45.76, 2),
+        (43.3, 1),
+    ]
+    assert len(calls) == 3
+    keys = request_stats.HISTORY_DAYS * request_stats.SHARDS
+    assert [len(call[TABLE]["Keys"]) for call in calls] == [keys, keys - 1, keys - 2]
+
+
+def test_top_locations_gives_up_on_keys_kept_unprocessed(stats, monkeypatch):
+    leave_unprocessed(stats, monkeypatch, times=100)
+
+    with pytest.raises(RuntimeError):
+        request_stats.top_locations()
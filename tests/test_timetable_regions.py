@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+from build_timetable import region_grid
+from services import geohash
+
+REGIONS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "lambda_layers",
+    "prayer_times_functions_layers",
+    "timetable_regions.json",
+)
+PRECISION = 4
+
+
+def serving_region(latitude, longitude):
+    with open(REGIONS) as f:
+        regions = json.load(f)["regions"]
+    row, column = geohash.cell_of(latitude, longitude, PRECISION)
+    for region in regions:
+        first_row, rows, first_column, columns = region_grid(region, PRECISION)
+        if (
+            first_row <= row < first_row + rows
+            and first_column <= column < first_column + columns
+        ):
+            return region
+    return None
+
+
+@pytest.mark.parametrize(
+    "latitude, longitude",
+    [
+        (49.186, -2.106),  # St Helier
+        (49.199, -2.02),  # Gorey
+        (49.455, -2.536),  # St Peter Port
+        (49.714, -2.2),  # Alderney
+        (50.12, -5.54),  # Penzance
+        (50.37, -4.14),  # Plymouth
+        (50.575, -1.3),  # Isle of Wight
+        (50.91, 0.98),  # Dungeness
+        (51.125, 1.31),  # Dover
+        (51.152, 1.385),  # St Margaret's at Cliffe
+    ],
+)
+def test_no_region_serves_places_on_london_time(latitude, longitude):
+    assert serving_region(latitude, longitude) is None
+
+
+@pytest.mark.parametrize(
+    "latitude, longitude",
+    [
+        (48.8566, 2.3522),  # Paris
+        (48.39, -4.49),  # Brest
+        (49.64, -1.62),  # Cherbourg
+        (49.92, 1.08),  # Dieppe
+        (50.72, 1.61),  # Boulogne-sur-Mer
+        (50.95, 1.86),  # Calais
+        (51.03, 2.37),  # Dunkirk
+        (43.7, 7.27),  # Nice
+        (41.93, 8.74),  # Ajaccio
+    ],
+)
+def test_french_cities_are_served_on_paris_time(latitude, longitude):
+    assert serving_region(latitude, longitude)["timezone"] == "Europe/Paris"
+
+
+def test_cells_lie_entirely_in_the_bbox():
+    region = {"bbox": [48.7, -1.96, 49.8, 9.6]}
+    first_row, rows, first_column, columns = region_grid(region, PRECISION)
+    south, west = geohash.cell_center(first_row, first_column, PRECISION)
+    north, east = geohash.cell_center(
+        first_row + rows - 1, first_column + columns - 1, PRECISION
+    )
+    lat_half, lon_half = 180.0 / 2**11, 360.0 / 2**11
+    assert south - lat_half >= 48.7 and west - lon_half >= -1.96
+    assert north + lat_half <= 49.8 and east + lon_half <= 9.6
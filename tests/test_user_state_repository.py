@@ -0,0 +1,302 @@
+from types import SimpleNamespace
+
+import pytest
+
+from repositories import user_state_repository
+from repositories.dynamodb import InMemoryDynamoDBClient
+from repositories.user_state_repository import (
+    UserState,
+    UserStateRepository,
+    UserStateResponseInterceptor,
+    get_user_state,
+)
+
+TABLE = "preferences"
+
+
+class CountingClient(InMemoryDynamoDBClient):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def get_item(self, **kwargs):
+        self.calls.append("get_item")
+        return super().get_item(**kwargs)
+
+    def update_item(self, **kwargs):
+        self.calls.append("update_item")
+        return super().update_item(**kwargs)
+
+
+class UnprocessedClient(InMemoryDynamoDBClient):
+    """Leaves the last key or item of each batch unprocessed, `times` times."""
+
+    def __init__(self, times=1):
+        super().__init__()
+        self.times = times
+        self.batch_calls = 0
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        self.batch_calls += 1
+        if self.times:
+            self.times -= 1
+            ((table_name, request),) = RequestItems.items()
+            keys = request["Keys"]
+            response = super().batch_get_item({table_name: {"Keys": keys[:-1]}})
+            response["UnprocessedKeys"] = {table_name: {"Keys": keys[-1:]}}
+            return response
+        return super().batch_get_item(RequestItems)
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        self.batch_calls += 1
+        if self.times:
+            self.times -= 1
+            ((table_name, requests),) = RequestItems.items()
+            super().batch_write_item({table_name: requests[:-1]})
+            return {"UnprocessedItems": {table_name: requests[-1:]}}
+        return super().batch_write_item(RequestItems)
+
+
+@pytest.fixture
+def repository(dynamodb_client, monkeypatch):
+    monkeypatch.setenv("PREFERENCES_TABLE", TABLE)
+    monkeypatch.setattr(user_state_repository, "_repository", None)
+    monkeypatch.setattr(UserStateRepository, "BATCH_RETRY_DELAY", 0)
+    return user_state_repository.get_repository()
+
+
+def handler_input(user_id="user-1"):
+    return SimpleNamespace(
+        attributes_manager=SimpleNamespace(request_attributes={}),
+        request_envelope=SimpleNamespace(
+            context=SimpleNamespace(
+                system=SimpleNamespace(user=SimpleNamespace(user_id=user_id))
+            )
+        ),
+    )
+
+
+def stored(client, user_id="user-1"):
+    return UserState.from_item(
+        user_id,
+        client.get_item(TableName=TABLE, Key={"userId": {"S": user_id}}).get("Item"),
+    )
+
+
+def test_state_is_read_once_per_invocation(repository, monkeypatch):
+    client = CountingClient()
+    monkeypatch.setattr(repository, "_client", client)
+    client.put_item(
+        TableName=TABLE,
+        Item={"userId": {"S": "user-1"}, "version": {"N": "3"}, "method": {"N": "12"}},
+    )
+    invocation = handler_input()
+
+    state = get_user_state(invocation)
+    state.set("school", 1)
+
+    assert get_user_state(invocation) is state
+    assert state.get("method") == 12
+    assert state.version == 3
+    assert client.calls == ["get_item"]
+
+
+def test_unchanged_values_are_not_dirty():
+    state = UserState("user-1", {"method": 2, "offsets": {"Fajr": 5}}, version=1)
+
+    state.set("method", 2)
+    state.set("offsets", {"Fajr": 5})
+    state.delete("missing")
+
+    assert not state.dirty
+
+
+def test_changes_track_set_and_deleted_fields():
+    state = UserState("user-1", {"method": 2, "school": 1}, version=1)
+
+    state.set("method", 12)
+    state.delete("school")
+    assert state.changes() == ({"method": 12}, {"school"})
+
+    state.set("school", 0)
+    assert state.changes() == ({"method": 12, "school": 0}, set())
+
+    state.mark_clean()
+    assert not state.dirty
+
+
+def test_flush_creates_then_updates_the_item(repository, dynamodb_client):
+    state = repository.load("user-1")
+    state.set("method", 12)
+    assert repository.flush(state)
+    assert state.version == 1 and not state.dirty
+
+    state.set("school", 1)
+    state.delete("method")
+    assert repository.flush(state)
+
+    item = stored(dynamodb_client)
+    assert item.version == 2
+    assert item.get("school") == 1
+    assert item.get("method") is None
+
+
+def test_flush_without_changes_writes_nothing(repository, monkeypatch):
+    client = CountingClient()
+    monkeypatch.setattr(repository, "_client", client)
+
+    assert repository.flush(UserState("user-1", {"method": 2}, version=1))
+    assert client.calls == []
+
+
+def test_conflicting_flush_rebases_and_keeps_both_changes(repository, dynamodb_client):
+    first = repository.load("user-1")
+    first.set("method", 12)
+    repository.flush(first)
+
+    mine = repository.load("user-1")
+    theirs = repository.load("user-1")
+    theirs.set("school", 1)
+    assert repository.flush(theirs)
+
+    mine.set("reminderLeadMinutes", 10)
+    assert repository.flush(mine)
+
+    item = stored(dynamodb_client)
+    assert item.version == 3
+    assert item.get("method") == 12
+    assert item.get("school") == 1
+    assert item.get("reminderLeadMinutes") == 10
+    assert mine.version == 3
+
+
+def test_conflict_on_a_new_item_is_retried_once(repository, monkeypatch):
+    client = CountingClient()
+    monkeypatch.setattr(repository, "_client", client)
+    mine = repository.load("user-1")
+    theirs = repository.load("user-1")
+    theirs.set("method", 12)
+    repository.flush(theirs)
+    client.calls.clear()
+
+    mine.set("method", 3)
+    assert repository.flush(mine)
+
+    assert client.calls == ["update_item", "get_item", "update_item"]
+    assert stored(client).get("method") == 3
+
+
+def test_flush_gives_up_when_the_retry_conflicts_too(repository, monkeypatch):
+    class BusyClient(CountingClient):
+        """Another writer updates the item before every write."""
+
+        def update_item(self, **kwargs):
+            self.put_item(
+                TableName=TABLE,
+                Item={
+                    "userId": {"S": "user-1"},
+                    "version": {"N": str(len(self.calls))},
+                },
+            )
+            return super().update_item(**kwargs)
+
+    client = BusyClient()
+    monkeypatch.setattr(repository, "_client", client)
+    state = UserState("user-1")
+    state.set("method", 12)
+
+    assert not repository.flush(state)
+    assert client.calls == ["update_item", "get_item", "update_item"]
+    assert state.dirty
+
+
+def test_conflict_rebase_drops_deletions_already_applied(repository, dynamodb_client):
+    state = repository.load("user-1")
+    state.set("pending", {"lead": 5})
+    repository.flush(state)
+
+    mine = repository.load("user-1")
+    theirs = repository.load("user-1")
+    theirs.delete("pending")
+    repository.flush(theirs)
+
+    mine.delete("pending")
+    assert repository.flush(mine)
+    assert not mine.dirty
+    assert stored(dynamodb_client).version == 2
+
+
+def test_interceptor_does_not_write_after_a_failed_read(repository, monkeypatch):
+    client = CountingClient()
+    monkeypatch.setattr(repository, "_client", client)
+    invocation = handler_input()
+    invocation.attributes_manager.request_attributes[
+        user_state_repository.REQUEST_ATTRIBUTE
+    ] = UserState("user-1", load_failed=True)
+    get_user_state(invocation).set("method", 12)
+
+    UserStateResponseInterceptor().process(invocation, None)
+
+    assert client.calls == []
+
+
+def test_interceptor_flushes_changes(repository, dynamodb_client):
+    invocation = handler_input()
+    get_user_state(invocation).set("method", 12)
+
+    UserStateResponseInterceptor().process(invocation, None)
+
+    assert stored(dynamodb_client).get("method") == 12
+
+
+def test_batch_get_retries_unprocessed_keys(repository, monkeypatch):
+    client = UnprocessedClient(times=2)
+    monkeypatch.setattr(repository, "_client", client)
+    monkeypatch.setattr(UserStateRepository, "MAX_BATCH_GET", 2)
+    for user_id in ("a", "b", "c"):
+        client.put_item(
+            TableName=TABLE,
+            Item={"userId": {"S": user_id}, "version": {"N": "1"}, "x": {"S": user_id}},
+        )
+
+    states = repository.batch_get(["a", "b", "c", "d", "a"])
+
+    assert list(states) == ["a", "b", "c", "d"]
+    assert [states[user_id].get("x") for user_id in "abc"] == ["a", "b", "c"]
+    assert states["d"].version == 0 and states["d"].get("x") is None
+    # Two unprocessed answers, then one call for each chunk's rest.
+    assert client.batch_calls == 4
+
+
+def test_batch_get_gives_up_on_keys_kept_unprocessed(repository, monkeypatch):
+    monkeypatch.setattr(repository, "_client", UnprocessedClient(times=100))
+
+    with pytest.raises(RuntimeError):
+        repository.batch_get(["a", "b"])
+
+
+def test_batch_write_retries_unprocessed_items(repository, monkeypatch):
+    client = UnprocessedClient(times=1)
+    monkeypatch.setattr(repository, "_client", client)
+    states = [UserState(user_id) for user_id in ("a", "b", "c")]
+    for state in states[:2]:
+        state.set("tokens", ["t-" + state.user_id])
+
+    repository.batch_write(states)
+
+    assert client.batch_calls == 2
+    assert stored(client, "a").get("tokens") == ["t-a"]
+    assert stored(client, "b").get("tokens") == ["t-b"]
+    assert stored(client, "b").version == 1
+    assert "c" not in client.tables[TABLE]
+    assert all(not state.dirty for state in states)
+
+
+def test_batch_write_gives_up_on_items_kept_unprocessed(repository, monkeypatch):
+    monkeypatch.setattr(repository, "_client", UnprocessedClient(times=100))
+    state = UserState("a")
+    state.set("tokens", [])
+
+    with pytest.raises(RuntimeError):
+        repository.batch_write([state])
+    assert state.dirty